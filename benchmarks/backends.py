@@ -0,0 +1,115 @@
+"""Benchmark of the fetch backends against the local stub of Instagram of the tests.
+
+Pages through the followers of a stub user, then loads every follower's
+profile with a pool of workers, as ``getinfo --deepscrape`` does. Reports the
+throughput of both phases and the memory of the process and of its browser.
+
+The Selenium backend needs Chrome and a chromedriver (the ``driver_path``
+setting or ``INSTACLI_DRIVER_PATH``); it is skipped if they can't be started.
+
+Usage:
+    python benchmarks/backends.py --users 500 --latency 0.02 --workers 4
+    python benchmarks/backends.py --backend http
+"""
+import json, os, sys, time
+import click
+
+# Imports instacli from this checkout, and so do the interpreters started here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+os.environ.setdefault('INSTACLI_DRIVER_PATH', 'chromedriver')
+
+from instacli.models import FetchBackend, FollowIterator, WorkerPool
+from instacli.models.igclient import IGClient
+from fakes import serve
+
+
+def rss(pid:int=None) -> int:
+    """Resident memory in bytes of a process and all its children (Linux)."""
+    pid = pid or os.getpid()
+    parents = dict()
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as file:
+                    parents[int(entry)] = int(file.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    tree, todo = set(), [pid]
+    while todo:
+        current = todo.pop()
+        tree.add(current)
+        todo.extend(child for child, parent in parents.items() if parent == current and child not in tree)
+    total = 0
+    for current in tree:
+        try:
+            with open(f'/proc/{current}/statm') as file:
+                total += int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            continue
+    return total
+
+
+def run(backend:str, origin:str, users:int, workers:int) -> dict:
+    client = IGClient()
+    client.set_backend(backend, origin=origin)
+    client.username = 'viewer'
+    if backend == FetchBackend.SELENIUM:
+        client.connect()
+    try:
+        start = time.perf_counter()
+        iterator = FollowIterator(client, 'user0', FollowIterator.FOLLOWERS, users)
+        pages, followers = 0, list()
+        for page in iterator.pages():
+            pages += 1
+            followers.extend(page)
+        paging = time.perf_counter() - start
+
+        # Without a factory, the Selenium backend gets a single worker: more would need more browsers
+        clients = [client] * workers if client.backend.concurrent else [client]
+        pool = WorkerPool(len(clients), clients=clients)
+        start = time.perf_counter()
+        loaded = sum(1 for _, result, error in pool.map(lambda worker, user: worker.get_profile(user.username), followers) if result and not error)
+        profiles = time.perf_counter() - start
+        memory = rss()
+    finally:
+        client.disconnect()
+    return {
+        'followers': len(followers), 'pages_per_second': pages / paging if paging else 0.0,
+        'profiles': loaded, 'profiles_per_second': loaded / profiles if profiles else 0.0,
+        'workers': len(clients), 'rss': memory,
+    }
+
+
+@click.command()
+@click.option('--users', default=500, help="Number of followers of the stub user.")
+@click.option('--latency', default=0.02, help="Server latency per request in seconds.")
+@click.option('--workers', default=4, help="Workers loading the profiles. Workers share the client when the backend allows it.")
+@click.option('--backend', 'backends', multiple=True, type=click.Choice([FetchBackend.SELENIUM, FetchBackend.HTTP]), default=[FetchBackend.SELENIUM, FetchBackend.HTTP], help="Backends to compare.")
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help="Save the results to this JSON file.")
+def main(users, latency, workers, backends, output):
+    server = serve(users, latency)
+    origin = f'http://127.0.0.1:{server.server_address[1]}'
+    results = dict()
+    try:
+        for backend in backends:
+            try:
+                result = results[backend] = run(backend, origin, users, workers)
+            except Exception as error:
+                click.echo(f"{backend:9} skipped: {getattr(error, 'message', None) or error}")
+                continue
+            click.echo(f"{backend:9} {result['followers']} followers at {result['pages_per_second']:6.1f} pages/s, "
+                f"{result['profiles']} profiles at {result['profiles_per_second']:7.1f}/s with {result['workers']} workers, "
+                f"{result['rss'] / 1024 / 1024:6.1f} MB resident")
+    finally:
+        server.shutdown()
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
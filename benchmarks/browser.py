@@ -0,0 +1,135 @@
+"""Benchmark of the lean browser mode against the default one.
+
+Loads pages of a local stub with the images, video, fonts and tracker
+script of an Instagram page, in a browser started in each mode. Reports the
+time to start the browser, the average page load and the peak memory of the
+chromedriver and its browser.
+
+Needs Chrome and a chromedriver (the ``driver_path`` setting or
+``INSTACLI_DRIVER_PATH``). The lean profiles are created in a temporary
+folder, so that the first run of each mode starts with an empty cache.
+
+Usage:
+    python benchmarks/browser.py --pages 30 --latency 0.05
+    python benchmarks/browser.py --mode lean --output browser.json
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json, os, sys, tempfile, threading, time
+import click
+
+# Imports instacli from this checkout, and so do the interpreters started here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+
+os.environ.setdefault('INSTACLI_DRIVER_PATH', 'chromedriver')
+
+from instacli.models.browser import BrowserStats, ProfileDir
+from instacli.models.igclient import IGClient
+
+PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<style>@font-face {{ font-family: stub; src: url(/static/font.woff2) format("woff2"); }} body {{ font-family: stub; }}</style>
+<script src="/www.google-analytics.com/analytics.js"></script>
+</head><body>
+<script type="application/json" id="data">{{"user": "user{index}"}}</script>
+{images}
+<video src="/media/{index}.mp4" autoplay muted></video>
+</body></html>'''
+
+# Size in bytes of the stub assets
+SIZES = {'.jpg': 150 * 1024, '.mp4': 1024 * 1024, '.woff2': 60 * 1024, '.js': 40 * 1024}
+TYPES = {'.jpg': 'image/jpeg', '.mp4': 'video/mp4', '.woff2': 'font/woff2', '.js': 'application/javascript'}
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    images = 12
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        path = self.path.split('?')[0]
+        extension = os.path.splitext(path)[1]
+        if path.startswith('/page/'):
+            index = path.rsplit('/', 1)[1]
+            images = '\n'.join(f'<img src="/media/{index}-{image}.jpg">' for image in range(self.images))
+            body = PAGE.format(index=index, images=images).encode('utf-8')
+            kind = 'text/html'
+        elif extension in SIZES:
+            body = b'\0' * SIZES[extension]
+            kind = TYPES[extension]
+        else:
+            body, kind = b'', 'text/plain'
+        self.send_response(200)
+        self.send_header('Content-Type', kind)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store' if kind == 'text/html' else 'max-age=3600')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(images:int, latency:float) -> ThreadingHTTPServer:
+    PageHandler.images = images
+    PageHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(lean:bool, origin:str, pages:int) -> dict:
+    IGClient.browser = BrowserStats()
+    client = IGClient(lean=lean)
+    start = time.perf_counter()
+    client.launch()
+    launch = time.perf_counter() - start
+    peak = 0
+    try:
+        for index in range(pages):
+            client.driver.get(f'{origin}/page/{index}')
+            peak = max(peak, client.rss() or 0)
+    finally:
+        client.disconnect()
+    stats = IGClient.browser
+    return {'launch': launch, 'pages': stats.pages, 'average': stats.average, 'rss': peak}
+
+
+@click.command()
+@click.option('--pages', default=30, help="Pages loaded in every mode.")
+@click.option('--images', default=12, help="Images of every page.")
+@click.option('--latency', default=0.05, help="Server latency per request in seconds.")
+@click.option('--mode', 'modes', multiple=True, type=click.Choice(['default', 'lean']), default=['default', 'lean'], help="Modes to compare.")
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help="Save the results to this JSON file.")
+def main(pages, images, latency, modes, output):
+    server = serve(images, latency)
+    origin = f'http://127.0.0.1:{server.server_address[1]}'
+    ProfileDir.PROFILES_DIR = tempfile.mkdtemp(prefix='instacli-profiles-')
+    results = dict()
+    try:
+        for mode in modes:
+            try:
+                result = results[mode] = run(mode == 'lean', origin, pages)
+            except Exception as error:
+                click.echo(f"{mode:8} skipped: {getattr(error, 'message', None) or error}")
+                continue
+            click.echo(f"{mode:8} started in {result['launch']:5.2f}s, {result['pages']} pages loaded in "
+                f"{result['average'] * 1000:7.1f}ms on average, {result['rss'] / 1024 / 1024:6.1f} MB peak driver memory")
+    finally:
+        server.shutdown()
+    if 'default' in results and 'lean' in results:
+        default, lean = results['default'], results['lean']
+        if default['average'] and default['rss']:
+            click.echo(f"lean     {lean['average'] / default['average']:.2f}x the page load time and "
+                f"{lean['rss'] / default['rss']:.2f}x the memory of the default mode")
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
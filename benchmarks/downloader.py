@@ -0,0 +1,107 @@
+"""Benchmark of the posts media downloader against a local HTTP server.
+
+Compares the previous download loop (a new ``requests.get`` per file,
+one file at a time, followed by a 0.5 s pause) with the pooled
+:class:`instacli.models.Downloader`.
+
+Usage:
+    python benchmarks/downloader.py --files 40 --size 256 --latency 0.05
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os, shutil, sys, tempfile, threading, time
+import click, requests
+
+# Imports instacli from this checkout, and so do the interpreters started here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+from instacli.models.downloader import Downloader
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    payload = b''
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        data = self.payload
+        start = 0
+        header = self.headers.get('Range')
+        if header:
+            start = int(header.replace('bytes=', '').split('-')[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(data)-1}/{len(data)}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(size:int, latency:float) -> ThreadingHTTPServer:
+    MediaHandler.payload = os.urandom(size)
+    MediaHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy(jobs, pause:float):
+    for url, path in jobs:
+        with open(path, 'wb') as file:
+            response = requests.get(url, stream=True)
+            response.raw.decode_content = True
+            shutil.copyfileobj(response.raw, file)
+        time.sleep(pause)
+
+
+@click.command()
+@click.option('--files', default=40, help="Number of files to download.")
+@click.option('--size', default=256, help="Size of every file in KB.")
+@click.option('--latency', default=0.05, help="Server latency per request in seconds.")
+@click.option('--workers', default=8, help="Concurrent downloads of the pooled downloader.")
+@click.option('--pause', default=0.5, help="Pause after every file of the legacy loop.")
+def main(files, size, latency, workers, pause):
+    server = serve(size * 1024, latency)
+    url = f'http://127.0.0.1:{server.server_address[1]}/media.jpg'
+    total = files * size * 1024
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            jobs = [(url, os.path.join(folder, f'legacy-{index}.jpg')) for index in range(files)]
+            start = time.perf_counter()
+            legacy(jobs, pause)
+            elapsed = time.perf_counter() - start
+            click.echo(f"legacy     {elapsed:8.2f}s {total / elapsed / 1024:10.0f} KB/s")
+
+            jobs = [(url, os.path.join(folder, f'pooled-{index}.jpg')) for index in range(files)]
+            downloader = Downloader(workers=workers)
+            failed = downloader.download_all(jobs)
+            downloader.close()
+            stats = downloader.stats
+            click.echo(f"pooled     {stats.elapsed:8.2f}s {stats.rate / 1024:10.0f} KB/s ({len(failed)} failed)")
+
+            # Resume a half written file
+            path = os.path.join(folder, 'resumed.jpg')
+            with open(f'{path}.part', 'wb') as file:
+                file.write(MediaHandler.payload[:len(MediaHandler.payload) // 2])
+            downloader = Downloader(workers=1)
+            transferred = downloader.download(url, path)
+            downloader.close()
+            with open(path, 'rb') as file:
+                intact = file.read() == MediaHandler.payload
+            click.echo(f"resume     {transferred} of {len(MediaHandler.payload)} bytes transferred, intact: {intact}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
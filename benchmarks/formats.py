@@ -0,0 +1,70 @@
+"""Benchmark of the output formats.
+
+Writes N synthetic profiles, with the columns and types of ``getinfo``, through
+an :class:`OutputSink` in every format, as the commands do: one record at a
+time, flushed every 100 records. Reports the write time, the throughput and
+the size of the file. Formats whose dependencies aren't installed are skipped.
+
+Usage:
+    python benchmarks/formats.py --records 100000
+    python benchmarks/formats.py --format jsonl --format parquet --output formats.json
+"""
+import json, os, sys, tempfile, time
+import click
+
+# Imports instacli from this checkout, and so do the interpreters started here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+from instacli.models import OutputFormat, OutputFormatError, OutputSink
+from instacli.commands.scraping import PROFILE_COLUMNS, PROFILE_TYPES
+
+
+def profile(index:int) -> dict:
+    return {
+        'id': str(10000000 + index), 'viewer': 'viewer', 'username': f'user{index}', 'name': f'User Number {index}',
+        'biography': f'Synthetic profile {index} - photography, travel and food', 'is_private': index % 3 == 0,
+        'is_verified': index % 11 == 0, 'is_business_account': index % 4 == 0, 'is_joined_recently': False,
+        'follower_count': index * 7 % 100000, 'followed_count': index % 1000, 'post_count': index % 500,
+        'business_category_name': 'Creators & Celebrities' if index % 4 == 0 else None, 'overall_category_name': None,
+        'external_url': f'https://example.com/{index}' if index % 5 == 0 else None,
+        'profile_pic_url': f'https://scontent.cdninstagram.com/v/t51.2885-19/{index}_n.jpg', 'follows_viewer': False,
+        'followed_by_viewer': index % 2 == 0, 'requested_by_viewer': False,
+    }
+
+
+def measure(format:str, records:int) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, f'profiles.{OutputFormat.get(format).extension}')
+        start = time.perf_counter()
+        sink = OutputSink(path, format, columns=PROFILE_COLUMNS, types=PROFILE_TYPES)
+        for index in range(records):
+            sink.write(profile(index))
+        sink.close()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    return {'time': elapsed, 'throughput': records / elapsed, 'size': size}
+
+
+@click.command()
+@click.option('--records', default=100000, help="Number of profiles written.")
+@click.option('--format', 'formats', multiple=True, type=click.Choice(OutputFormat.names()), default=OutputFormat.names(), help="Formats to compare. Defaults to all of them.")
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help="Save the results to this JSON file.")
+def main(records, formats, output):
+    results = dict()
+    baseline = None
+    for format in formats:
+        try:
+            result = results[format] = measure(format, records)
+        except OutputFormatError as error:
+            click.echo(f"{format:10} skipped: {error.message}")
+            continue
+        baseline = baseline or format
+        click.echo(f"{format:10} {result['time']:7.2f}s {result['throughput']:9.0f} records/s {result['size'] / 1024 / 1024:8.2f} MB ({result['size'] / results[baseline]['size']:.0%} of {baseline})")
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""Benchmark of the getinfo, hashtag and posts pipelines on synthetic data.
+
+Runs the real click commands with the :class:`SyntheticClient` of the tests in
+place of :class:`IGClient`: an in-memory client which generates N profiles and
+posts instantly, so that the measures only cover instacli's own work (filtering,
+serialization, caching, journaling, output writing and hashtag analysis).
+
+Every scenario runs in a fresh interpreter, which reports its wall time,
+throughput, peak RSS and the time spent in every phase. Phase times are
+exclusive and summed over the worker threads; ``other`` is the rest of the
+wall time. The interpreters keep their cache and snapshots in a temporary data
+folder (``INSTACLI_DATA_DIR``).
+
+The commands scrape at most 10000 items. Larger sizes, up to 1M, lift the
+``--count`` limit of the command in the benchmark interpreter, and take a few
+minutes per scenario.
+
+Usage:
+    python benchmarks/pipelines.py --size 1000 --size 10000 --save pipelines.json
+    python benchmarks/pipelines.py --baseline pipelines.json --tolerance 0.2
+    python benchmarks/pipelines.py --size 1000000 --scenario getinfo --scenario getinfo-where
+"""
+from collections import defaultdict
+import contextlib, io, json, os, resource, subprocess, sys, tempfile, threading, time
+import click
+
+# Imports instacli from this checkout, and so do the interpreters started here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from fakes import SyntheticClient
+
+SCENARIOS = {
+    'getinfo': ['getinfo', '--followers'],
+    'getinfo-csv-onlypublic': ['getinfo', '--followers', '--csvfile', '--onlypublic'],
+    'getinfo-deepscrape': ['getinfo', '--followers', '--deepscrape', '--workers', '4', '--backend', 'http'],
+    'getinfo-where': ['getinfo', '--followers', '--where', 'not is_private and follower_count > 50000', '--workers', '4', '--backend', 'http'],
+    'hashtag-analyze': ['hashtag', '--analyze', '--deepscrape', '--min-occurrences', '5', '--workers', '4', '--backend', 'http'],
+    'posts-minlikes': ['posts', '--minlikes', '10', '--backend', 'http'],
+}
+# Highest --count of the commands, and of the benchmark
+MAX_COUNT = 10000
+MAX_SIZE = 1000000
+# Lifts the rate limits, which would otherwise dominate the measures
+UNLIMITED = [arg for action in ('pagination', 'profile', 'post', 'hashtag', 'media', 'follow') for arg in ('--limit', f'{action}=1000000')]
+
+
+class Phases():
+    def __init__(self) -> 'Phases':
+        """Exclusive time spent in the methods of every phase, summed over threads."""
+        self.times = defaultdict(float)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def wrap(self, owner, name:str, phase:str):
+        raw = owner.__dict__[name]
+        kind = type(raw) if isinstance(raw, (classmethod, staticmethod)) else None
+        func = raw.__func__ if kind else raw
+        phases = self
+
+        def wrapper(*args, **kwargs):
+            stack = getattr(phases._local, 'stack', None)
+            if stack is None:
+                stack = phases._local.stack = list()
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with phases._lock:
+                    phases.times[phase] += elapsed - children
+
+        setattr(owner, name, kind(wrapper) if kind else wrapper)
+
+
+def run_scenario(scenario:str, size:int) -> dict:
+    """Runs a scenario in this process. The instacli modules are imported here,
+    after the environment is set up."""
+    from instaclient.instagram.instaobject import InstaBaseObject
+    from instaclient.instagram.post import Post
+    from instacli.models import EntityCache, HashtagAnalytics, Journal, OutputSink, RateLimiter
+    import instacli.models.igclient as igclient
+    from instacli.instacli import instacli
+
+    folder = os.environ['INSTACLI_OUTPUT_PATH']
+    SyntheticClient.size = size
+    if size > MAX_COUNT:
+        command = instacli.get_command(None, SCENARIOS[scenario][0])
+        for param in command.params:
+            if param.name == 'count':
+                param.type = click.IntRange(1, MAX_SIZE)
+    igclient.IGClient = SyntheticClient
+
+    phases = Phases()
+    for name in ('_request', 'get_profile', 'get_post', 'get_hashtag', 'get_hashtag_posts'):
+        phases.wrap(SyntheticClient, name, 'fetch')
+    phases.wrap(InstaBaseObject, 'to_dict', 'serialize')
+    phases.wrap(Post, 'to_dict', 'serialize')
+    for name in ('write', 'flush', 'close'):
+        phases.wrap(OutputSink, name, 'write')
+    for name in ('record', 'sync'):
+        phases.wrap(Journal, name, 'journal')
+    for name in ('get', 'put'):
+        phases.wrap(EntityCache, name, 'cache')
+    for name in ('extract', 'add', 'set_tag', 'engagement', 'related', 'pairs', 'most_common'):
+        phases.wrap(HashtagAnalytics, name, 'analytics')
+    phases.wrap(RateLimiter, 'wait', 'ratelimit')
+
+    args = SCENARIOS[scenario] + ['--login', 'bench', '--password', 'bench', '--target', 'bench', '--count', str(size), '--output', folder] + UNLIMITED
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        code = instacli.main(args=['--local'] + args, prog_name='instacli', standalone_mode=False)
+    elapsed = time.perf_counter() - start
+    if code:
+        raise click.ClickException(f"{scenario} exited with {code}: {output.getvalue()[-500:]}")
+
+    times = dict(phases.times)
+    times['other'] = max(0.0, elapsed - sum(times.values()))
+    return {
+        'size': size,
+        'time': elapsed,
+        'throughput': size / elapsed,
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'phases': {phase: round(seconds, 4) for phase, seconds in sorted(times.items())},
+    }
+
+
+def measure(scenario:str, size:int) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        output = os.path.join(folder, 'output')
+        os.mkdir(output)
+        environment = dict(os.environ, INSTACLI_DRIVER_PATH=sys.executable, INSTACLI_OUTPUT_PATH=output, INSTACLI_DATA_DIR=os.path.join(folder, 'data'), INSTACLI_LOGGING='false')
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', scenario, '--size', str(size)],
+            capture_output=True, text=True, env=environment, cwd=folder)
+    if process.returncode:
+        raise click.ClickException(f"{scenario} with {size} items failed:\n{process.stderr or process.stdout}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+@click.command()
+@click.option('--size', 'sizes', multiple=True, type=click.IntRange(1, MAX_SIZE), default=[1000, 10000], help="Number of synthetic profiles and posts. Can be repeated.")
+@click.option('--scenario', 'scenarios', multiple=True, type=click.Choice(list(SCENARIOS)), default=list(SCENARIOS), help="Scenarios to run. Defaults to all of them.")
+@click.option('--save', type=click.Path(dir_okay=False), default=None, help="Save the results to this JSON file.")
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), default=None, help="JSON results to compare with. Exits with 1 on a regression.")
+@click.option('--tolerance', default=0.2, help="Fraction of the baseline throughput a scenario may lose, or of its peak RSS it may add.")
+@click.option('--child', default=None, hidden=True)
+def main(sizes, scenarios, save, baseline, tolerance, child):
+    if child:
+        click.echo(json.dumps(run_scenario(child, sizes[0])))
+        return
+
+    previous = dict()
+    if baseline:
+        with open(baseline, 'r') as file:
+            previous = json.load(file)
+
+    results = dict()
+    regressions = list()
+    for scenario in scenarios:
+        for size in sizes:
+            name = f'{scenario}@{size}'
+            result = results[name] = measure(scenario, size)
+            phases = ', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in result['phases'].items() if seconds >= 0.005)
+            line = f"{name:32} {result['time']:7.2f}s {result['throughput']:9.0f} items/s {result['peak_rss'] / 1024 / 1024:7.1f} MB  ({phases})"
+            base = previous.get(name)
+            if base:
+                change = result['throughput'] / base['throughput'] - 1
+                line += f"  {change:+.0%} vs baseline"
+                if change < -tolerance or result['peak_rss'] > base['peak_rss'] * (1 + tolerance):
+                    regressions.append(name)
+            click.echo(line)
+
+    if save:
+        with open(save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if regressions:
+        click.secho(f"Regressed: {', '.join(regressions)}", fg='red')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark of the memory of the users getinfo keeps for the deep scrape.
+
+Builds the thin users of a followers list as instaclient :class:`Profile`
+objects and as :class:`ProfileRecord`, each kind in a new interpreter, and
+reports the resident memory they add per 100k users, and the time to filter
+and serialize them. Exits with 1 if the records take more than ``--target``.
+
+Usage:
+    python benchmarks/records.py --users 100000
+    python benchmarks/records.py --target 55
+"""
+import json, os, subprocess, sys
+import click
+
+# Imports instacli from this checkout, and so do the interpreters started here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+
+SCRIPT = '''
+import gc, json, sys, time
+from instaclient.instagram.profile import Profile
+from instacli.models.predicate import Predicate
+from instacli.models.records import ProfileRecord
+from instacli.models.resources import tree_rss
+import os
+
+kind, users = sys.argv[1], int(sys.argv[2])
+client = object()
+
+
+def user(index):
+    # Fields of a page of followers, with strings of the usual length
+    return dict(id=str(40000000000 + index), viewer='viewer', username=f'user.name_{index:08}', name=f'User Name {index}',
+        is_private=index % 3 == 0, is_verified=index % 50 == 0, follows_viewer=False, followed_by_viewer=False,
+        requested_by_viewer=False, profile_pic_url=f'https://scontent.cdninstagram.com/v/t51.2885-19/{index:012}_n.jpg?_nc_ht=scontent&oh=00_{index:032x}')
+
+
+gc.collect()
+before = tree_rss(os.getpid())
+start = time.perf_counter()
+if kind == 'profile':
+    items = [Profile(client=client, **user(index)) for index in range(users)]
+else:
+    items = [ProfileRecord(**user(index)) for index in range(users)]
+built = time.perf_counter() - start
+gc.collect()
+memory = tree_rss(os.getpid()) - before
+
+predicate = Predicate('not is_private and is_verified', ProfileRecord.FIELDS)
+start = time.perf_counter()
+if kind == 'profile':
+    matched = sum(1 for item in items if predicate(vars(item)))
+    size = sum(len(json.dumps(item.to_dict())) for item in items)
+else:
+    matched = sum(1 for item in items if predicate(item))
+    size = sum(len(json.dumps(item.to_dict())) for item in items)
+used = time.perf_counter() - start
+print(json.dumps({'memory': memory, 'built': built, 'used': used, 'matched': matched, 'bytes': size}))
+'''
+
+
+def measure(kind:str, users:int) -> dict:
+    process = subprocess.run([sys.executable, '-c', SCRIPT, kind, str(users)], capture_output=True, text=True, check=True)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+@click.command()
+@click.option('--users', default=100000, help="Number of users built of each kind.")
+@click.option('--target', default=55.0, help="Highest memory in MB per 100k records.")
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help="Save the results to this JSON file.")
+def main(users, target, output):
+    results = dict()
+    for kind in ('profile', 'record'):
+        result = results[kind] = measure(kind, users)
+        result['per_100k'] = result['memory'] / users * 100000 / 1024 / 1024
+        click.echo(f"{kind:8} {result['per_100k']:6.1f} MB per 100k, built in {result['built']:5.2f}s, "
+            f"filtered and serialized in {result['used']:5.2f}s")
+    click.echo(f"records  {results['record']['per_100k'] / results['profile']['per_100k']:.2f}x the memory of profiles")
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if results['record']['per_100k'] > target:
+        click.secho(f"Records take more than {target} MB per 100k users", fg='red')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
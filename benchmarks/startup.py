@@ -0,0 +1,93 @@
+"""Benchmark of the cold start of every instacli command.
+
+Every command is run with ``--help`` in a new interpreter, which measures
+the time to import instacli and resolve the command, and the number of
+modules it loads. ``settings`` runs for real, as it only prints them.
+
+Usage:
+    python benchmarks/startup.py --runs 5 --save startup.json
+    python benchmarks/startup.py --baseline startup.json --tolerance 0.25
+"""
+import json, os, statistics, subprocess, sys
+import click
+
+# Imports instacli from this checkout, and so do the interpreters started here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+
+COMMANDS = [
+    ['--help'],
+    ['settings'],
+    ['getinfo', '--help'],
+    ['hashtag', '--help'],
+    ['posts', '--help'],
+    ['follow', '--help'],
+    ['diff', '--help'],
+    ['serve', '--help'],
+    ['batch', '--help'],
+]
+
+SCRIPT = '''
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+from instacli.instacli import instacli
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        instacli.main(args=sys.argv[1:], prog_name='instacli', standalone_mode=False)
+    except SystemExit:
+        pass
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('instaclient', 'selenium', 'requests', 'webdrivermanager') if name in sys.modules]
+print(json.dumps({'time': elapsed, 'modules': len(sys.modules), 'heavy': heavy}))
+'''
+
+
+def measure(args, runs:int) -> dict:
+    samples = list()
+    for _ in range(runs):
+        process = subprocess.run([sys.executable, '-c', SCRIPT] + args, capture_output=True, text=True, check=True)
+        samples.append(json.loads(process.stdout.strip().splitlines()[-1]))
+    return {
+        'time': statistics.median(sample['time'] for sample in samples),
+        'modules': samples[-1]['modules'],
+        'heavy': samples[-1]['heavy'],
+    }
+
+
+@click.command()
+@click.option('--runs', default=5, help="Cold starts per command. The median time is reported.")
+@click.option('--save', type=click.Path(dir_okay=False), default=None, help="Save the results to this JSON file.")
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), default=None, help="JSON results to compare with. Exits with 1 on a regression.")
+@click.option('--tolerance', default=0.25, help="Fraction of the baseline time or modules a command may exceed.")
+def main(runs, save, baseline, tolerance):
+    previous = dict()
+    if baseline:
+        with open(baseline, 'r') as file:
+            previous = json.load(file)
+
+    results = dict()
+    regressions = list()
+    for args in COMMANDS:
+        name = ' '.join(args)
+        result = results[name] = measure(args, runs)
+        line = f"{name:18} {result['time'] * 1000:8.1f} ms {result['modules']:6} modules"
+        if result['heavy']:
+            line += f"  loads {', '.join(result['heavy'])}"
+        base = previous.get(name)
+        if base:
+            line += f"  (baseline {base['time'] * 1000:.1f} ms, {base['modules']} modules)"
+            if result['time'] > base['time'] * (1 + tolerance) or result['modules'] > base['modules'] * (1 + tolerance):
+                regressions.append(name)
+        click.echo(line)
+
+    if save:
+        with open(save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if regressions:
+        click.secho(f"Regressed: {', '.join(regressions)}", fg='red')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
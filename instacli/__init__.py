@@ -2,10 +2,24 @@ import os, logging
 
 BASE_DIR = f'{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}/instacli'
 PROGRESS_BAR = None
+
+
+def data_dir() -> str:
+    """Folder of the data instacli keeps between runs, like the cache and the
+    snapshots: ``INSTACLI_DATA_DIR``, or the user data folder of the platform."""
+    folder = os.environ.get('INSTACLI_DATA_DIR')
+    if not folder:
+        if os.name == 'nt':
+            root = os.environ.get('LOCALAPPDATA') or os.environ.get('APPDATA') or os.path.expanduser('~')
+        else:
+            root = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+        folder = os.path.join(root, 'instacli')
+    return folder
+
 SCRAPED_LEN = 0
 
 from instacli.models.settings import Settings
-settings = Settings()
+settings = Settings.get()
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 
@@ -0,0 +1,79 @@
+import json, time
+import click
+from instacli.models import BatchJob, BatchRunner, ManifestError, SessionPool, Settings, Telemetry, load_manifest
+from instacli.instacli import invoke_command
+from .common import chromedriver, fail, run_summary
+
+
+# Commands which can be run by `instacli batch`
+BATCH_COMMANDS = ('getinfo', 'hashtag', 'posts', 'follow', 'unfollow')
+
+
+@click.command()
+@click.option('--manifest', required=True, type=click.Path(exists=True, dir_okay=False), help="JSON or YAML file with the accounts and the jobs of the batch.")
+@click.option('--retries', required=False, type=click.IntRange(0, 10), default=None, help="Number of retries of a failed job. Defaults to the retries of the manifest, or 1.")
+@click.option('--output', type=click.Path(exists=True, dir_okay=True), help="The path to the folder where you wish the run report to be saved to.")
+def batch(manifest, retries, output):
+    """Run the jobs of a manifest over a pool of accounts
+
+    The manifest lists the "accounts" (login, password or password_env, quota,
+    sessions) and the "jobs" (command and its options, e.g. {"command": "getinfo",
+    "target": "user", "followers": true, "count": 100}). Options in "defaults"
+    apply to every job, or to the jobs of a command if nested under its name.
+
+    Jobs are assigned to the accounts in round-robin order, within the quota and
+    the concurrent sessions of every account, and failed jobs are retried on
+    another account. A report with the timings of every job is saved at the end.
+    """
+    if not output and not Settings.get().output_path:
+        fail("No output specified in command nor in settings. Please specify it with --output")
+    output = output or Settings.get().output_path
+
+    try:
+        accounts, jobs, options = load_manifest(manifest)
+    except ManifestError as error:
+        fail(error.message)
+    unknown = [job.name for job in jobs if job.command not in BATCH_COMMANDS]
+    if unknown:
+        fail(f"These jobs can't be run in a batch: {', '.join(unknown)}. Use one of {', '.join(BATCH_COMMANDS)}")
+    if not chromedriver():
+        return
+
+    if retries is None:
+        retries = options.get('retries', 1)
+    timestamp = int(time.time())
+    click.secho(f"Running {len(jobs)} jobs with {len(accounts)} accounts", fg='green')
+
+    def finished(job:BatchJob):
+        progress.count(job.status)
+        progress.advance()
+        progress.telemetry.clear()
+        if not job.attempts:
+            click.secho(f"{job.name}: skipped, no account has quota left", fg='yellow')
+            return
+        attempt = job.attempts[-1]
+        color = 'green' if job.status == 'succeeded' else 'red'
+        click.secho(f"{job.name}: {job.status} with {attempt['account']} in {attempt['duration']:.1f}s ({len(job.attempts)} attempts)", fg=color)
+
+    # Sessions are kept logged in between the jobs of an account
+    SessionPool.active = SessionPool(max(account.sessions for account in accounts))
+    start = time.perf_counter()
+    try:
+        with Telemetry.phase('jobs', total=len(jobs), unit='jobs') as progress:
+            runner = BatchRunner(accounts, invoke_command, retries)
+            results = runner.run(jobs, callback=finished)
+    finally:
+        SessionPool.active.close()
+        SessionPool.active = None
+    report = runner.report(results, time.perf_counter() - start)
+
+    filename = f'{output}/{timestamp}-batch-report.json'
+    with open(filename, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    click.secho(f"\n{report['succeeded']} succeeded, {report['failed']} failed, {report['skipped']} skipped in {report['elapsed']:.1f}s. Report saved to {filename}", fg='green' if not report['failed'] else 'yellow')
+    for login, usage in report['accounts'].items():
+        click.echo(f"{login}: {usage['jobs']} jobs" + (f" of {usage['quota']}" if usage['quota'] is not None else ''))
+    run_summary()
+    if report['failed'] or report['skipped']:
+        click.get_current_context().exit(1)
@@ -0,0 +1,285 @@
+import os, sys, time
+import click
+from instacli.models.ratelimiter import RateLimits
+from instacli.models.settings import Settings
+
+
+def chromedriver():
+    settings:Settings = Settings.get()
+    if not settings.driver_path:
+        result = click.confirm("Do you wish to install the appropriate Chromedriver? (Make sure to have Chrome installed first)", default=True, abort=True)
+
+        try:
+            from webdrivermanager import ChromeDriverManager
+            path = ChromeDriverManager().download_and_install()[0]
+            settings.set_driver_path(str(path))
+
+            return True
+        except:
+            click.secho("There was an issue when installing the chromedriver. Please try again or specify the path for a custom chromedriver with: instacli settings -dp [PATH TO CHROMEDRIVER]", fg='red')
+            return False
+    return True
+
+
+class Duration(click.ParamType):
+    name = 'duration'
+    UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, (int, float)):
+            return value
+        try:
+            unit = value[-1].lower()
+            if unit in self.UNITS:
+                return float(value[:-1]) * self.UNITS[unit]
+            return float(value)
+        except (ValueError, IndexError):
+            self.fail(f"{value} is not a valid duration. Use seconds or a number followed by s, m, h or d", param, ctx)
+
+
+DURATION = Duration()
+
+
+class RateLimit(click.ParamType):
+    name = 'action=rate'
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, tuple):
+            return value
+        action, _, rate = value.partition('=')
+        if action not in RateLimits.DEFAULTS:
+            self.fail(f"{action} is not a valid action. Use one of {', '.join(RateLimits.DEFAULTS)}", param, ctx)
+        try:
+            rate = float(rate)
+        except ValueError:
+            rate = 0
+        if rate <= 0:
+            self.fail(f"{value} is not a valid rate. Use an action followed by = and the requests per second, e.g. profile=1.5", param, ctx)
+        return action, rate
+
+
+RATE_LIMIT = RateLimit()
+
+
+def fail(message:str):
+    """Prints an error and exits with status 1, so that scripts, the daemon and batch runs can detect it."""
+    click.secho(message, fg='red')
+    click.get_current_context().exit(1)
+
+
+def output_format(name:str):
+    """Returns the :class:`OutputFormat` of a name, or exits if it isn't available."""
+    from instacli.models.sink import OutputFormat, OutputFormatError
+    try:
+        return OutputFormat.get(name)
+    except OutputFormatError as error:
+        fail(error.message)
+
+
+def run_summary(limits:RateLimits=None):
+    from instacli.models.igclient import IGClient
+    stats = IGClient.stats
+    if stats.logins or stats.restored or stats.stale:
+        click.echo(f"Logins - {stats}")
+    # Clients in place of IGClient, as in the benchmarks, may not track a browser
+    browser = getattr(IGClient, 'browser', None)
+    if browser and browser.pages:
+        click.echo(f"Browser - {browser}")
+    if limits and repr(limits):
+        click.echo(f"Rates - {limits}")
+
+
+def new_client(backend:str=None):
+    """A new client, or a warm session of the account when running inside ``instacli serve``.
+
+    Args:
+        backend (str, optional): Backend of the read requests of the client,
+            see :class:`FetchBackend`. Defaults to the Selenium one.
+    """
+    from instacli.models.daemon import SessionPool
+    if SessionPool.active:
+        return SessionPool.active.session(backend)
+    from instacli.models.igclient import IGClient
+    return IGClient(backend)
+
+
+def start_profiling(ctx:click.Context, trace:bool, cprofile:bool):
+    """Profiles the command of ``ctx`` until it exits.
+
+    Args:
+        ctx (click.Context): Context of the instacli group.
+        trace (bool): Trace the phases, remote calls and writes of the command
+            and save them as a Chrome trace, then print their timings.
+        cprofile (bool): Profile the functions called by the command with
+            cProfile and save the stats, for pstats or snakeviz.
+    """
+    from instacli.models.tracer import Tracer
+    settings:Settings = Settings.get()
+    folder = settings.output_path if settings.output_path and os.path.isdir(settings.output_path) else os.getcwd()
+    name = f'{int(time.time())}-{ctx.invoked_subcommand}'
+
+    if cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def save_stats():
+            profiler.disable()
+            path = os.path.join(folder, f'{name}.pstats')
+            profiler.dump_stats(path)
+            click.secho(f"cProfile stats saved to {path}. Read them with: python -m pstats {path}", fg='blue', err=True)
+        ctx.call_on_close(save_stats)
+
+    if trace:
+        tracer = Tracer.active = Tracer()
+
+        def save_trace():
+            Tracer.active = None
+            path = os.path.join(folder, f'{name}.trace.json')
+            tracer.save(path)
+            click.echo(f"{'Span':24} {'Calls':>7} {'p50':>9} {'p95':>9} {'Total':>9} {'Bytes':>10}", err=True)
+            for row in tracer.summary():
+                click.echo(f"{row['name']:24} {row['count']:7} {row['p50'] * 1000:7.1f}ms {row['p95'] * 1000:7.1f}ms {row['total']:8.2f}s {row['bytes']:10}", err=True)
+            click.secho(f"Trace saved to {path}. Open it in https://ui.perfetto.dev or chrome://tracing", fg='blue', err=True)
+        ctx.call_on_close(save_trace)
+
+
+def start_progress(ctx:click.Context, mode:str, path:str=None):
+    """Publishes the progress of the command of ``ctx`` to the reporters of
+    ``mode`` until it exits.
+
+    Args:
+        ctx (click.Context): Context of the instacli group.
+        mode (str): ``bar`` on the terminal, ``json`` lines or ``none``.
+        path (str, optional): File the JSON lines are appended to, instead
+            of stdout. The bar is still shown unless ``mode`` is json or none.
+
+    When the JSON lines are written to stdout, the messages of the command
+    are written to stderr instead, so that stdout only holds the events.
+    """
+    from instacli.models.progress import BarReporter, JsonReporter, Telemetry
+    reporters = list()
+    stdout = None
+    stderr = click.get_text_stream('stderr')
+    if mode == Telemetry.BAR or (path and not mode and stderr.isatty()):
+        reporters.append(BarReporter(stderr))
+    if path:
+        reporters.append(JsonReporter(open(path, 'a', encoding='utf-8'), owned=True))
+    elif mode == Telemetry.JSON:
+        reporters.append(JsonReporter(click.get_text_stream('stdout')))
+        stdout, sys.stdout = sys.stdout, sys.stderr
+    telemetry = Telemetry.active = Telemetry(reporters, interval=1.0 if mode == Telemetry.JSON else 0.5)
+
+    def stop():
+        Telemetry.active = None
+        telemetry.close()
+        if stdout:
+            sys.stdout = stdout
+    ctx.call_on_close(stop)
+
+
+def run_shard(name:str, params:dict, log:str) -> int:
+    """Runs a command with ``params`` in a worker process of a sharded run,
+    writing its output to ``log``, and returns its exit code."""
+    import contextlib
+    from instacli.instacli import instacli
+    command = instacli.get_command(None, name)
+    with open(log, 'a', encoding='utf-8') as file, contextlib.redirect_stdout(file), contextlib.redirect_stderr(file):
+        try:
+            with click.Context(instacli, info_name='instacli') as ctx:
+                ctx.invoke(command, **params)
+            return 0
+        except click.exceptions.Exit as error:
+            return error.exit_code
+        except click.ClickException as error:
+            error.show()
+            return error.exit_code
+        except click.Abort:
+            click.echo("Aborted!")
+            return 1
+        except Exception as error:
+            click.echo(f"Error: {error}")
+            return 1
+
+
+def read_targets(path:str) -> list:
+    """Usernames of a targets file, one per line. Blank lines, lines starting
+    with # and repeated usernames are skipped."""
+    targets = list()
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            target = line.strip().lstrip('@')
+            if target and not target.startswith('#') and target not in seen:
+                seen.add(target)
+                targets.append(target)
+    return targets
+
+
+def shard_targets(ctx:click.Context, targets:list, output:str, processes:int, max_rss:int, format:str, columns:list, types:dict, name:str, **params):
+    """Runs the command of ``ctx`` for every target over a pool of worker
+    processes, merges the outputs of the shards in one file and prints the
+    timings of every shard.
+
+    Args:
+        ctx (click.Context): Context of the command.
+        targets (list): Usernames of the targets.
+        output (str): Output folder.
+        processes (int): Number of worker processes.
+        max_rss (int): Highest memory in MB of the browser of a worker, or None.
+        format (str): Format of the merged output.
+        columns (list): Columns of the records of the command.
+        types (dict): Types of the columns, see :func:`column_types`.
+        name (str): Name of the merged output, after the timestamp.
+        **params: Parameters of the command which differ between the shards
+            and the sharded run, besides the target and the output.
+    """
+    from instacli.models import OutputSink, Shard, ShardRunner, Telemetry, Tracer
+    from instacli.models.progress import duration
+    timestamp = int(time.time())
+    folder = os.path.join(output, f'{timestamp}-shards')
+    shards = list()
+    for index, target in enumerate(targets):
+        # Shards save JSON Lines, which are merged once they finish
+        values = dict(ctx.params, target=target, targetsfile=None, output=os.path.join(folder, f'{index}-{target}'), format=OutputSink.JSONL, **params)
+        shards.append(Shard(index, ctx.info_name, target, values['output'], values))
+    processes = min(processes, len(shards))
+    click.secho(f"Scraping {len(shards)} targets with {processes} processes. Logs are saved in {folder}", fg='green')
+
+    def finished(shard:Shard):
+        progress.advance()
+        if shard.status != 'succeeded':
+            progress.count('failed')
+        progress.telemetry.clear()
+        color = 'green' if shard.status == 'succeeded' else 'red'
+        click.secho(f"{shard.name}: {shard.status} in {duration(shard.duration or 0)}", fg=color)
+
+    start = time.perf_counter()
+    runner = ShardRunner(processes, run_shard, max_rss)
+    with Tracer.span('shards', processes=processes), Telemetry.phase('shards', total=len(shards), unit='targets') as progress:
+        runner.run(shards, callback=finished)
+    elapsed = time.perf_counter() - start
+
+    filename = f'{output}/{timestamp}-{name}.{output_format(format).extension}'
+    sink = OutputSink(filename, format, columns=['target'] + columns, types=types)
+    counts = dict()
+    with Tracer.span('merge', Tracer.IO, shards=len(shards)):
+        for shard in shards:
+            counts[shard.index] = 0
+            for record in shard.records():
+                sink.write({'target': shard.target, **record})
+                counts[shard.index] += 1
+    sink.close()
+
+    click.echo(f"\n{'Shard':24} {'Status':10} {'Time':>8} {'PID':>7} {'Peak RSS':>9} {'Recycled':>8} {'Records':>8}")
+    for shard in shards:
+        peak = f'{shard.peak / 1024 / 1024:.0f} MB' if shard.peak is not None else '-'
+        click.echo(f"{shard.name:24} {shard.status:10} {duration(shard.duration or 0):>8} {shard.pid or '-':>7} {peak:>9} {shard.recycled:8} {counts[shard.index]:8}")
+    busy = sum(shard.duration or 0 for shard in shards)
+    click.echo(f"{len(shards)} shards in {duration(elapsed)}, {duration(busy)} of work ({busy / elapsed if elapsed else 0:.1f}x parallelism)")
+
+    failed = [shard for shard in shards if shard.status != 'succeeded']
+    click.secho(f"\n{sink.written} records saved to {filename}", fg='green' if not failed else 'yellow')
+    if failed:
+        click.secho(f"{len(failed)} targets failed, see their logs: {', '.join(shard.log for shard in failed)}", fg='red')
+        ctx.exit(1)
@@ -0,0 +1,65 @@
+import json, time
+import click
+from instacli.models.snapshots import SnapshotStore
+from .common import fail
+
+
+def when(taken:float) -> str:
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(taken))
+
+
+@click.command()
+@click.option('--target', required=True, type=click.STRING, help="The username of the user whose snapshots are compared.")
+@click.option('--following', is_flag=True, default=False, help="Compare the snapshots of the user's following instead of followers.")
+@click.option('--base', required=False, type=click.INT, default=None, help="Time of the snapshot to compare with, as listed by --list. Defaults to the one before the latest.")
+@click.option('--list', 'listing', is_flag=True, default=False, help="List the snapshots of the user instead.")
+@click.option('--output', type=click.Path(exists=True, dir_okay=True), default=None, help="Also save the gained and lost users in a JSON file in this folder.")
+def diff(target, following, base, listing, output):
+    """Show the followers gained and lost between two snapshots
+
+    A snapshot of the followers or following of a user is saved every time
+    getinfo scrapes the whole list, or with --incremental. The latest snapshot
+    is compared with the one before it, or with the one taken at --base.
+    """
+    kind = 'following' if following else 'followers'
+    store = SnapshotStore()
+    times = store.times(target, kind)
+
+    if listing:
+        if not times:
+            click.echo(f"No snapshots of the {kind} of {target}.")
+        for taken in times:
+            snapshot = store.load(target, kind, taken)
+            click.echo(f"{taken}  {when(taken)}  {len(snapshot.users)} {kind}")
+        return
+
+    if len(times) < 2:
+        fail(f"Found {len(times)} snapshots of the {kind} of {target}, at least 2 are needed. Take one with: instacli getinfo --{kind} --target {target}")
+    if base is not None and base not in times:
+        fail(f"No snapshot of the {kind} of {target} was taken at {base}. Use one of: {', '.join(map(str, times))}")
+
+    latest = store.load(target, kind, times[-1])
+    previous = store.load(target, kind, base if base is not None else times[-2])
+    gained, lost = latest.diff(previous)
+    usernames = {**previous.usernames, **latest.usernames}
+
+    click.secho(f"{target}: {len(previous.users)} {kind} on {when(previous.taken)}, {len(latest.users)} on {when(latest.taken)}", fg='blue')
+    click.secho(f"Gained {len(gained)}", fg='green')
+    for id in gained:
+        click.echo(f"  + {usernames[id]}")
+    click.secho(f"Lost {len(lost)}", fg='red')
+    for id in lost:
+        click.echo(f"  - {usernames[id]}")
+    if latest.unverified:
+        click.secho(f"{latest.unverified} more lost, which only a full scrape can identify: instacli getinfo --{kind} without --incremental", fg='yellow')
+
+    if output:
+        filename = f'{output}/{int(latest.taken)}-{target}-{kind}-diff.json'
+        with open(filename, 'w') as file:
+            json.dump({
+                'target': target, 'kind': kind, 'from': previous.taken, 'to': latest.taken,
+                'gained': [{'id': str(id), 'username': usernames[id]} for id in gained],
+                'lost': [{'id': str(id), 'username': usernames[id]} for id in lost],
+                'unverified': latest.unverified,
+            }, file)
+        click.secho(f"Differences saved to {filename}", fg='green')
@@ -0,0 +1,155 @@
+import json, time
+import click
+from instaclient.errors.common import FollowRequestSentError, InvalidUserError
+from instacli.models import RateLimits, Settings, Telemetry, Tracer
+from .common import RATE_LIMIT, chromedriver, new_client, run_summary
+
+
+@click.command()
+@click.option('--login', type=click.STRING, help='The instagram username to use for the scrape.', required=True)
+@click.option('--password', type=click.STRING, hide_input=True, help="The password of the IG account you are using for the scrape.", required=True)
+@click.option('--target', required=True, type=click.STRING, help="The username of the user to scrape.")
+@click.option('--output', type=click.Path(exists=True, dir_okay=True), help="The path to the folder where you wish the JSON output to be saved to.")
+@click.option('--limit', 'limit', multiple=True, type=RATE_LIMIT, help="Highest requests per second of an action, e.g. --limit profile=1.5. The rate adapts below it. Actions: pagination, profile, post, hashtag, media, follow.")
+def follow(login, password, target, output, limit):
+    """Follow a specified user
+    
+    The response of this action will be saved in a dedicated JSON file in the 
+    specified output folder.
+
+    The output will be saved in a .json file inside the folder specified by ``--output``.
+    The naming of the .json file will be consistent with the following format:
+    ``timestamp-target-action.json``, where ``timestamp`` is the timestamp of the launch
+    of the command, ``target`` is the user you are getting info on and ``action`` will be ``follow``.
+    """
+    if not chromedriver():
+        return
+
+    timestamp = int(time.time())
+    settings = Settings.get()
+    if not settings.driver_path:
+        click.echo("No path for the chromedriver defined. Please define it using: instacli settings -dp [...]")
+        return
+
+    if not output and not settings.output_path:
+        click.echo("No output specified in command nor in settings. Please specify it with --output")
+        return
+
+    if not output:
+        output = settings.output_path
+
+    limits = RateLimits(dict(limit))
+    client = new_client()
+    with Tracer.span('login'):
+        client.login(login, password)
+    with Telemetry.phase('follow', total=1, unit='users', target=target) as progress:
+        try:
+            profile = limits.call(RateLimits.PROFILE, client.get_profile, target)
+            if not profile:
+                raise InvalidUserError(target)
+            try:
+                with Tracer.span('follow', Tracer.REMOTE, target=target):
+                    limits.call(RateLimits.FOLLOW, profile.follow)
+            except FollowRequestSentError:
+                pass
+            user = profile.to_dict()
+            success = True
+            message = None
+        except Exception as error:
+            success = False
+            user = target
+            try:
+                message = error.message
+            except:
+                message = 'Uncaught error. Check terminal logs'
+        if success:
+            progress.advance()
+        else:
+            progress.count('failed')
+    client.disconnect()
+
+    
+    with open(f'{output}/{timestamp}-{target}-follow.json', 'w') as file:
+        json.dump({'timestamp': timestamp, 'action': 'follow', 'success': success, 'target': user, 'message': message}, file)
+
+    if success:
+        click.secho(f"The user {target} has been followed. Response can be found in {output}/{timestamp}-{target}-follow.json", fg='green')
+    else:
+        click.secho(f"An exception was raised when following the user {target}. Response can be found in {output}/{timestamp}-{target}-follow.json", fg='red')
+    run_summary(limits)
+    if not success:
+        click.get_current_context().exit(1)
+
+
+
+@click.command()
+@click.option('--login', type=click.STRING, help='The instagram username to use for the scrape.', required=True)
+@click.option('--password', type=click.STRING, hide_input=True, help="The password of the IG account you are using for the scrape.", required=True)
+@click.option('--target', required=True, type=click.STRING, help="The username of the user to scrape.")
+@click.option('--output', type=click.Path(exists=True, dir_okay=True), help="The path to the folder where you wish the JSON output to be saved to.")
+@click.option('--limit', 'limit', multiple=True, type=RATE_LIMIT, help="Highest requests per second of an action, e.g. --limit profile=1.5. The rate adapts below it. Actions: pagination, profile, post, hashtag, media, follow.")
+def unfollow(login, password, target, output, limit):
+    """Unfollow a specified user
+    
+    The response of this action will be saved in a dedicated JSON file in the 
+    specified output folder.
+
+    The output will be saved in a .json file inside the folder specified by ``--output``.
+    The naming of the .json file will be consistent with the following format:
+    ``timestamp-target-action.json``, where ``timestamp`` is the timestamp of the launch
+    of the command, ``target`` is the user you are getting info on and ``action`` will be ``unfollow``.
+    """
+    if not chromedriver():
+        return
+
+    timestamp = int(time.time())
+    settings = Settings.get()
+    if not settings.driver_path:
+        click.echo("No path for the chromedriver defined. Please define it using: instacli settings -dp [...]")
+        return
+
+    if not output and not settings.output_path:
+        click.echo("No output specified in command nor in settings. Please specify it with --output")
+        return
+
+    if not output:
+        output = settings.output_path
+
+    limits = RateLimits(dict(limit))
+    client = new_client()
+    with Tracer.span('login'):
+        client.login(login, password)
+    with Telemetry.phase('unfollow', total=1, unit='users', target=target) as progress:
+        try:
+            profile = limits.call(RateLimits.PROFILE, client.get_profile, target)
+            if not profile:
+                raise InvalidUserError(target)
+            with Tracer.span('unfollow', Tracer.REMOTE, target=target):
+                limits.call(RateLimits.FOLLOW, profile.unfollow)
+            user = profile.to_dict()
+            success = True
+            message = None
+        except Exception as error:
+            success = False
+            user = target
+            try:
+                message = error.message
+            except:
+                message = 'Uncaught error. Check terminal logs'
+        if success:
+            progress.advance()
+        else:
+            progress.count('failed')
+    client.disconnect()
+
+    
+    with open(f'{output}/{timestamp}-{target}-unfollow.json', 'w') as file:
+        json.dump({'timestamp': timestamp, 'action': 'unfollow', 'success': success, 'target': user, 'message': message}, file)
+
+    if success:
+        click.secho(f"The user {target} has been unfollowed. Response can be found in {output}/{timestamp}-{target}-unfollow.json", fg='green')
+    else:
+        click.secho(f"An exception was raised when unfollowing the user {target}. Response can be found in {output}/{timestamp}-{target}-unfollow.json", fg='red')
+    run_summary(limits)
+    if not success:
+        click.get_current_context().exit(1)
@@ -0,0 +1,364 @@
+from typing import List
+import logging, os, time
+import click
+from instaclient.errors.common import InstaClientError, InvalidUserError
+from instacli.models import FetchBackend, CachedClient, EntityCache, FollowIterator, IncrementalScan, JobNotFoundError, Journal, OutputFormat, OutputSink, Predicate, PredicateError, ProfileRecord, RateLimits, Settings, Snapshot, SnapshotStore, Telemetry, Tracer, WorkerPool
+from instacli.models.igclient import IGClient
+from .common import DURATION, RATE_LIMIT, chromedriver, fail, new_client, output_format, read_targets, run_summary, shard_targets
+from .scraping import PROFILE_COLUMNS, PROFILE_TYPES, cache_summary
+
+
+@click.command()
+@click.option('--login', type=click.STRING, help='The instagram username to use for the scrape.', required=True)
+@click.option('--password', type=click.STRING, hide_input=True, help="The password of the IG account you are using for the scrape.", required=True)
+@click.option('--followers', is_flag=True, default=False, help="Use this flag to scrape the user's followers.")
+@click.option('--following', is_flag=True, default=False, help="Use this flag to scrape the user's following.")
+@click.option('--target', required=False, type=click.STRING, default=None, help="The username of the user to scrape.")
+@click.option('--targets-file', 'targetsfile', required=False, type=click.Path(exists=True, dir_okay=False), default=None, help="File with the usernames of the users to scrape, one per line, instead of --target. The targets are scraped in parallel by worker processes and their users are merged in one output with a target column.")
+@click.option('--processes', required=False, type=click.IntRange(1, 32), default=min(4, os.cpu_count() or 1), help="Number of worker processes scraping the targets of --targets-file, each with its own browser. Defaults to the number of cores, up to 4.")
+@click.option('--max-browser-rss', 'maxrss', required=False, type=click.IntRange(64, None), default=None, help="Memory limit in MB of the browser of a worker process of --targets-file. A browser which grew past it is restarted before the next target.")
+@click.option('--deepscrape', required=False, is_flag=True, default=False, help="Use this flag to deep scrape (will require more time)")
+@click.option('--count', required=True, type=click.IntRange(1, 10000), help="The amount of data to scrape.")
+@click.option('--cursor', type=click.STRING, help="GraphQL end cursor to resume the scrape with.", default=None)
+@click.option('--output', type=click.Path(exists=True, dir_okay=True), help="The path to the folder where you wish the JSON output to be saved to.")
+@click.option('--csvfile', required=False, is_flag=True, help="Will output the scraped data as a CSV file. Defaults to a JSON Lines file. Same as --format csv.")
+@click.option('--format', 'format', required=False, type=click.Choice(OutputFormat.names()), default=None, help="Format of the output files: jsonl, jsonl.gz, jsonl.zst, csv (UTF-8), csv-utf16 (tab separated, for Excel), parquet or arrow. Defaults to jsonl. zstd needs the zstandard package, parquet and arrow need pyarrow.")
+@click.option('--onlybusiness', required=False, is_flag=True, help="Scrape only business accounts" )
+@click.option('--onlyprivate', required=False, is_flag=True, help="Scrape only private accounts" )
+@click.option('--onlypublic', required=False, is_flag=True, help="Scrape only public accounts" )
+@click.option('--onlyverified', required=False, is_flag=True, help="Scrape only veridied accounts" )
+@click.option('--where', required=False, type=click.STRING, default=None, help="Scrape only the users matching this expression over their attributes, e.g. \"not is_private and is_verified and follower_count > 1000\". Supports and, or, not, ==, !=, <, <=, >, >=, in and not in. Users are deep scraped only if the expression needs it.")
+@click.option('--incremental', required=False, is_flag=True, default=False, help="Only scrape the users gained since the last snapshot of the list: the pagination stops once it reaches users which were already in it. Compare snapshots with instacli diff.")
+@click.option('--workers', required=False, type=click.IntRange(1, 16), default=1, help="Number of browser sessions used to deep scrape concurrently.")
+@click.option('--rate', required=False, type=click.FloatRange(0.01, 50), default=None, help="Maximum number of profiles deep scraped per second, shared by all workers. Same as --limit profile=RATE.")
+@click.option('--resume', required=False, type=click.STRING, default=None, help="Name of an interrupted job to resume. Use the same options as the interrupted command.")
+@click.option('--maxage', '--max-age', required=False, type=DURATION, default=None, help="Serve cached profiles, posts and hashtags younger than this age (e.g. 3600, 30m, 12h, 7d) instead of loading them again.")
+@click.option('--limit', 'limit', multiple=True, type=RATE_LIMIT, help="Highest requests per second of an action, e.g. --limit profile=1.5. The rate adapts below it. Actions: pagination, profile, post, hashtag, media, follow.")
+@click.option('--backend', required=False, type=click.Choice([FetchBackend.SELENIUM, FetchBackend.HTTP]), default=FetchBackend.SELENIUM, help="How profiles, posts, hashtags and pages are loaded: in the browser (selenium), or over pooled HTTP connections with the browser's session (http), which is faster and lets the workers share one browser.")
+def getinfo(login, password, followers, following, target, targetsfile, processes, maxrss, deepscrape, count, cursor, output, onlybusiness, onlyprivate, onlypublic, onlyverified, where, csvfile, format, incremental, workers, rate, resume, maxage, limit, backend):
+    """Scrape a user's followers or following
+    
+    The scraped users will be saved in a JSON Lines file, one user per line, as soon
+    as they are scraped. The last used cursor for the scraping pagination is
+    printed at the end and kept in the journal of the scrape. Use --format to
+    save them as compressed JSON Lines, CSV, Parquet or Arrow instead.
+
+    The output will be saved in a .jsonl file inside the folder specified by --output.
+    The naming of the .jsonl file will be consistent with the following format:
+    "timestamp-target-action-filter.jsonl", where "timestamp" is the timestamp of the launch
+    of the command, "target" is the user you are getting info on and action is defined by
+    the flags "--followers" or "--following"
+
+    The progress of the scrape is saved in a "timestamp-target-action-filter.journal"
+    file next to the output. If the scrape is interrupted, run the same command
+    again with "--resume timestamp-target-action-filter" to continue it.
+
+    The ids of the list are saved in a snapshot whenever it is scraped to the
+    end. With --incremental, the pagination stops at the first 50 consecutive
+    users of the last snapshot, as Instagram lists the most recent users first,
+    and only the gained users are saved.
+
+    With --targets-file, the followers or following of every user of the file
+    are scraped by a pool of worker processes, each with its own browser, and
+    merged in a "timestamp-targets-action-filter" output with a target column.
+    The output and the log of every target are kept in a "timestamp-shards" folder.
+
+    --where filters the users with an expression over the attributes of their
+    profile, which can be combined with the other filters. The parts of the
+    expression which only use the attributes listed with the followers (id,
+    username, name, is_private, is_verified...) are checked first, so that
+    only the users which may still match are deep scraped.
+    """
+    if not chromedriver():
+        return
+
+    # If verified, also public
+    # If business, also public
+
+    # NO onlybusiness + onlyprivate
+    # NO onlypublic + onlyprivate
+    # NO onlyverified + onlyprivate
+
+    # SI onlypublic + onlybusiness
+    # SI onlypublic + onlyverified
+
+    if bool(target) == bool(targetsfile):
+        fail("Specify the user to scrape with either --target or --targets-file")
+
+    if onlyprivate:
+        if onlybusiness or onlypublic or onlyverified:
+            fail('You can\' select --onlyprivate along with --onlypublic, --onlybusiness or --onlyverified')
+    
+    timestamp = int(time.time())
+    if not followers and not following:
+        click.echo("To execute this command you must insert the flags --following or --followers.")
+        return
+
+    settings = Settings.get()
+    if not settings.driver_path:
+        click.echo("No path for the chromedriver defined. Please define it using: instacli settings -dp [...]")
+        return
+
+    if not output and not settings.output_path:
+        click.echo("No output specified in command nor in settings. Please specify it with --output")
+        return
+
+    if not output:
+        output = settings.output_path
+
+    # FILTERS
+    if onlyprivate:
+        flag = 'onlyprivate'
+    elif onlypublic:
+        flag = 'onlypublic'
+    elif onlyverified:
+        flag = 'onlyverified'
+    else:
+        flag = 'all'
+
+    if onlybusiness:
+        flag = 'onlybusiness'
+    if where and flag == 'all':
+        flag = 'where'
+
+    conditions = list()
+    if onlyprivate:
+        conditions.append('is_private')
+    if onlypublic or onlybusiness:
+        conditions.append('not is_private')
+    if onlyverified:
+        conditions.append('is_verified')
+    if onlybusiness:
+        conditions.append('is_business_account')
+    if where:
+        try:
+            Predicate(where, PROFILE_COLUMNS)
+        except PredicateError as error:
+            fail(error.message)
+        conditions.append(f'({where})')
+    predicate = Predicate(' and '.join(conditions) or 'True', PROFILE_COLUMNS)
+
+    extension = FollowIterator.FOLLOWERS if followers else FollowIterator.FOLLOWING
+    # Users are deep scraped if asked, or if the filters need more than the listed attributes
+    deep = deepscrape or not predicate.decidable(FollowIterator.FIELDS)
+    format = format or (OutputSink.CSV if csvfile else OutputSink.JSONL)
+    filetype = output_format(format).extension
+    if targetsfile:
+        if resume or cursor:
+            fail("--resume and --cursor continue the scrape of a single target, they can't be used with --targets-file")
+        targets = read_targets(targetsfile)
+        if not targets:
+            fail(f"No targets in {targetsfile}")
+        shard_targets(click.get_current_context(), targets, output, processes, maxrss, format, PROFILE_COLUMNS, PROFILE_TYPES, f'targets-{extension}-{flag}')
+        return
+    params = dict(target=target, extension=extension, flag=flag, count=count, deep=deep, csvfile=csvfile, format=format)
+    if where:
+        params['where'] = where
+    if incremental:
+        if cursor:
+            fail("--incremental scrapes the list from its start, it can't be used with --cursor")
+        params['incremental'] = incremental
+    if resume:
+        try:
+            journal = Journal.load(output, resume)
+        except JobNotFoundError as error:
+            fail(error.message)
+        if not journal.check(**params):
+            fail(f"The options of this command don't match the ones of the job {resume}: {journal.params}")
+        if journal.last('finished'):
+            click.secho(f"The job {resume} is already finished.", fg='green')
+            return
+        job = resume
+    else:
+        job = f'{timestamp}-{target}-{extension}-{flag}'
+        # The cursor isn't checked on resume, the journal restores it
+        journal = Journal.create(output, job, **params, **({'cursor': cursor} if cursor else dict()))
+    # A scrape started at a cursor only sees the tail of the list
+    partial = bool(cursor or journal.params.get('cursor'))
+
+    # SNAPSHOT TO COMPARE WITH
+    snapshots = SnapshotStore()
+    previous = None
+    if resume and journal.last('base'):
+        previous = snapshots.load(target, extension, journal.last('base')['taken'])
+    elif incremental and not resume:
+        previous = snapshots.load(target, extension)
+        if previous:
+            journal.record('base', taken=int(previous.taken))
+        else:
+            click.secho(f"No snapshot of the {extension} of {target} yet, scraping the whole list", fg='yellow')
+    scan = IncrementalScan(previous or Snapshot(target, extension, list()))
+
+    filename = f'{output}/{job}.{filetype}'
+    # The journal is synced with the output, once per flushed batch of users
+    sink = OutputSink(filename, format, columns=PROFILE_COLUMNS, types=PROFILE_TYPES, append=bool(resume), on_flush=journal.sync)
+
+    cache = EntityCache()
+    limits = RateLimits(dict(limit))
+    if rate:
+        limits.rates.setdefault(RateLimits.PROFILE, rate)
+    client = CachedClient(new_client(backend), cache, maxage)
+    with Tracer.span('login'):
+        client.login(login, password)
+    client.set_logger_level(level=logging.WARNING)
+
+    # RESTORE CHECKPOINT
+    iterator = FollowIterator(client, target, extension, count, end_cursor=cursor, limits=limits)
+    users:List[ProfileRecord] = list()
+    written = 0
+    for page in journal.all('page'):
+        iterator.cursor = page['cursor']
+        iterator.finished = page['finished']
+        iterator.scraped = page['scraped']
+        iterator.seen.update(page['ids'])
+        for id, username in zip(page['ids'], page.get('usernames', page['ids'])):
+            scan.add(id, username)
+        written += page['written']
+        for data in page['todo']:
+            users.append(ProfileRecord(**data))
+    done = set()
+    for entry in journal.all('deepscraped'):
+        done.add(entry['id'])
+        written += entry['written']
+    if resume:
+        click.secho(f"Resuming {job}: {iterator.scraped} users scraped and {len(done)} deep scraped so far", fg='green')
+
+    # SOFT SCRAPE
+    try:
+        with Tracer.span('pagination', target=target, extension=extension), Telemetry.phase('pagination', total=count, unit='users', done=iterator.scraped, target=target) as progress:
+            for page in iterator.pages():
+                todo = list()
+                matched = 0
+                for user in page:
+                    scan.add(user.id, user.username)
+                    if previous and scan.known(user.id):
+                        continue
+                    matches = predicate.evaluate(user, FollowIterator.FIELDS)
+                    if matches is False:
+                        continue
+                    if deepscrape or matches is None:
+                        todo.append(user)
+                    else:
+                        sink.write(user)
+                        matched += 1
+                sink.flush()
+                users.extend(todo)
+                journal.record('page', cursor=iterator.cursor, finished=iterator.finished, scraped=iterator.scraped,
+                    ids=[user.id for user in page], usernames=[user.username for user in page], todo=[user.to_dict() for user in todo], written=matched)
+                progress.update(iterator.scraped)
+                progress.count('matched', matched)
+                if previous and scan.stopped:
+                    break
+    except Exception as error:
+        client.disconnect()
+        cache.close()
+        sink.close()
+        journal.close()
+        click.secho(f"\nError: {getattr(error, 'message', error)}", fg='red')
+        fail(f"Resume the scrape with --resume {job}")
+    newcursor = None if scan.stopped else iterator.cursor
+
+    # SAVE SNAPSHOT
+    if (iterator.finished or scan.stopped) and not partial and not journal.last('snapshot'):
+        profile = iterator.profile
+        total = None
+        if profile:
+            total = profile.follower_count if extension == FollowIterator.FOLLOWERS else profile.followed_count
+        snapshot = scan.snapshot(total)
+        snapshots.save(snapshot)
+        journal.record('snapshot', taken=int(snapshot.taken))
+        if previous:
+            gained, lost = snapshot.diff(previous)
+            message = f"\n{len(gained)} {extension} gained and {len(lost)} lost since {time.strftime('%Y-%m-%d %H:%M', time.localtime(previous.taken))}"
+            if snapshot.unverified:
+                message += f", {snapshot.unverified} more lost which only a full scrape can identify"
+            click.secho(message, fg='green')
+    elif incremental:
+        click.secho(f"\nThe list wasn't scraped up to known users, no snapshot was saved. Increase --count to reach them.", fg='yellow')
+
+
+    # DEEP SCRAPE
+    if deep:
+        try:
+            todo = [user for user in users if user.id not in done]
+            failed = list()
+            unavailable = list()
+            click.secho(f"\nStarting to deep scrape {len(todo)} users with {workers} workers")
+
+            def session():
+                worker = CachedClient(new_client(backend), cache, maxage)
+                worker.login(login, password)
+                worker.set_logger_level(level=logging.WARNING)
+                return worker
+
+            def refresh(worker:IGClient, user:ProfileRecord) -> ProfileRecord:
+                profile = worker.get_profile(user.username)
+                if not profile:
+                    raise InvalidUserError(user.username)
+                # Drops the client and the attribute dict of the profile
+                return ProfileRecord.from_profile(profile)
+
+            # Workers share the client if its backend doesn't need the browser
+            clients = [client] * workers if client.backend.concurrent else [client]
+            pool = WorkerPool(workers, factory=session, clients=clients, limiter=limits.get(RateLimits.PROFILE))
+            try:
+                with Tracer.span('deep scrape', workers=len(clients)), Telemetry.phase('deep scrape', total=len(todo), unit='users', target=target) as progress:
+                    for user, profile, error in pool.map(refresh, todo):
+                        progress.advance()
+                        if error:
+                            progress.count('failed')
+                            if isinstance(error, InstaClientError):
+                                # The profile doesn't exist anymore or can't be seen
+                                unavailable.append(user.username)
+                                journal.stage('deepscraped', id=user.id, written=0, error=str(getattr(error, 'message', error)))
+                                continue
+                            failed.append(user.username)
+                            profile = user
+
+                        # FILTER ON THE DEEP SCRAPED ATTRIBUTES
+                        keep = predicate.evaluate(profile, FollowIterator.FIELDS if profile is user else None) is True
+                        # Staged first, so that it's synced by the flush of the user
+                        journal.stage('deepscraped', id=user.id, written=int(keep))
+                        if keep:
+                            sink.write(profile)
+            finally:
+                pool.close()
+
+            for stats in pool.stats:
+                click.echo(f"\nWorker {stats.worker}: {stats.done} scraped, {stats.failed} failed ({stats.throughput:.2f} profiles/s)", nl=False)
+
+            message = f"\nFinished deep scraping."
+            if (len(failed) > 0):
+                message += f" {len(failed)} failed - fell back to thin scrape data"
+            click.secho(message, fg='green')
+            if unavailable:
+                click.secho(f"{len(unavailable)} users could not be loaded and were skipped: {', '.join(unavailable)}", fg='yellow')
+        except Exception as error:
+            print()
+            print(error)
+            click.secho("There was an error", fg='red')
+            client.disconnect()
+            cache.close()
+            sink.close()
+            journal.close()
+            fail(f"Resume the scrape with --resume {job}")
+    client.disconnect()
+    cache.close()
+    sink.close()
+    journal.record('finished', cursor=newcursor)
+    journal.close()
+
+    written += sink.written
+    if written == 0:
+        if previous:
+            click.secho(f"No new {extension} matched the selected criteria.", fg='green')
+        else:
+            click.secho("No users matched the selected criteria.", fg='red')
+        return
+
+    click.secho(f"\n{written} scraped users saved to {filename}", fg='green')
+    if cache_summary(cache):
+        click.echo(f"Cache - {cache_summary(cache)}")
+    run_summary(limits)
+    if newcursor:
+        click.secho(f"Resume the scrape with --cursor {newcursor}", fg='green')
@@ -0,0 +1,298 @@
+from typing import List
+import logging, os, time
+import click
+from instaclient.errors.common import InstaClientError
+from instaclient.instagram.hashtag import Hashtag
+from instacli.models import FetchBackend, CachedClient, EntityCache, HashtagAnalytics, JobNotFoundError, Journal, OutputFormat, OutputSink, Pipeline, PipelineStopped, RateLimits, Settings, Telemetry, Tracer, WorkerPool
+from instacli.models.igclient import IGClient
+from .common import DURATION, RATE_LIMIT, chromedriver, fail, new_client, output_format, run_summary
+from .scraping import HASHTAG_COLUMNS, HASHTAG_TYPES, POST_COLUMNS, POST_TYPES, cache_summary, post_row
+
+
+@click.command()
+@click.option('--login', type=click.STRING, help='The instagram username to use for the scrape.', required=True)
+@click.option('--password', type=click.STRING, hide_input=True, help="The password of the IG account you are using for the scrape.", required=True)
+@click.option('--target', required=True, type=click.STRING, help="The username of the user to scrape.")
+@click.option('--count', required=True, type=click.IntRange(1, 10000), help="The amount of data to scrape.")
+@click.option('--analyze', required=False, is_flag=True, default=False, help="Use this flag to analyze hashtag (will require more time)")
+@click.option('--deepscrape', required=False, is_flag=True, default=False, help="Use this flag to deep scrape Hashtags(will require more time)")
+@click.option('--min-occurrences', 'minoccurrences', required=False, type=click.IntRange(1, None), default=1, help="Deep scrape only the hashtags found at least this many times.")
+@click.option('--workers', required=False, type=click.IntRange(1, 16), default=1, help="Number of browser sessions used to load posts and deep scrape hashtags concurrently. With the selenium backend, posts are loaded in their own sessions while the first one scrolls the hashtag page.")
+@click.option('--rate', required=False, type=click.FloatRange(0.01, 50), default=None, help="Maximum number of hashtags deep scraped per second, shared by all workers. Same as --limit hashtag=RATE.")
+@click.option('--output', type=click.Path(exists=True, dir_okay=True), help="The path to the folder where you wish the JSON output to be saved to.")
+@click.option('--resume', required=False, type=click.STRING, default=None, help="Name of an interrupted job to resume. Use the same options as the interrupted command.")
+@click.option('--maxage', '--max-age', required=False, type=DURATION, default=None, help="Serve cached profiles, posts and hashtags younger than this age (e.g. 3600, 30m, 12h, 7d) instead of loading them again.")
+@click.option('--limit', 'limit', multiple=True, type=RATE_LIMIT, help="Highest requests per second of an action, e.g. --limit profile=1.5. The rate adapts below it. Actions: pagination, profile, post, hashtag, media, follow.")
+@click.option('--backend', required=False, type=click.Choice([FetchBackend.SELENIUM, FetchBackend.HTTP]), default=FetchBackend.SELENIUM, help="How profiles, posts, hashtags and pages are loaded: in the browser (selenium), or over pooled HTTP connections with the browser's session (http), which is faster and lets the workers share one browser.")
+@click.option('--format', 'format', required=False, type=click.Choice(OutputFormat.names()), default=OutputSink.CSV, help="Format of the posts, analysis and co-occurrence files: jsonl, jsonl.gz, jsonl.zst, csv (UTF-8), csv-utf16 (tab separated, for Excel), parquet or arrow. Defaults to csv. zstd needs the zstandard package, parquet and arrow need pyarrow.")
+def hashtag(login, password, target, count, analyze, output, deepscrape, minoccurrences, workers, rate, resume, maxage, limit, backend, format):
+    """Scrape the posts that contain a certain Hashtag
+
+    Posts are loaded and saved while the hashtag page is still being scrolled.
+    The progress of the scrape is saved in a "timestamp-target-hashtag.journal" file
+    in the output folder. If the scrape is interrupted, run the same command
+    again with "--resume timestamp-target-hashtag" to continue it.
+    """
+    if not chromedriver():
+        return
+
+    timestamp = int(time.time())
+    if resume:
+        try:
+            timestamp = int(resume.split('-')[0])
+        except ValueError:
+            fail(f"The job {resume} is invalid.")
+
+    settings = Settings.get()
+    if not settings.driver_path:
+        click.echo("No path for the chromedriver defined. Please define it using: instacli settings -dp [...]")
+        return
+
+    if not output and not settings.output_path:
+        click.echo("No output specified in command nor in settings. Please specify it with --output")
+        return
+
+    if not output:
+        output = settings.output_path
+
+    if analyze:
+        try:
+            os.mkdir(os.path.join(output, f'{timestamp}-{target}'))
+        except:
+            pass
+        if os.path.isdir(output):
+            output = os.path.join(output, f'{timestamp}-{target}')
+
+    filetype = output_format(format).extension
+    params = dict(target=target, count=count, analyze=analyze, deepscrape=deepscrape, format=format)
+    if resume:
+        try:
+            journal = Journal.load(output, resume)
+        except JobNotFoundError as error:
+            fail(error.message)
+        if not journal.check(**params):
+            fail(f"The options of this command don't match the ones of the job {resume}: {journal.params}")
+        if journal.last('finished'):
+            click.secho(f"The job {resume} is already finished.", fg='green')
+            return
+        job = resume
+    else:
+        job = f'{timestamp}-{target}-hashtag'
+        journal = Journal.create(output, job, **params)
+
+    filename = os.path.join(output, f'{timestamp}-{target}-{count}-posts.{filetype}')
+    # The journal is synced with the output, once per flushed batch of posts
+    sink = OutputSink(filename, format, columns=['url', 'hashtags'] + POST_COLUMNS[1:], types=POST_TYPES, append=bool(resume), on_flush=journal.sync)
+
+    # RESTORE CHECKPOINT
+    analytics = HashtagAnalytics()
+    done = set()
+    scraped = 0
+    for entry in journal.all('post'):
+        done.add(entry['shortcode'])
+        scraped += 1
+        analytics.add(entry['hashtags'], entry.get('likes', 0), entry.get('comments', 0))
+    for entry in journal.all('skipped'):
+        done.add(entry['shortcode'])
+
+    cache = EntityCache()
+    limits = RateLimits(dict(limit))
+    if rate:
+        limits.rates.setdefault(RateLimits.HASHTAG, rate)
+    client = CachedClient(new_client(backend), cache, maxage)
+    with Tracer.span('login'):
+        client.login(login, password)
+    client.set_logger_level(level=logging.ERROR)
+
+    def session():
+        worker = CachedClient(new_client(backend), cache, maxage)
+        worker.login(login, password)
+        worker.set_logger_level(level=logging.ERROR)
+        return worker
+
+    def paginate(emit):
+        sent = 0
+        stopped = False
+
+        def send(shortcodes:List[str]):
+            nonlocal sent
+            for shortcode in shortcodes[sent:]:
+                sent += 1
+                if shortcode not in done:
+                    emit(shortcode)
+                found.advance()
+
+        def scrape_callback(scraped:list):
+            nonlocal stopped
+            if not overlap:
+                return
+            try:
+                send(scraped)
+            except PipelineStopped:
+                # Raised again after instaclient, which catches every error of the scroll
+                stopped = True
+                raise
+
+        if journal.last('shortcodes'):
+            send(journal.last('shortcodes')['shortcodes'])
+            found.end()
+            return
+        postscodes:List[str] = limits.call(RateLimits.PAGINATION, client.get_hashtag_posts, target, count, callback=scrape_callback, callback_frequency=1)
+        if stopped:
+            raise PipelineStopped()
+        send(postscodes)
+        journal.record('shortcodes', shortcodes=postscodes)
+        found.end()
+
+    def load(worker:IGClient, shortcode:str):
+        post = worker.get_post(shortcode)
+        if not post:
+            raise InstaClientError(f'No data found for post {shortcode}')
+        return post
+
+    unavailable = list()
+
+    def skip(shortcode:str, error:Exception):
+        unavailable.append(shortcode)
+        loaded.count('failed')
+        journal.record('skipped', shortcode=shortcode, error=str(getattr(error, 'message', error)))
+
+    def write(post):
+        nonlocal scraped
+        # Find hashtags
+        matches = analytics.extract(post.caption)
+        row = post_row(post)
+        row['hashtags'] = ', '.join(f'#{hashtag}' for hashtag in matches)
+
+        comments = post.comments_count or len(post.comments or list())
+        analytics.add(matches, post.likes_count, comments)
+        # Staged first, so that it's synced by the flush of the post
+        journal.stage('post', shortcode=post.shortcode, hashtags=matches, likes=post.likes_count, comments=comments)
+        sink.write(row)
+        scraped += 1
+        loaded.advance()
+
+    # The hashtag page is scrolled in the browser. Without a concurrent backend,
+    # several workers load the posts in other sessions while it scrolls, and a
+    # single worker loads them with the scrolling client once it's done, so
+    # that no other browser is started and logged in.
+    overlap = client.backend.concurrent or workers > 1
+    if client.backend.concurrent:
+        clients = [client] * workers
+    else:
+        clients = list() if workers > 1 else [client]
+    pool = WorkerPool(workers, factory=session, clients=clients, limiter=limits.get(RateLimits.POST))
+    pipeline = Pipeline()
+    pipeline.source('shortcodes', paginate)
+    pipeline.stage('posts', lambda shortcode: pool.call(load, shortcode), workers=workers, errors=skip)
+    pipeline.stage('write', write)
+    found = Telemetry.phase('shortcodes', total=count, unit='posts', target=target)
+    loaded = Telemetry.phase('posts', total=count, unit='posts', done=scraped, target=target)
+    try:
+        with Tracer.span('hashtag posts', tag=target, workers=workers), found, loaded:
+            pipeline.run()
+    except Exception as error:
+        pool.close()
+        client.disconnect()
+        cache.close()
+        sink.close()
+        journal.close()
+        click.secho(f"\nError: {getattr(error, 'message', error)}", fg='red')
+        fail(f"Resume the scrape with --resume {job}")
+    pool.close()
+    sink.close()
+    click.echo()
+    for stats in pipeline.stats:
+        click.echo(f"Pipeline - {stats}")
+    if unavailable:
+        click.secho(f"{len(unavailable)} posts could not be loaded: {', '.join(unavailable)}", fg='yellow')
+
+    if scraped == 0:
+        client.disconnect()
+        cache.close()
+        journal.record('finished')
+        journal.close()
+        click.secho("No users matched the selected criteria.", fg='red')
+        return
+
+    click.secho(f"{scraped} scraped posts saved to {filename}", fg='green')
+
+
+    # HASHTAG ANALYTICS
+    for entry in journal.all('tag'):
+        analytics.set_tag(entry['data'])
+    if analyze:
+        click.echo(f"Analyzing {len(analytics.counts)} hashtags...")
+
+        filename = os.path.join(output, f'{timestamp}-{target}-analysis.{filetype}')
+        columns = ['hashtag', 'found', 'posts', 'avg_likes', 'avg_comments', 'related']
+        types = {'found': int, 'posts': int, 'avg_likes': float, 'avg_comments': float, **HASHTAG_TYPES}
+
+        if deepscrape:
+            resolved = set(analytics.tags.keys())
+            resolved.update(entry['name'] for entry in journal.all('tagfailed'))
+            todo = [hashtag for hashtag, found in analytics.most_common() if hashtag not in resolved and found >= minoccurrences]
+            rare = sum(1 for found in analytics.counts.values() if found < minoccurrences)
+            click.echo(f"Deep scraping {len(todo)} hashtags with {workers} workers ({rare} found less than {minoccurrences} times skipped)")
+
+            def lookup(worker:IGClient, name:str):
+                tag:Hashtag = worker.get_hashtag(name)
+                if not tag:
+                    raise InstaClientError(f'No data found for #{name}')
+                return tag.to_dict()
+
+            failed = list()
+            start = time.perf_counter()
+            # Workers share the client if its backend doesn't need the browser
+            clients = [client] * workers if client.backend.concurrent else [client]
+            pool = WorkerPool(workers, factory=session, clients=clients, limiter=limits.get(RateLimits.HASHTAG))
+            try:
+                with Tracer.span('hashtag deep scrape', workers=len(clients)), Telemetry.phase('hashtags', total=len(todo), unit='hashtags', target=target) as progress:
+                    for name, data, error in pool.map(lookup, todo):
+                        if error:
+                            failed.append(name)
+                            progress.count('failed')
+                            journal.record('tagfailed', name=name, error=str(getattr(error, 'message', error)))
+                        else:
+                            analytics.set_tag(data)
+                            journal.record('tag', data=data)
+                        progress.advance()
+            finally:
+                pool.close()
+            elapsed = time.perf_counter() - start
+
+            resolved = len(todo) - len(failed)
+            speed = resolved / elapsed if elapsed else 0.0
+            click.echo(f"\nResolved {resolved} hashtags, {len(failed)} failed ({speed:.2f} hashtags/s)")
+            for stats in pool.stats:
+                click.echo(f"Worker {stats.worker}: {stats.done} resolved, {stats.failed} failed ({stats.throughput:.2f} hashtags/s)")
+            if failed:
+                click.secho(f"Failed hashtags: {', '.join(failed)}", fg='red')
+
+            columns.extend(HASHTAG_COLUMNS)
+
+        with Tracer.span('analysis', hashtags=len(analytics.counts)):
+            report = OutputSink(filename, format, columns=columns, types=types, flush_every=10000)
+            for tag, found in analytics.most_common():
+                likes, comments = analytics.engagement(tag)
+                related = ', '.join(other for other, _ in analytics.related(tag))
+                data = analytics.tags.get(tag, dict())
+                row = {column: data.get(column) for column in columns[6:]}
+                row.update(hashtag=tag, found=found, posts=analytics.found_in[tag], avg_likes=round(likes, 2), avg_comments=round(comments, 2), related=related)
+                report.write(row)
+            report.close()
+
+            matrix = os.path.join(output, f'{timestamp}-{target}-cooccurrence.{filetype}')
+            pairs = OutputSink(matrix, format, columns=['hashtag', 'other', 'posts'], types={'posts': int}, flush_every=10000)
+            for tag, other, found in analytics.pairs():
+                pairs.write({'hashtag': tag, 'other': other, 'posts': found})
+            pairs.close()
+
+        click.secho(f"Hashtag analysis saved to {filename}, co-occurrences saved to {matrix}", fg='green')
+    client.disconnect()
+    cache.close()
+    journal.record('finished')
+    journal.close()
+    if cache_summary(cache):
+        click.echo(f"Cache - {cache_summary(cache)}")
+    run_summary(limits)
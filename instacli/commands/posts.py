@@ -0,0 +1,277 @@
+import datetime, logging, os, threading, time
+import click
+from instacli.models import FetchBackend, CachedClient, Downloader, EntityCache, JobNotFoundError, Journal, OutputFormat, OutputSink, Pipeline, PostIterator, RateLimits, Settings, Telemetry, Tracer, WorkerPool
+from instacli.models.igclient import IGClient
+from .common import DURATION, RATE_LIMIT, chromedriver, fail, new_client, output_format, read_targets, run_summary, shard_targets
+from .scraping import POST_COLUMNS, POST_TYPES, cache_summary, post_row
+
+
+@click.command()
+@click.option('--login', type=click.STRING, help='The instagram username to use for the scrape.', required=True)
+@click.option('--password', type=click.STRING, hide_input=True, help="The password of the IG account you are using for the scrape.", required=True)
+@click.option('--target', required=False, type=click.STRING, default=None, help="The username of the user to scrape.")
+@click.option('--targets-file', 'targetsfile', required=False, type=click.Path(exists=True, dir_okay=False), default=None, help="File with the usernames of the users to scrape, one per line, instead of --target. The targets are scraped in parallel by worker processes and their posts are merged in one output with a target column.")
+@click.option('--processes', required=False, type=click.IntRange(1, 32), default=min(4, os.cpu_count() or 1), help="Number of worker processes scraping the targets of --targets-file, each with its own browser. Defaults to the number of cores, up to 4.")
+@click.option('--max-browser-rss', 'maxrss', required=False, type=click.IntRange(64, None), default=None, help="Memory limit in MB of the browser of a worker process of --targets-file. A browser which grew past it is restarted before the next target.")
+@click.option('--count', required=True, type=click.IntRange(1, 10000), help="The amount of data to scrape.")
+@click.option('--start', required=False, default=None, help="The start of the date range for the scraped posts ( dd/mm/yyy )", type=click.STRING)
+@click.option('--end', required=False, default=None, help="The end of the date range for the scraped posts ( dd/mm/yyyy )", type=click.STRING)
+@click.option('--minlikes', required=False, default=None, help="The minimum required likes of the post", type=click.INT)
+@click.option('--output', type=click.Path(exists=True, dir_okay=True), help="The path to the folder where you wish the JSON output to be saved to.")
+@click.option('--workers', required=False, type=click.IntRange(1, 16), default=1, help="Number of browser sessions used to load posts concurrently.")
+@click.option('--downloads', required=False, type=click.IntRange(1, 32), default=4, help="Number of media files downloaded concurrently.")
+@click.option('--resume', required=False, type=click.STRING, default=None, help="Name of an interrupted job to resume. Use the same options as the interrupted command.")
+@click.option('--maxage', '--max-age', required=False, type=DURATION, default=None, help="Serve cached profiles, posts and hashtags younger than this age (e.g. 3600, 30m, 12h, 7d) instead of loading them again.")
+@click.option('--limit', 'limit', multiple=True, type=RATE_LIMIT, help="Highest requests per second of an action, e.g. --limit profile=1.5. The rate adapts below it. Actions: pagination, profile, post, hashtag, media, follow.")
+@click.option('--backend', required=False, type=click.Choice([FetchBackend.SELENIUM, FetchBackend.HTTP]), default=FetchBackend.SELENIUM, help="How profiles, posts, hashtags and pages are loaded: in the browser (selenium), or over pooled HTTP connections with the browser's session (http), which is faster and lets the workers share one browser.")
+@click.option('--format', 'format', required=False, type=click.Choice(OutputFormat.names()), default=OutputSink.CSV, help="Format of the output files: jsonl, jsonl.gz, jsonl.zst, csv (UTF-8), csv-utf16 (tab separated, for Excel), parquet or arrow. Defaults to csv. zstd needs the zstandard package, parquet and arrow need pyarrow.")
+def posts(login, password, target, targetsfile, processes, maxrss, count, start, end, minlikes, output, workers, downloads, resume, maxage, limit, backend, format):
+    """Scrape and Download a user's posts.
+
+    You can specify a date range for the scraped posts.
+        By inserting only the end date ( --end ), the tool will scrape
+        posts pubblished up before the specified date.
+        By inserting only the start date ( --start ), the tool will scrape
+        posts that were pubblished after such date
+
+    The further in the past the start date and end date are set to,
+        the longer the bot will take to retrieve such posts.
+
+    Posts are loaded while the next pages are requested, and their media is
+        downloaded as soon as they are saved.
+
+    The progress of the scrape is saved in a "timestamp-target-posts.journal" file
+        in the output folder. If the scrape is interrupted, run the same command
+        again with "--resume timestamp-target-posts" to continue it.
+
+    With --targets-file, the posts of every user of the file are scraped by a
+        pool of worker processes, each with its own browser, and merged in a
+        "timestamp-targets-posts" output with a target column. The media and
+        the log of every target are kept in a "timestamp-shards" folder.
+    """
+    if not chromedriver():
+        return
+
+    if bool(target) == bool(targetsfile):
+        fail("Specify the user to scrape with either --target or --targets-file")
+
+    # instacli posts --login testingwidevs --password Test2017 --target davidwickerhf --count 5 --minlikes 200 --end 27/09/2019
+    timestamp = int(time.time())
+    if resume:
+        try:
+            timestamp = int(resume.split('-')[0])
+        except ValueError:
+            fail(f"The job {resume} is invalid.")
+    startdate = enddate = None
+    if start or end:
+        while True:
+            if start:
+                try:
+                    startdate = int(datetime.datetime.strptime(start, "%d/%m/%Y").timestamp())
+                    if startdate > timestamp:
+                        raise ValueError(startdate)
+
+                    if not end:
+                        break
+                except:
+                    start = click.prompt("The inserted Start Date is invalid or in the future. Insert it again ( dd/mm/yyyy )")
+                    continue
+
+            if end:
+                try:
+                    enddate = int(datetime.datetime.strptime(end, "%d/%m/%Y").timestamp())
+                    if enddate > timestamp:
+                        raise ValueError(enddate)
+
+                    if start: 
+                        if enddate <= startdate:
+                            raise ValueError(enddate)
+
+                    break
+                except:
+                    end = click.prompt("The inserted End Date is invalid or in the future. Insert it again ( dd/mm/yyyy )")
+                    continue
+
+    text = f"Looking for {count} posts"
+    if minlikes:
+        text += f" with a minimun of {minlikes} likes"
+    if start:
+        text += f", posted after {start}"
+    if end:
+        text += f", posted before {end}"
+    click.secho(text, fg='green')
+
+    settings = Settings.get()
+    if not settings.driver_path:
+        click.echo("No path for the chromedriver defined. Please define it using: instacli settings -dp [...]")
+        return
+
+    if not output and not settings.output_path:
+        click.echo("No output specified in command nor in settings. Please specify it with --output")
+        return
+
+    if not output:
+        output = settings.output_path
+
+    if targetsfile:
+        if resume:
+            fail("--resume continues the scrape of a single target, it can't be used with --targets-file")
+        targets = read_targets(targetsfile)
+        if not targets:
+            fail(f"No targets in {targetsfile}")
+        shard_targets(click.get_current_context(), targets, output, processes, maxrss, format, POST_COLUMNS, POST_TYPES, 'targets-posts', start=start, end=end)
+        return
+
+    try:
+        os.mkdir(os.path.join(output, f'{timestamp}-{target}'))
+    except:
+        pass
+    if os.path.isdir(output):
+        output = os.path.join(output, f'{timestamp}-{target}')
+
+    filetype = output_format(format).extension
+    params = dict(target=target, count=count, start=start, end=end, minlikes=minlikes, format=format)
+    if resume:
+        try:
+            journal = Journal.load(output, resume)
+        except JobNotFoundError as error:
+            fail(error.message)
+        if not journal.check(**params):
+            fail(f"The options of this command don't match the ones of the job {resume}: {journal.params}")
+        if journal.last('finished'):
+            click.secho(f"The job {resume} is already finished.", fg='green')
+            return
+        job = resume
+    else:
+        job = f'{timestamp}-{target}-posts'
+        journal = Journal.create(output, job, **params)
+
+    filename = os.path.join(output, f'{timestamp}-{target}-{count}-posts.{filetype}')
+    # The journal is synced with the output, once per flushed batch of posts
+    sink = OutputSink(filename, format, columns=POST_COLUMNS, types=POST_TYPES, append=bool(resume), on_flush=journal.sync)
+
+    # RESTORE CHECKPOINT
+    jobs = list()
+    for entry in journal.all('post'):
+        jobs.extend(tuple(media) for media in entry['media'])
+    scraped = len(journal.all('post'))
+
+    cache = EntityCache()
+    limits = RateLimits(dict(limit))
+    client = CachedClient(new_client(backend), cache, maxage)
+    with Tracer.span('login'):
+        client.login(login, password)
+    client.set_logger_level(level=logging.ERROR)
+
+    # Media of the posts saved by an interrupted run
+    downloader = Downloader(workers=downloads, limiter=limits.get(RateLimits.MEDIA))
+    failed = list()
+    if jobs:
+        with Tracer.span('downloads', files=len(jobs), workers=downloads), Telemetry.phase('downloads', total=len(jobs), unit='files', target=target) as progress:
+            failed.extend(downloader.download_all(jobs, callback=progress.update))
+
+    if not journal.last('scraped'):
+        click.secho(f"Starting scrape...", fg='green')
+        lock = threading.Lock()
+
+        def session():
+            worker = CachedClient(new_client(backend), cache, maxage)
+            worker.login(login, password)
+            worker.set_logger_level(level=logging.ERROR)
+            return worker
+
+        def paginate(emit):
+            for shortcode in iterator.candidates():
+                emit(shortcode)
+
+        def load(worker:IGClient, shortcode:str):
+            return iterator.load(shortcode, worker)
+
+        def write(post):
+            nonlocal scraped
+            if scraped >= count:
+                pipeline.finish('write')
+                return None
+            media = [(media.src_url, os.path.join(output, f'{post.owner}-{post.timestamp}-{media.shortcode}.jpg')) for media in post.media or list()]
+            # Staged first, so that it's synced by the flush of the post
+            journal.stage('post', shortcode=post.shortcode, media=media)
+            sink.write(post_row(post))
+            jobs.extend(media)
+            scraped += 1
+            loaded.advance()
+            fetched.extend(len(media))
+            if scraped >= count:
+                pipeline.finish('write')
+            return media
+
+        def download(media:list):
+            for url, path in media:
+                downloaded = downloader.try_download(url, path)
+                fetched.advance()
+                if not downloaded:
+                    fetched.count('failed')
+                    with lock:
+                        failed.append((url, path))
+
+        try:
+            profile = limits.call(RateLimits.PROFILE, client.get_profile, target)
+            iterator = PostIterator(client, profile, start=startdate, end=enddate, minlikes=minlikes, journal=journal, limits=limits)
+            # Pages are requested between the posts in the browser, unless the backend is concurrent
+            clients = [client] * workers if client.backend.concurrent else [client]
+            pool = WorkerPool(workers, factory=session, clients=clients)
+            pipeline = Pipeline()
+            pipeline.source('pages', paginate)
+            pipeline.stage('posts', lambda shortcode: pool.call(load, shortcode), workers=workers)
+            pipeline.stage('write', write)
+            pipeline.stage('downloads', download, workers=downloads)
+            loaded = Telemetry.phase('posts', total=count, unit='posts', done=scraped, target=target)
+            fetched = Telemetry.phase('downloads', total=0, unit='files', target=target)
+            started = time.perf_counter()
+            try:
+                with Tracer.span('scrape', target=target, workers=workers), loaded, fetched:
+                    pipeline.run()
+            finally:
+                downloader.stats.elapsed += time.perf_counter() - started
+                pool.close()
+            # Syncs the posts of the last batch before the end of the scrape
+            sink.flush()
+            journal.record('scraped')
+        except Exception as error:
+            client.disconnect()
+            cache.close()
+            sink.close()
+            downloader.close()
+            journal.close()
+            click.secho(f"\nError: {getattr(error, 'message', error)}", fg='red')
+            fail(f"Resume the scrape with --resume {job}")
+        click.echo()
+        for stats in pipeline.stats:
+            click.echo(f"Pipeline - {stats}")
+        if iterator.failed:
+            click.secho(f"{len(iterator.failed)} posts could not be loaded: {', '.join(iterator.failed)}", fg='yellow')
+    client.disconnect()
+    cache.close()
+    sink.close()
+    downloader.close()
+
+    if scraped == 0:
+        journal.record('finished')
+        journal.close()
+        click.secho("No users matched the selected criteria.", fg='red')
+        return
+
+    stats = downloader.stats
+    message = f"Downloaded {stats.files} files ({stats.bytes / 1024 / 1024:.1f} MB at {stats.rate / 1024:.0f} KB/s)"
+    if failed:
+        message += f". {len(failed)} failed, retry them with --resume {job}"
+    else:
+        journal.record('finished')
+    click.secho(message, fg='green' if not failed else 'yellow')
+    journal.close()
+
+    click.secho(f"{scraped} scraped posts saved to {filename}", fg='green')
+    if cache_summary(cache):
+        click.echo(f"Cache - {cache_summary(cache)}")
+    run_summary(limits)
+    if failed:
+        click.get_current_context().exit(1)
@@ -0,0 +1,37 @@
+from typing import Dict, List
+import inspect
+from instaclient.instagram.hashtag import Hashtag
+from instaclient.instagram.post import Post
+from instaclient.instagram.profile import Profile
+from instacli.models import EntityCache, ProfileRecord
+
+
+PROFILE_COLUMNS = list(ProfileRecord.FIELDS)
+HASHTAG_COLUMNS = [key for key in vars(Hashtag(client=None, id=None, viewer=None, name=None)) if key != 'client']
+POST_COLUMNS = ['url'] + [key for key in vars(Post(client=None, id=None, type=None, viewer=None, owner=None, shortcode=None, timestamp=None, likes_count=None, comments_disabled=None, is_ad=None, media=None)) if key != 'client']
+
+
+def column_types(cls:type, columns:List[str]) -> Dict[str, type]:
+    """Types of the columns which are annotated as ``bool``, ``int`` or ``float``
+    in the constructor of ``cls``, for the schema of Parquet and Arrow outputs."""
+    parameters = inspect.signature(cls.__init__).parameters
+    types = {column: parameters[column].annotation for column in columns if column in parameters}
+    # Ids are numeric strings, even where they are annotated as int
+    return {column: kind for column, kind in types.items() if kind in (bool, int, float) and column != 'id'}
+
+
+PROFILE_TYPES = column_types(Profile, PROFILE_COLUMNS)
+HASHTAG_TYPES = column_types(Hashtag, HASHTAG_COLUMNS)
+POST_TYPES = column_types(Post, POST_COLUMNS)
+
+
+def cache_summary(cache:EntityCache) -> str:
+    return ', '.join(f'{kind}s: {stats}' for kind, stats in cache.stats.items() if stats.hits or stats.misses)
+
+
+def post_row(post:Post) -> dict:
+    row = post.to_dict()
+    row['url'] = f'https://www.instagram.com/p/{post.shortcode}/'
+    if post.location:
+        row['location'] = post.location.slug
+    return row
@@ -0,0 +1,67 @@
+from typing import List
+import contextlib, io, os
+import click
+from instacli.models import Daemon, DaemonClient, DaemonUnavailableError, LoginStats
+from instacli.instacli import invoke_command
+from .common import chromedriver, fail
+
+
+def run_job(args:List[str], cwd:str):
+    """Runs a command inside the daemon and returns its exit code and output."""
+    from instacli.models.browser import BrowserStats
+    from instacli.models.igclient import IGClient
+    output = io.StringIO()
+    previous = os.getcwd()
+    IGClient.stats = LoginStats()
+    IGClient.browser = BrowserStats()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            os.chdir(cwd)
+            code = invoke_command(args)
+        finally:
+            os.chdir(previous)
+    return code, output.getvalue()
+
+
+@click.command()
+@click.option('--socket', 'path', required=False, type=click.Path(dir_okay=False), default=lambda: Daemon.socket_path(), help="Path of the Unix socket of the daemon. Defaults to the daemon_socket setting or INSTACLI_SOCKET, which the other commands use to find the daemon.")
+@click.option('--sessions', required=False, type=click.IntRange(1, 16), default=2, help="Number of logged in browser sessions kept warm per account.")
+@click.option('--status', is_flag=True, default=False, help="Print the queue depth, warm sessions and job latency of the running daemon.")
+@click.option('--stop', is_flag=True, default=False, help="Stop the running daemon.")
+def serve(path, sessions, status, stop):
+    """Run a daemon which keeps browser sessions logged in between commands
+
+    While the daemon is running, getinfo, hashtag, posts, follow and unfollow
+    are submitted to it and run in order with a warm session of the account,
+    instead of starting and logging in a new browser. Use "instacli --local"
+    to run a command in its own process.
+    """
+    if status or stop:
+        daemon = DaemonClient(path)
+        try:
+            result = daemon.stop() if stop else daemon.status()
+        except DaemonUnavailableError as error:
+            fail(error.message)
+        if stop:
+            click.secho("The daemon has been stopped.", fg='green')
+            return
+        latency = result['latency']
+        click.echo(f"Queue: {result['queue']} jobs waiting, running: {result['running'] or 'nothing'}, completed: {result['completed']}")
+        click.echo(f"Warm sessions: {', '.join(f'{account}: {count}' for account, count in result['sessions'].items()) or 'none'}")
+        if latency['last'] is not None:
+            click.echo(f"Job latency: last {latency['last']:.2f}s, average {latency['average']:.2f}s")
+        return
+
+    if not chromedriver():
+        return
+    daemon = Daemon(run_job, path, sessions)
+    click.secho(f"Listening on {path}. Stop the daemon with Ctrl+C or instacli serve --stop", fg='green')
+    if os.path.abspath(path) != os.path.abspath(Daemon.socket_path()):
+        click.secho(f"Commands only use this daemon with INSTACLI_SOCKET={path}, or after: instacli settings --daemonsocket {path}", fg='yellow')
+    try:
+        daemon.serve()
+    except DaemonUnavailableError as error:
+        click.secho(error.message, fg='red')
+    except KeyboardInterrupt:
+        pass
+    click.echo("Daemon stopped.")
@@ -0,0 +1,39 @@
+import click
+from instacli.models import Settings
+
+
+@click.command()
+@click.option('-dp', '--driverpath', type=click.Path(exists=True),
+default=lambda: Settings.get().driver_path, required=False, help="The path to the web driver executable.")
+@click.option('-dv', '--drivervisible', type=click.BOOL,default=lambda: Settings.get().driver_visible,  required=False, help="Set the visibility of the chromedriver.")
+@click.option('-lb', '--leanbrowser', type=click.BOOL, default=lambda: Settings.get().lean_browser, required=False, help="Start the browser in lean mode: without images, media, fonts, trackers, extensions and background features, with a small persistent profile.")
+@click.option('-l', '--logging', type=click.BOOL, default=lambda: Settings.get().logging, help="Set visibility of log messages")
+@click.option('-ds', '--daemonsocket', type=click.Path(dir_okay=False), default=lambda: Settings.get().daemon_socket, required=False, help="The Unix socket of the instacli serve daemon, used by the daemon and by the commands to find it.")
+@click.option('-op', '--outputpath', type=click.Path(exists=True, dir_okay=True),
+default=lambda: Settings.get().output_path, required=False, help="The path to for the output JSON files")
+def settings(driverpath, drivervisible, leanbrowser, logging, daemonsocket, outputpath):
+    """Customize your instacli settings"""
+    settings:Settings = Settings.get()
+        
+    print_settings = True
+    if driverpath != settings.driver_path:
+        settings.set_driver_path(driverpath)
+        print_settings = False
+    if drivervisible != settings.driver_visible:
+        settings.set_driver_visible(drivervisible)
+        print_settings = False
+    if leanbrowser != settings.lean_browser:
+        settings.set_lean_browser(leanbrowser)
+        print_settings = False
+    if logging != settings.logging:
+        settings.set_logging(logging)
+        print_settings = False
+    if daemonsocket != settings.daemon_socket:
+        settings.set_daemon_socket(daemonsocket)
+        print_settings = False
+    if outputpath != settings.output_path:
+        settings.set_output_path(outputpath)
+        print_settings = True
+    
+    if print_settings:
+        click.echo(f"Settings: { {key: getattr(settings, key) for key in settings.DEFAULTS} }")
@@ -1,2 +1,41 @@
-from .settings import Settings
-from .progress import Progress
\ No newline at end of file
+from importlib import import_module
+
+# Module of every exported class. Modules are imported on first access, so that
+# commands only load instaclient, selenium and requests when they use them.
+_EXPORTS = {
+    'Settings': 'settings',
+    'SessionStore': 'sessions', 'LoginStats': 'sessions',
+    'Progress': 'progress', 'Telemetry': 'progress', 'BarReporter': 'progress', 'JsonReporter': 'progress',
+    'RateLimiter': 'ratelimiter', 'RateLimits': 'ratelimiter',
+    'WorkerPool': 'workerpool', 'WorkerStats': 'workerpool',
+    'Pipeline': 'pipeline', 'PipelineStopped': 'pipeline', 'StageStats': 'pipeline',
+    'Downloader': 'downloader', 'DownloadStats': 'downloader',
+    'PostIterator': 'pagination', 'FollowIterator': 'pagination',
+    'OutputSink': 'sink', 'OutputFormat': 'sink', 'OutputFormatError': 'sink',
+    'Journal': 'journal', 'JobNotFoundError': 'journal',
+    'EntityCache': 'cache', 'CachedClient': 'cache', 'CacheStats': 'cache',
+    'HashtagAnalytics': 'analytics',
+    'Daemon': 'daemon', 'DaemonClient': 'daemon', 'DaemonUnavailableError': 'daemon', 'SessionPool': 'daemon',
+    'BrowserStats': 'browser', 'ProfileDir': 'browser',
+    'FetchBackend': 'backend', 'SeleniumBackend': 'backend', 'HttpBackend': 'backend',
+    'Tracer': 'tracer',
+    'ProfileRecord': 'records',
+    'Predicate': 'predicate', 'PredicateError': 'predicate',
+    'Snapshot': 'snapshots', 'SnapshotStore': 'snapshots', 'IncrementalScan': 'snapshots',
+    'Shard': 'shards', 'ShardRunner': 'shards',
+    'Account': 'batch', 'BatchJob': 'batch', 'BatchRunner': 'batch', 'ManifestError': 'batch', 'load_manifest': 'batch',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name:str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
\ No newline at end of file
@@ -0,0 +1,91 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+import heapq, re
+
+
+class HashtagAnalytics():
+    PATTERN = re.compile(r'#(\w+)')
+
+    def __init__(self) -> 'HashtagAnalytics':
+        """Hashtag statistics of a set of posts.
+
+        Posts are added one at a time with :meth:`add`. For every hashtag the
+        engine keeps the number of times it was found, the number of posts it
+        was found in, the total likes and comments of those posts and a sparse
+        co-occurrence row, so adding a post costs O(t²) for a post with t
+        hashtags, regardless of how many posts were added before.
+
+        Deep scraped hashtags are indexed by name with :meth:`set_tag`. Hashtags
+        are case insensitive on Instagram, so they are all kept in lowercase.
+        """
+        self.posts = 0
+        self.counts:Counter = Counter()
+        self.found_in:Counter = Counter()
+        self.likes:Counter = Counter()
+        self.comments:Counter = Counter()
+        self.cooccurrence:Dict[str, Counter] = defaultdict(Counter)
+        self.tags:Dict[str, dict] = dict()
+
+
+    @classmethod
+    def extract(cls, caption:Optional[str]) -> List[str]:
+        """Returns the hashtags of a caption in lowercase, without the ``#``."""
+        if not caption:
+            return list()
+        return [tag.lower() for tag in cls.PATTERN.findall(caption)]
+
+
+    def add(self, hashtags:List[str], likes:int=0, comments:int=0):
+        """Adds the hashtags of a post and its engagement.
+
+        Args:
+            hashtags (List[str]): Hashtags of the post, without the ``#``.
+            likes (int, optional): Likes of the post. Defaults to 0.
+            comments (int, optional): Comments of the post. Defaults to 0.
+        """
+        self.posts += 1
+        # Hashtags of the journals of older runs may not be in lowercase
+        hashtags = [tag.lower() for tag in hashtags]
+        self.counts.update(hashtags)
+        unique = set(hashtags)
+        self.found_in.update(unique)
+        for tag in unique:
+            self.likes[tag] += likes or 0
+            self.comments[tag] += comments or 0
+            row = self.cooccurrence[tag]
+            for other in unique:
+                if other != tag:
+                    row[other] += 1
+
+
+    def set_tag(self, data:dict):
+        """Indexes the deep scraped data of a hashtag by its name."""
+        self.tags[data['name'].lower()] = data
+
+
+    def engagement(self, tag:str) -> Tuple[float, float]:
+        """Average likes and comments of the posts containing ``tag``."""
+        posts = self.found_in.get(tag)
+        if not posts:
+            return 0.0, 0.0
+        return self.likes[tag] / posts, self.comments[tag] / posts
+
+
+    def related(self, tag:str, k:int=5) -> List[Tuple[str, int]]:
+        """The ``k`` hashtags found most often together with ``tag``."""
+        row = self.cooccurrence.get(tag)
+        if not row:
+            return list()
+        return heapq.nlargest(k, row.items(), key=lambda item: item[1])
+
+
+    def pairs(self) -> Iterator[Tuple[str, str, int]]:
+        """Yields every non-zero entry of the upper triangle of the co-occurrence matrix."""
+        for tag, row in self.cooccurrence.items():
+            for other, count in row.items():
+                if tag < other:
+                    yield tag, other, count
+
+
+    def most_common(self, k:int=None) -> List[Tuple[str, int]]:
+        return self.counts.most_common(k)
@@ -0,0 +1,170 @@
+from typing import Optional
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from instaclient import InstaClient
+from .tracer import Tracer
+
+INSTAGRAM = 'https://www.instagram.com'
+
+
+class FetchBackend():
+    SELENIUM = 'selenium'
+    HTTP = 'http'
+
+    # Whether several workers can send requests through the same client at once
+    concurrent = False
+
+    def __init__(self, client:InstaClient, origin:str=None) -> 'FetchBackend':
+        """Sends the read requests of a client: profiles, posts, hashtags and
+        GraphQL pages, which instaclient loads through ``_request``.
+
+        Use :meth:`create` to get the backend of a name.
+
+        Args:
+            client (:class:`InstaClient`): Client the requests are made for.
+            origin (str, optional): Origin the Instagram URLs are sent to instead
+                of https://www.instagram.com, e.g. a local stub server.
+        """
+        self.client = client
+        self.origin = origin
+        self.requests = 0
+
+
+    @staticmethod
+    def create(name:str, client:InstaClient, **options) -> 'FetchBackend':
+        backends = {FetchBackend.SELENIUM: SeleniumBackend, FetchBackend.HTTP: HttpBackend}
+        if name not in backends:
+            raise ValueError(f"Unknown backend {name}. Use one of {', '.join(backends)}")
+        return backends[name](client, **options)
+
+
+    def url(self, url:str) -> str:
+        if self.origin and url.startswith(INSTAGRAM):
+            return self.origin.rstrip('/') + url[len(INSTAGRAM):]
+        return url
+
+
+    @staticmethod
+    def kind(url:str) -> str:
+        """Type of entity requested by ``url``, used to name its trace spans."""
+        if '/graphql/query/' in url:
+            return 'graphql page'
+        if '/p/' in url:
+            return 'post'
+        if '/explore/tags/' in url:
+            return 'hashtag'
+        return 'profile'
+
+
+    def fetch(self, url:str, context:bool=False) -> Optional[dict]:
+        """Returns the JSON of ``url``, or None if it can't be loaded.
+
+        Args:
+            url (str): Instagram URL.
+            context (bool, optional): Whether the response depends on the
+                logged in session. Defaults to False.
+        """
+        raise NotImplementedError
+
+
+    def close(self):
+        pass
+
+
+class SeleniumBackend(FetchBackend):
+    def __init__(self, client:InstaClient, origin:str=None) -> 'SeleniumBackend':
+        super().__init__(client, origin)
+        # The browser loads one page at a time, e.g. for a page of posts requested
+        # while the previous posts are loaded by another thread
+        self._lock = threading.Lock()
+
+
+    def fetch(self, url:str, context:bool=False) -> Optional[dict]:
+        """Loads ``url`` as instaclient does: with an anonymous request, and
+        in the browser if that fails or if ``context`` is needed."""
+        with self._lock:
+            self.requests += 1
+            with Tracer.span(self.kind(url), Tracer.REMOTE, backend='selenium', browser=context):
+                return InstaClient._request(self.client, self.url(url), use_driver=context)
+
+
+class HttpBackend(FetchBackend):
+    concurrent = True
+
+    HEADERS = {
+        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.96 Safari/537.36 Edg/88.0.705.56',
+        'x-ig-app-id': '936619743392459',
+        'x-requested-with': 'XMLHttpRequest',
+    }
+
+    def __init__(self, client:InstaClient, origin:str=None, connections:int=16, timeout:float=15) -> 'HttpBackend':
+        """Sends the read requests over a pool of keep-alive HTTP connections,
+        with the cookies of the logged in browser session, so that they don't
+        wait for the browser to load a page. The browser is still used to log in.
+
+        Responses which aren't JSON are loaded again in the browser, if the
+        client has one, one at a time. The backend is thread safe.
+
+        Args:
+            client (:class:`InstaClient`): Client the requests are made for.
+            origin (str, optional): Origin the Instagram URLs are sent to.
+            connections (int, optional): Maximum number of open connections. Defaults to 16.
+            timeout (float, optional): Seconds to wait for a response. Defaults to 15.
+        """
+        super().__init__(client, origin)
+        self.timeout = timeout
+        self.throttled = 0
+        self.fallbacks = 0
+        self.session = requests.Session()
+        self.session.headers.update(self.HEADERS)
+        adapter = HTTPAdapter(pool_connections=connections, pool_maxsize=connections)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._synced = False
+        self._lock = threading.Lock()
+        # The browser loads one page at a time, as in :class:`SeleniumBackend`,
+        # while the workers sharing the client fall back to it
+        self._driver = threading.Lock()
+
+
+    def _sync(self):
+        """Copies the cookies of the browser session, once the client is logged in."""
+        with self._lock:
+            if self._synced or not self.client.logged_in:
+                return
+            for cookie in self.client.session_cookies or list():
+                self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', '.instagram.com'), path=cookie.get('path', '/'))
+            token = self.session.cookies.get('csrftoken')
+            if token:
+                self.session.headers['x-csrftoken'] = token
+            self._synced = True
+
+
+    def fetch(self, url:str, context:bool=False) -> Optional[dict]:
+        self._sync()
+        self.requests += 1
+        with Tracer.span(self.kind(url), Tracer.REMOTE, backend='http') as span:
+            try:
+                response = self.session.get(self.url(url), timeout=self.timeout)
+            except requests.RequestException:
+                return None
+            span.bytes = len(response.content)
+        if response.status_code == 429:
+            # Same answer as a rate limited GraphQL query, so callers back off
+            self.throttled += 1
+            return {'status': 'fail', 'message': 'rate limited'}
+        try:
+            return response.json()
+        except ValueError:
+            pass
+        if self.client.driver:
+            with self._driver:
+                self.fallbacks += 1
+                with Tracer.span(self.kind(url), Tracer.REMOTE, backend='selenium', browser=True):
+                    return InstaClient._request(self.client, self.url(url), use_driver=True)
+        return None
+
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,291 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+import io, json, os, sys, threading, time
+
+
+class ManifestError(Exception):
+    def __init__(self, path:str, reason:str):
+        self.path = path
+        self.message = f'Invalid batch manifest {path}: {reason}'
+        super().__init__(self.message)
+
+
+class Account():
+    def __init__(self, login:str, password:str, quota:int=None, sessions:int=1) -> 'Account':
+        """Instagram account used by a batch run.
+
+        Args:
+            login (str): Username of the account.
+            password (str): Password of the account.
+            quota (int, optional): Maximum number of jobs run with the account,
+                retries included. Defaults to None (no limit).
+            sessions (int, optional): Number of jobs run concurrently with the
+                account. Defaults to 1.
+        """
+        self.login = login
+        self.password = password
+        self.quota = quota
+        self.sessions = sessions
+        self.used = 0
+        self.running = 0
+
+    @property
+    def available(self) -> bool:
+        return self.running < self.sessions and not self.exhausted
+
+    @property
+    def exhausted(self) -> bool:
+        return self.quota is not None and self.used >= self.quota
+
+
+class BatchJob():
+    def __init__(self, index:int, command:str, options:dict, account:str=None) -> 'BatchJob':
+        """A command of a batch manifest.
+
+        Args:
+            index (int): Position of the job in the manifest.
+            command (str): Name of the instacli command.
+            options (dict): Options of the command, without ``login`` and ``password``.
+            account (str, optional): Login of the account the job must run with.
+        """
+        self.index = index
+        self.command = command
+        self.options = options
+        self.account = account
+        self.status = 'pending'
+        self.attempts:List[dict] = list()
+
+    @property
+    def name(self) -> str:
+        return f"{self.index}-{self.command}-{self.options.get('target', '')}"
+
+    def args(self, account:Account) -> List[str]:
+        """Command line arguments of the job when run with ``account``."""
+        args = [self.command, '--login', account.login, '--password', account.password]
+        for key, value in self.options.items():
+            option = f"--{key.replace('_', '-')}"
+            if value is True:
+                args.append(option)
+            elif value is False or value is None:
+                continue
+            elif isinstance(value, (list, tuple)):
+                for item in value:
+                    args.extend([option, str(item)])
+            else:
+                args.extend([option, str(value)])
+        return args
+
+    def to_dict(self) -> dict:
+        return {
+            'index': self.index,
+            'command': self.command,
+            'options': self.options,
+            'status': self.status,
+            'duration': sum(attempt['duration'] for attempt in self.attempts),
+            'attempts': self.attempts,
+        }
+
+
+class ThreadOutput(io.TextIOBase):
+    encoding = 'utf-8'
+    errors = 'strict'
+
+    def __init__(self, stream) -> 'ThreadOutput':
+        """Stream which sends what a thread writes to the buffer it captures to.
+
+        Threads which don't capture their output write to ``stream``.
+        """
+        self.stream = stream
+        self._local = threading.local()
+
+    def capture(self, buffer:Optional[io.StringIO]):
+        self._local.buffer = buffer
+
+    def write(self, text:str) -> int:
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        buffer = getattr(self._local, 'buffer', None)
+        (buffer or self.stream).flush()
+
+    def isatty(self) -> bool:
+        return False
+
+
+def load_manifest(path:str) -> Tuple[List[Account], List[BatchJob], dict]:
+    """Loads the accounts, jobs and settings of a JSON or YAML batch manifest.
+
+    Raises:
+        ManifestError: Raised if the manifest can't be parsed or is incomplete.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            if path.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ManifestError(path, 'YAML manifests require PyYAML (pip install pyyaml)')
+                data = yaml.safe_load(file)
+            else:
+                data = json.load(file)
+    except ManifestError:
+        raise
+    except Exception as error:
+        raise ManifestError(path, str(error))
+
+    if not isinstance(data, dict) or not data.get('accounts') or not data.get('jobs'):
+        raise ManifestError(path, 'accounts and jobs are required')
+
+    accounts = list()
+    for entry in data['accounts']:
+        password = entry.get('password') or os.environ.get(entry.get('password_env', ''))
+        if not entry.get('login') or not password:
+            raise ManifestError(path, 'every account needs a login and a password or password_env')
+        accounts.append(Account(entry['login'], password, entry.get('quota'), entry.get('sessions', 1)))
+
+    # Options of every job, and of every job of a command
+    defaults = data.get('defaults') or dict()
+    common = {key: value for key, value in defaults.items() if not isinstance(value, dict)}
+    jobs = list()
+    for index, entry in enumerate(data['jobs']):
+        entry = dict(entry)
+        command = entry.pop('command', None)
+        if not command:
+            raise ManifestError(path, f'job {index} has no command')
+        account = entry.pop('account', None)
+        if account and account not in [other.login for other in accounts]:
+            raise ManifestError(path, f'job {index} uses the unknown account {account}')
+        options = {**common, **defaults.get(command, dict()), **entry}
+        jobs.append(BatchJob(index, command, options, account))
+    settings = {key: value for key, value in data.items() if key not in ('accounts', 'jobs', 'defaults')}
+    return accounts, jobs, settings
+
+
+class BatchRunner():
+    def __init__(self, accounts:List[Account], runner:Callable, retries:int=1) -> 'BatchRunner':
+        """Runs the jobs of a batch over a pool of accounts.
+
+        Jobs are started in manifest order. Every job goes to the next account
+        in round-robin order which has a free session and quota left, so the
+        load is spread evenly over the accounts. A failed job is queued again
+        up to ``retries`` times, on a different account when possible.
+
+        Args:
+            accounts (List[Account]): Accounts of the pool.
+            runner (Callable): Function taking the arguments of a command and
+                returning its exit code. Its output is captured per job.
+            retries (int, optional): Number of retries of a failed job. Defaults to 1.
+        """
+        self.accounts = accounts
+        self.runner = runner
+        self.retries = retries
+        self._next = 0
+
+
+    def _account_for(self, job:BatchJob) -> Optional[Account]:
+        last = job.attempts[-1]['account'] if job.attempts else None
+        candidates = [account for account in self.accounts if not job.account or account.login == job.account]
+        if len(candidates) > 1 and last:
+            # Retry on another account if one is free
+            others = [account for account in candidates if account.login != last]
+            if any(account.available for account in others):
+                candidates = others
+        for offset in range(len(self.accounts)):
+            account = self.accounts[(self._next + offset) % len(self.accounts)]
+            if account in candidates and account.available:
+                self._next = (self.accounts.index(account) + 1) % len(self.accounts)
+                return account
+        return None
+
+
+    def _run(self, job:BatchJob, account:Account, output:ThreadOutput) -> dict:
+        buffer = io.StringIO()
+        output.capture(buffer)
+        start = time.time()
+        try:
+            code = self.runner(job.args(account))
+        except BaseException as error:
+            buffer.write(f'Error: {error}\n')
+            code = 1
+        finally:
+            output.capture(None)
+        return {'account': account.login, 'started': start, 'duration': time.time() - start, 'code': code, 'output': buffer.getvalue()}
+
+
+    def run(self, jobs:List[BatchJob], callback:Callable=None) -> List[BatchJob]:
+        """Runs every job and returns them with their status and attempts.
+
+        Args:
+            jobs (List[BatchJob]): Jobs to run, in order.
+            callback (Callable, optional): Called with every job once it
+                succeeds, fails or is skipped. Defaults to None.
+        """
+        pending = deque(jobs)
+        running = dict()
+        finished = list()
+        stdout, stderr = sys.stdout, sys.stderr
+        output = ThreadOutput(stdout)
+        sys.stdout = sys.stderr = output
+        workers = sum(account.sessions for account in self.accounts)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while pending or running:
+                    # Start every job which has a free account
+                    blocked = deque()
+                    while pending:
+                        job = pending.popleft()
+                        account = self._account_for(job)
+                        if not account:
+                            blocked.append(job)
+                            continue
+                        account.used += 1
+                        account.running += 1
+                        job.status = 'running'
+                        running[executor.submit(self._run, job, account, output)] = (job, account)
+                    pending = blocked
+
+                    if not running:
+                        # No account left with quota
+                        for job in pending:
+                            job.status = 'skipped'
+                            finished.append(job)
+                            if callable(callback):
+                                callback(job)
+                        break
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job, account = running.pop(future)
+                        account.running -= 1
+                        attempt = future.result()
+                        job.attempts.append(attempt)
+                        if attempt['code'] == 0:
+                            job.status = 'succeeded'
+                        elif len(job.attempts) <= self.retries:
+                            job.status = 'retrying'
+                            pending.appendleft(job)
+                            continue
+                        else:
+                            job.status = 'failed'
+                        finished.append(job)
+                        if callable(callback):
+                            callback(job)
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+        return sorted(finished, key=lambda job: job.index)
+
+
+    def report(self, jobs:List[BatchJob], elapsed:float) -> dict:
+        """Consolidated report of a run."""
+        statuses = [job.status for job in jobs]
+        return {
+            'jobs': len(jobs),
+            'succeeded': statuses.count('succeeded'),
+            'failed': statuses.count('failed'),
+            'skipped': statuses.count('skipped'),
+            'elapsed': elapsed,
+            'accounts': {account.login: {'jobs': account.used, 'quota': account.quota} for account in self.accounts},
+            'results': [job.to_dict() for job in jobs],
+        }
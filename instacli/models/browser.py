@@ -0,0 +1,182 @@
+from typing import Callable, Optional
+import logging, os, threading, time
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from instaclient.client.driver import HiddenChromeWebDriver
+from instacli import data_dir
+from .resources import running
+
+LOGGER = logging.getLogger(__name__)
+
+# Switches of the lean mode: no extensions, background services, first run
+# pages or media, and a small cache in the persistent profile
+LEAN_ARGUMENTS = [
+    '--disable-extensions',
+    '--disable-component-extensions-with-background-pages',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-client-side-phishing-detection',
+    '--disable-notifications',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+    '--metrics-recording-only',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--mute-audio',
+    '--autoplay-policy=user-gesture-required',
+    '--blink-settings=imagesEnabled=false',
+    '--disk-cache-size=33554432',
+    '--media-cache-size=1048576',
+    '--renderer-process-limit=2',
+]
+LEAN_PREFERENCES = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.managed_default_content_settings.media_stream': 2,
+    'profile.managed_default_content_settings.geolocation': 2,
+    'profile.default_content_setting_values.notifications': 2,
+}
+# Requests blocked in lean mode: images, video, audio, fonts and trackers.
+# The pages are only read for their JSON and their elements.
+BLOCKED_URLS = [
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.ico*',
+    '*.mp4*', '*.m4a*', '*.m4v*', '*.webm*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*connect.facebook.net*',
+]
+
+
+class BrowserStats():
+    def __init__(self) -> 'BrowserStats':
+        """Page loads and memory of the browsers of the process, to compare
+        the lean and the default mode."""
+        self.pages = 0
+        self.loading = 0.0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def record_load(self, seconds:float):
+        with self._lock:
+            self.pages += 1
+            self.loading += seconds
+
+    def record_rss(self, rss:Optional[int]):
+        if rss is None:
+            return
+        with self._lock:
+            self.peak = max(self.peak, rss)
+
+    @property
+    def average(self) -> float:
+        """Average page load in seconds."""
+        return self.loading / self.pages if self.pages else 0.0
+
+    def __repr__(self) -> str:
+        summary = f'{self.pages} pages loaded in {self.average:.2f}s on average'
+        if self.peak:
+            summary += f', {self.peak / 1024 / 1024:.0f} MB peak driver memory'
+        return summary
+
+
+class ProfileDir():
+    PROFILES_FOLDER = 'browser'
+
+    def __init__(self, path:str) -> 'ProfileDir':
+        """Persistent profile folder of a lean browser, which keeps the cookies
+        and the cached scripts and styles of Instagram between runs. Use :meth:`claim`."""
+        self.path = path
+
+    @property
+    def lock(self) -> str:
+        return os.path.join(self.path, 'instacli.lock')
+
+    @classmethod
+    def claim(cls, folder:str=None) -> 'ProfileDir':
+        """Claims the first profile which no running browser uses, so that
+        concurrent browsers get one each and reuse it in the next runs.
+
+        Args:
+            folder (str, optional): Folder of the profiles. Defaults to
+                ``browser`` in the data folder of instacli, see :func:`data_dir`.
+        """
+        folder = folder or os.path.join(data_dir(), cls.PROFILES_FOLDER)
+        # Only accessible by the current user, like the sessions
+        os.makedirs(folder, mode=0o700, exist_ok=True)
+        index = 0
+        while True:
+            profile = cls(os.path.join(folder, f'profile-{index}'))
+            os.makedirs(profile.path, exist_ok=True)
+            try:
+                descriptor = os.open(profile.lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+            except FileExistsError:
+                if profile._stale():
+                    profile.release()
+                else:
+                    index += 1
+                continue
+            with os.fdopen(descriptor, 'w') as file:
+                file.write(str(os.getpid()))
+            return profile
+
+    def _stale(self) -> bool:
+        """Whether the lock was left by a process which isn't running anymore."""
+        try:
+            with open(self.lock, 'r') as file:
+                pid = int(file.read().strip())
+        except (OSError, ValueError):
+            # Being written by the process claiming it
+            return False
+        return pid != os.getpid() and not running(pid)
+
+    def release(self):
+        try:
+            os.remove(self.lock)
+        except OSError:
+            pass
+
+
+def browser_options(headless:bool, profile:ProfileDir=None, proxy:str=None) -> webdriver.ChromeOptions:
+    """Options of the browser of a client: the ones instaclient uses, and the
+    ones of the lean mode if a ``profile`` is given."""
+    options = webdriver.ChromeOptions()
+    # instaclient reads the mobile layout of the pages
+    options.add_experimental_option('mobileEmulation', {'deviceName': 'Nexus 5'})
+    options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    if headless:
+        options.add_argument('--headless')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--log-level=4')
+    options.add_argument('--no-sandbox')
+    if proxy:
+        options.add_argument(f'--proxy-server={proxy}')
+    if profile:
+        options.add_argument(f'--user-data-dir={profile.path}')
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option('prefs', LEAN_PREFERENCES)
+    return options
+
+
+def block_resources(driver:webdriver.Chrome):
+    """Blocks the requests of :data:`BLOCKED_URLS` in the browser."""
+    try:
+        driver.execute_cdp_cmd('Network.enable', dict())
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+    except (AttributeError, WebDriverException) as error:
+        # Older chromedrivers, the preferences still block images and media
+        LOGGER.debug(f'Could not block the resources of the browser: {error}')
+
+
+class TimedChromeDriver(HiddenChromeWebDriver):
+    def __init__(self, on_load:Callable, **kwargs) -> 'TimedChromeDriver':
+        """Chrome driver of instaclient which calls ``on_load`` with the
+        duration of every page load, i.e. every :meth:`get`."""
+        self.on_load = on_load
+        super().__init__(**kwargs)
+
+    def get(self, url:str):
+        start = time.perf_counter()
+        try:
+            return super().get(url)
+        finally:
+            self.on_load(time.perf_counter() - start)
@@ -0,0 +1,224 @@
+from typing import Dict, Optional
+import inspect, json, os, sqlite3, threading, time
+from instaclient.instagram.address import Address
+from instaclient.instagram.comment import Comment
+from instaclient.instagram.hashtag import Hashtag
+from instaclient.instagram.location import Location
+from instaclient.instagram.post import Post
+from instaclient.instagram.postmedia import PostMedia
+from instaclient.instagram.profile import Profile
+from instacli import data_dir
+from .tracer import Tracer
+
+
+class CacheStats():
+    def __init__(self) -> 'CacheStats':
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f'{self.hits} hits, {self.misses} misses'
+
+
+class EntityCache():
+    CACHE_FILE = 'cache.sqlite'
+
+    PROFILE = 'profile'
+    POST = 'post'
+    HASHTAG = 'hashtag'
+
+    # Seconds after which an entity is considered expired and evicted
+    TTLS = {PROFILE: 7*24*3600, POST: 30*24*3600, HASHTAG: 7*24*3600}
+    MAX_SIZE = 256*1024*1024
+
+    def __init__(self, path:str=None, max_size:int=MAX_SIZE, ttls:Dict[str, int]=None) -> 'EntityCache':
+        """Persistent SQLite cache of profiles, posts and hashtags.
+
+        Entities are stored as their ``to_dict()`` JSON, keyed by username,
+        shortcode and tag name. Entries older than the TTL of their kind are
+        never served, and once the cache grows past ``max_size`` bytes the
+        least recently used entries are evicted.
+
+        Args:
+            path (str, optional): Path of the SQLite database. Defaults to
+                ``cache.sqlite`` in the data folder of instacli, see :func:`data_dir`.
+            max_size (int, optional): Maximum size of the cached data in bytes.
+                Defaults to 256 MB.
+            ttls (Dict[str, int], optional): TTL in seconds of each kind of entity.
+        """
+        if not path:
+            os.makedirs(data_dir(), exist_ok=True)
+            path = os.path.join(data_dir(), self.CACHE_FILE)
+        self.path = path
+        self.max_size = max_size
+        self.ttls = {**self.TTLS, **(ttls or dict())}
+        self.stats = {kind: CacheStats() for kind in self.TTLS}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS entities (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            fetched REAL NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (kind, key))''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entities_accessed ON entities (accessed)')
+        self._db.commit()
+
+
+    def get(self, kind:str, key:str, max_age:float=None) -> Optional[dict]:
+        """Returns the cached data of an entity, if it is fresh enough.
+
+        Args:
+            kind (str): One of ``EntityCache.PROFILE``, ``EntityCache.POST``
+                or ``EntityCache.HASHTAG``.
+            key (str): Username, shortcode or tag name.
+            max_age (float, optional): Maximum age in seconds of the entry.
+                Capped by the TTL of ``kind``. Defaults to the TTL.
+        """
+        now = time.time()
+        age = min(max_age, self.ttls[kind]) if max_age is not None else self.ttls[kind]
+        with self._lock, Tracer.span('cache get', Tracer.IO, kind=kind):
+            row = self._db.execute('SELECT data FROM entities WHERE kind = ? AND key = ? AND fetched >= ?', (kind, key, now - age)).fetchone()
+            if not row:
+                self.stats[kind].misses += 1
+                return None
+            self._db.execute('UPDATE entities SET accessed = ? WHERE kind = ? AND key = ?', (now, kind, key))
+            self._db.commit()
+            self.stats[kind].hits += 1
+        return json.loads(row[0])
+
+
+    def put(self, kind:str, key:str, data:dict):
+        """Stores the data of an entity, replacing any previous entry."""
+        now = time.time()
+        serialized = json.dumps(data, default=vars)
+        with self._lock, Tracer.span('cache put', Tracer.IO, kind=kind) as span:
+            self._db.execute('INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?)', (kind, key, serialized, len(serialized), now, now))
+            self._db.commit()
+            span.bytes = len(serialized)
+
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entities').fetchone()[0]
+
+
+    def evict(self) -> int:
+        """Deletes expired entries, then the least recently used ones
+        until the cache fits in ``max_size``.
+
+        Returns:
+            int: Number of evicted entries.
+        """
+        now = time.time()
+        with self._lock:
+            evicted = 0
+            for kind, ttl in self.ttls.items():
+                evicted += self._db.execute('DELETE FROM entities WHERE kind = ? AND fetched < ?', (kind, now - ttl)).rowcount
+
+            size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entities').fetchone()[0]
+            if size > self.max_size:
+                rows = self._db.execute('SELECT kind, key, size FROM entities ORDER BY accessed')
+                victims = list()
+                for kind, key, entry in rows:
+                    if size <= self.max_size:
+                        break
+                    victims.append((kind, key))
+                    size -= entry
+                self._db.executemany('DELETE FROM entities WHERE kind = ? AND key = ?', victims)
+                evicted += len(victims)
+            self._db.commit()
+        return evicted
+
+
+    def close(self):
+        self.evict()
+        self._db.close()
+
+
+def build(cls:type, client, data:dict):
+    """Builds an entity of instaclient from its cached ``to_dict()``.
+
+    ``to_dict()`` leaves out the attributes which are None, including the
+    required arguments of the constructor, like the ``viewer`` of a profile,
+    so those are passed as None.
+    """
+    for name, parameter in inspect.signature(cls.__init__).parameters.items():
+        if name not in ('self', 'client') and parameter.kind == parameter.POSITIONAL_OR_KEYWORD and parameter.default is parameter.empty:
+            data.setdefault(name, None)
+    return cls(client=client, **data)
+
+
+class CachedClient():
+    def __init__(self, client, cache:EntityCache, max_age:float=None) -> 'CachedClient':
+        """Wraps an :class:`IGClient` so that profiles, posts and hashtags are
+        served from an :class:`EntityCache` when possible.
+
+        Every entity loaded from Instagram is stored in the cache. Cached
+        entities are only served if ``max_age`` is set, so by default the
+        cache is kept up to date without changing what a command returns.
+        Any other attribute is forwarded to the wrapped client.
+
+        Args:
+            client (:class:`IGClient`): The wrapped client.
+            cache (:class:`EntityCache`): The cache to read from and write to.
+            max_age (float, optional): Maximum age in seconds of the cached
+                entities to serve. Defaults to None (never served).
+        """
+        self.client = client
+        self.cache = cache
+        self.max_age = max_age
+
+
+    def __getattr__(self, name:str):
+        return getattr(self.client, name)
+
+
+    def _cached(self, kind:str, key:str) -> Optional[dict]:
+        if self.max_age is None:
+            return None
+        return self.cache.get(kind, key, self.max_age)
+
+
+    def get_profile(self, username:str, context:bool=False) -> Optional[Profile]:
+        data = self._cached(EntityCache.PROFILE, username)
+        if data:
+            return build(Profile, self, data)
+        profile = self.client.get_profile(username, context)
+        if profile:
+            self.cache.put(EntityCache.PROFILE, username, profile.to_dict())
+            profile.client = self
+        return profile
+
+
+    def get_post(self, shortcode:str, context:bool=False) -> Optional[Post]:
+        data = self._cached(EntityCache.POST, shortcode)
+        if data:
+            data['media'] = [build(PostMedia, self, media) for media in data.get('media') or list()]
+            if data.get('comments'):
+                data['comments'] = [build(Comment, self, comment) for comment in data['comments']]
+            location = data.get('location')
+            if location:
+                address = location.pop('address', None)
+                data['location'] = build(Location, self, dict(location, address=Address(json.dumps(address)) if address else None))
+            return build(Post, self, data)
+        post = self.client.get_post(shortcode, context)
+        if post:
+            self.cache.put(EntityCache.POST, shortcode, post.to_dict())
+            post.client = self
+        return post
+
+
+    def get_hashtag(self, tag:str) -> Optional[Hashtag]:
+        data = self._cached(EntityCache.HASHTAG, tag)
+        if data:
+            return build(Hashtag, self, data)
+        hashtag = self.client.get_hashtag(tag)
+        if hashtag:
+            self.cache.put(EntityCache.HASHTAG, tag, hashtag.to_dict())
+            hashtag.client = self
+        return hashtag
@@ -0,0 +1,371 @@
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib, json, os, queue, socket, socketserver, threading, time
+import click
+from instacli import BASE_DIR
+from .settings import Settings
+
+
+class DaemonUnavailableError(Exception):
+    def __init__(self, path:str, reason:str=None):
+        self.path = path
+        self.message = f'No instacli daemon is listening on {path}'
+        if reason:
+            self.message += f' ({reason})'
+        super().__init__(self.message)
+
+
+class SessionPool():
+    # Pool of the running daemon, if any. Commands use it to get warm sessions.
+    active:Optional['SessionPool'] = None
+
+    def __init__(self, size:int=2, factory:Callable=None, max_rss:int=None) -> 'SessionPool':
+        """Logged in clients kept warm between commands, per account.
+
+        A session is checked out by :meth:`PooledSession.login` and returned
+        by :meth:`PooledSession.disconnect`, so commands use the pool without
+        changes. If every warm session of an account is busy, a temporary one
+        is created and disconnected once returned, so that commands running
+        several workers never wait for each other.
+
+        Args:
+            size (int, optional): Number of warm sessions kept per account. Defaults to 2.
+            factory (Callable, optional): Function with no arguments that returns
+                a new client. Defaults to :class:`IGClient`.
+            max_rss (int, optional): Highest memory in MB of the browser of a
+                session. A session returned above it is disconnected instead of
+                kept, so that the next command starts a fresh browser. Defaults
+                to None (no limit).
+        """
+        if factory is None:
+            # Imported here, so that the daemon client doesn't load the browser automation
+            from .igclient import IGClient
+            factory = IGClient
+        self.size = size
+        self.factory = factory
+        self.max_rss = max_rss
+        # Sessions disconnected because their browser used more than max_rss
+        self.recycled = 0
+        self._idle:Dict[Tuple[str, str], List[IGClient]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def _account(username:str, password:str) -> Tuple[str, str]:
+        return username, hashlib.sha256(password.encode('utf-8')).hexdigest()
+
+
+    def session(self, backend:str=None) -> 'PooledSession':
+        return PooledSession(self, backend)
+
+
+    def checkout(self, username:str, password:str) -> Tuple['IGClient', bool]:
+        """Returns a session of the account and whether it has to log in."""
+        account = self._account(username, password)
+        while True:
+            with self._lock:
+                idle = self._idle[account]
+                client = idle.pop() if idle else None
+            if client is None:
+                return self.factory(), True
+            if self._alive(client):
+                return client, False
+            self._discard(client)
+
+
+    def checkin(self, username:str, password:str, client:'IGClient'):
+        account = self._account(username, password)
+        alive = self._alive(client)
+        if alive and self._oversized(client):
+            alive = False
+            with self._lock:
+                self.recycled += 1
+        with self._lock:
+            if alive and len(self._idle[account]) < self.size:
+                self._idle[account].append(client)
+                return
+        self._discard(client)
+
+
+    @staticmethod
+    def _alive(client:'IGClient') -> bool:
+        try:
+            return bool(client.driver) and client.logged_in
+        except Exception:
+            return False
+
+
+    def _oversized(self, client:'IGClient') -> bool:
+        if not self.max_rss:
+            return False
+        from .resources import driver_rss
+        rss = driver_rss(client)
+        return rss is not None and rss > self.max_rss * 1024 * 1024
+
+
+    @staticmethod
+    def _discard(client:'IGClient'):
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+
+
+    @property
+    def warm(self) -> Dict[str, int]:
+        """Number of idle sessions per account."""
+        with self._lock:
+            return {account[0]: len(idle) for account, idle in self._idle.items() if idle}
+
+
+    def close(self):
+        with self._lock:
+            clients = [client for idle in self._idle.values() for client in idle]
+            self._idle.clear()
+        for client in clients:
+            self._discard(client)
+
+
+class PooledSession():
+    def __init__(self, pool:SessionPool, backend:str=None) -> 'PooledSession':
+        """Stand-in for an :class:`IGClient`, backed by a warm session of a :class:`SessionPool`.
+
+        The session of the account is checked out when :meth:`login` is called
+        and every other attribute is forwarded to it. The session sends its
+        read requests through ``backend``, see :meth:`IGClient.set_backend`.
+        """
+        self._pool = pool
+        self._backend = backend
+        self._client:Optional[IGClient] = None
+        self._account:Optional[Tuple[str, str]] = None
+
+
+    def __getattr__(self, name:str):
+        if self._client is None:
+            raise AttributeError(f'{name} is not available before logging in')
+        return getattr(self._client, name)
+
+
+    def login(self, username:str, password:str) -> bool:
+        if self._client is not None:
+            self.disconnect()
+        client, fresh = self._pool.checkout(username, password)
+        self._client = client
+        self._account = (username, password)
+        client.set_backend(self._backend)
+        if fresh:
+            return client.login(username, password)
+        return True
+
+
+    def disconnect(self):
+        if self._client is None:
+            return
+        client, self._client = self._client, None
+        self._pool.checkin(*self._account, client)
+
+
+class Job():
+    def __init__(self, args:List[str], cwd:str) -> 'Job':
+        self.args = args
+        self.cwd = cwd
+        self.code = None
+        self.output = ''
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    @property
+    def queued(self) -> float:
+        """Seconds spent waiting in the queue."""
+        return (self.started or time.perf_counter()) - self.submitted
+
+    @property
+    def latency(self) -> float:
+        """Seconds between the submission and the end of the job."""
+        return (self.finished or time.perf_counter()) - self.submitted
+
+
+class Daemon():
+    SOCKET_PATH = f'{BASE_DIR}/instacli.sock'
+
+    def __init__(self, runner:Callable, path:str=None, sessions:int=2) -> 'Daemon':
+        """Resident process that runs instacli commands with warm browser sessions.
+
+        Jobs are submitted over a Unix socket as JSON lines by a :class:`DaemonClient`
+        and run one at a time, in order, by ``runner``. The :class:`SessionPool`
+        of the daemon is made active while it runs, so commands log in by
+        checking out a warm session instead of starting a new browser.
+
+        Args:
+            runner (Callable): Function taking the arguments and working directory
+                of a job and returning its exit code and output.
+            path (str, optional): Path of the Unix socket. Defaults to
+                :meth:`socket_path`.
+            sessions (int, optional): Warm sessions kept per account. Defaults to 2.
+        """
+        self.runner = runner
+        self.path = path or self.socket_path()
+        self.pool = SessionPool(sessions)
+        self.jobs:queue.Queue = queue.Queue()
+        self.running:Optional[Job] = None
+        self.completed = 0
+        self.latencies = deque(maxlen=100)
+        self._server = None
+
+
+    @classmethod
+    def socket_path(cls) -> str:
+        """Socket of the daemon: the ``daemon_socket`` setting, or ``INSTACLI_SOCKET``,
+        or else ``instacli.sock`` in the instacli folder."""
+        return Settings.get().daemon_socket or cls.SOCKET_PATH
+
+
+    @property
+    def status(self) -> dict:
+        latencies = list(self.latencies)
+        return {
+            'queue': self.jobs.qsize(),
+            'running': self.running.args[0] if self.running else None,
+            'completed': self.completed,
+            'sessions': self.pool.warm,
+            'latency': {
+                'last': latencies[-1] if latencies else None,
+                'average': sum(latencies) / len(latencies) if latencies else None,
+            },
+        }
+
+
+    def submit(self, args:List[str], cwd:str) -> Job:
+        job = Job(args, cwd)
+        self.jobs.put(job)
+        return job
+
+
+    def _work(self):
+        while True:
+            job:Job = self.jobs.get()
+            if job is None:
+                return
+            self.running = job
+            job.started = time.perf_counter()
+            try:
+                job.code, job.output = self.runner(job.args, job.cwd)
+            except BaseException as error:
+                job.code, job.output = 1, f'Error: {error}\n'
+            job.finished = time.perf_counter()
+            self.running = None
+            self.completed += 1
+            self.latencies.append(job.latency)
+            click.echo(f'{job.args[0]} finished with code {job.code} in {job.latency:.2f}s ({job.queued:.2f}s queued)')
+            job.done.set()
+
+
+    def serve(self):
+        """Listens on the socket until a ``stop`` request is received."""
+        if not hasattr(socket, 'AF_UNIX'):
+            raise DaemonUnavailableError(self.path, 'Unix sockets are not supported on this platform')
+        if os.path.exists(self.path):
+            if DaemonClient(self.path).available():
+                raise DaemonUnavailableError(self.path, 'another daemon is already running')
+            os.remove(self.path)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline())
+                except ValueError:
+                    return
+                kind = request.get('type')
+                if kind == 'job':
+                    job = daemon.submit(request['args'], request.get('cwd') or os.getcwd())
+                    job.done.wait()
+                    response = {'code': job.code, 'output': job.output, 'queued': job.queued, 'latency': job.latency}
+                elif kind == 'status':
+                    response = daemon.status
+                elif kind == 'stop':
+                    response = {'stopped': True}
+                else:
+                    response = {'error': f'Unknown request {kind}'}
+                self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+                self.wfile.flush()
+                if kind == 'stop':
+                    # Answer first, the process may exit as soon as the server stops
+                    threading.Thread(target=daemon._server.shutdown, daemon=True).start()
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.path, 0o600)
+        worker = threading.Thread(target=self._work, daemon=True)
+        worker.start()
+        SessionPool.active = self.pool
+        try:
+            self._server.serve_forever()
+        finally:
+            self.jobs.put(None)
+            worker.join()
+            SessionPool.active = None
+            self._server.server_close()
+            self.pool.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class DaemonClient():
+    def __init__(self, path:str=None, timeout:float=None) -> 'DaemonClient':
+        """Submits requests to a running :class:`Daemon`.
+
+        Args:
+            path (str, optional): Path of the Unix socket of the daemon.
+                Defaults to :meth:`Daemon.socket_path`.
+            timeout (float, optional): Socket timeout in seconds. Defaults to
+                None (wait for the job to finish).
+        """
+        self.path = path or Daemon.socket_path()
+        self.timeout = timeout
+
+
+    def _request(self, timeout:float=None, **request) -> dict:
+        if not hasattr(socket, 'AF_UNIX') or not os.path.exists(self.path):
+            raise DaemonUnavailableError(self.path)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(timeout)
+                connection.connect(self.path)
+                connection.sendall((json.dumps(request) + '\n').encode('utf-8'))
+                with connection.makefile('r', encoding='utf-8') as file:
+                    line = file.readline()
+        except OSError as error:
+            raise DaemonUnavailableError(self.path, str(error))
+        if not line:
+            raise DaemonUnavailableError(self.path, 'connection closed')
+        return json.loads(line)
+
+
+    def available(self) -> bool:
+        try:
+            self._request(timeout=2, type='status')
+            return True
+        except DaemonUnavailableError:
+            return False
+
+
+    def submit(self, args:List[str], cwd:str=None) -> dict:
+        """Runs a command in the daemon and waits for it to finish.
+
+        Returns:
+            dict: Exit ``code`` and ``output`` of the command, and the seconds it
+                was ``queued`` and its total ``latency``.
+        """
+        return self._request(self.timeout, type='job', args=args, cwd=cwd or os.getcwd())
+
+
+    def status(self) -> dict:
+        return self._request(2, type='status')
+
+
+    def stop(self) -> dict:
+        return self._request(2, type='stop')
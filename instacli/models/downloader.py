@@ -0,0 +1,171 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, List, Tuple
+import logging, os, threading, time
+import requests
+from requests.adapters import HTTPAdapter
+from .ratelimiter import RateLimiter
+from .tracer import Tracer
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DownloadStats():
+    def __init__(self) -> 'DownloadStats':
+        self.files = 0
+        self.failed = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Downloaded bytes per second."""
+        if not self.elapsed:
+            return 0.0
+        return self.bytes / self.elapsed
+
+
+class Downloader():
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, workers:int=4, retries:int=3, backoff:float=0.5, timeout:float=30, chunk_size:int=64*1024, limiter:RateLimiter=None) -> 'Downloader':
+        """Downloads files concurrently over a pooled, keep-alive HTTP session.
+
+        Every file is first written to a ``.part`` file next to its destination
+        and then renamed in place, so a destination file is either missing or
+        complete. If a ``.part`` file is already present, the download resumes
+        from its end through an HTTP ``Range`` request.
+
+        Args:
+            workers (int, optional): Number of concurrent downloads. Defaults to 4.
+            retries (int, optional): Number of retries of a failed download. Defaults to 3.
+            backoff (float, optional): Seconds to wait before the first retry. The delay
+                doubles on every further attempt. Defaults to 0.5.
+            timeout (float, optional): Connect and read timeout in seconds. Defaults to 30.
+            chunk_size (int, optional): Size of the chunks written to disk. Defaults to 64 KiB.
+            limiter (:class:`RateLimiter`, optional): Paces the requests and backs off
+                when the server throttles or fails. Defaults to None (no limit).
+        """
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.limiter = limiter
+        self.stats = DownloadStats()
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+
+    def download(self, url:str, path:str) -> int:
+        """Downloads a single file, retrying with exponential backoff.
+
+        Args:
+            url (str): URL of the file.
+            path (str): Destination path.
+
+        Raises:
+            requests.RequestException: Raised if the file could not be
+                downloaded after all retries.
+
+        Returns:
+            int: Number of bytes transferred. Files which already exist
+                are not downloaded again.
+        """
+        if os.path.exists(path):
+            return 0
+        attempt = 0
+        while True:
+            if self.limiter:
+                self.limiter.wait()
+            start = time.perf_counter()
+            try:
+                with Tracer.span('download', Tracer.REMOTE, attempt=attempt) as span:
+                    transferred = span.bytes = self._fetch(url, path)
+                if self.limiter:
+                    self.limiter.success(time.perf_counter() - start)
+                return transferred
+            except requests.RequestException as error:
+                response = getattr(error, 'response', None)
+                retry = response is None or response.status_code in self.RETRY_STATUS
+                if retry and self.limiter and (response is not None or isinstance(error, requests.Timeout)):
+                    # Throttled, failing or overloaded server
+                    self.limiter.failure()
+                if not retry or attempt >= self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                attempt += 1
+
+
+    def _fetch(self, url:str, path:str) -> int:
+        temp = f'{path}.part'
+        offset = os.path.getsize(temp) if os.path.exists(temp) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else None
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416 and offset:
+                # The partial file is already complete
+                os.replace(temp, path)
+                return 0
+            response.raise_for_status()
+            mode = 'ab' if response.status_code == 206 else 'wb'
+
+            transferred = 0
+            with open(temp, mode) as file:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    file.write(chunk)
+                    transferred += len(chunk)
+                    with self._lock:
+                        self.stats.bytes += len(chunk)
+
+        os.replace(temp, path)
+        return transferred
+
+
+    def try_download(self, url:str, path:str) -> bool:
+        """Downloads a file like :meth:`download` and counts it in :attr:`stats`.
+
+        Returns:
+            bool: Whether the file was downloaded, or already existed.
+        """
+        try:
+            self.download(url, path)
+        except Exception:
+            LOGGER.debug(f'Could not download {url}', exc_info=True)
+            with self._lock:
+                self.stats.failed += 1
+            return False
+        with self._lock:
+            self.stats.files += 1
+        return True
+
+
+    def download_all(self, jobs:Iterable[Tuple[str, str]], callback:Callable=None) -> List[Tuple[str, str]]:
+        """Downloads every ``(url, path)`` job with at most ``workers`` concurrent transfers.
+
+        Args:
+            jobs (Iterable[Tuple[str, str]]): URLs and destination paths.
+            callback (Callable, optional): Called with the number of finished
+                jobs every time a job completes. Defaults to None.
+
+        Returns:
+            List[Tuple[str, str]]: The jobs that failed.
+        """
+        failed = list()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.try_download, url, path): (url, path) for url, path in jobs}
+            for index, future in enumerate(as_completed(futures)):
+                if not future.result():
+                    failed.append(futures[future])
+                if callable(callback):
+                    callback(index+1)
+        self.stats.elapsed += time.perf_counter() - start
+        return failed
+
+
+    def close(self):
+        self.session.close()
@@ -1,17 +1,126 @@
+from typing import Optional
 from instaclient import InstaClient
+from instaclient.client.constants import ClientUrls
+from instaclient.instagram.hashtag import Hashtag
 from instaclient.errors.common import InvaildPasswordError, InvalidUserError, SuspisciousLoginAttemptError, VerificationCodeNecessary
+from selenium.common.exceptions import WebDriverException
+from .backend import FetchBackend
+from .browser import BrowserStats, ProfileDir, TimedChromeDriver, block_resources, browser_options
+from .resources import driver_rss
 from .settings import Settings
-import click
+from .sessions import LoginStats, SessionStore
+from .tracer import Tracer
+import click, os, time
 
 class IGClient(InstaClient):
-    def __init__(self):
-        settings = Settings()
+    # Logins of every client of this process, printed in the summary of the commands
+    stats = LoginStats()
+    # Page loads and driver memory of every client of this process
+    browser = BrowserStats()
+
+    def __init__(self, backend:str=None, lean:bool=None):
+        """Client of instacli.
+
+        Args:
+            backend (str, optional): Backend of the read requests, see
+                :meth:`set_backend`. Defaults to the Selenium one.
+            lean (bool, optional): Start the browser in lean mode, without
+                images, media, fonts, trackers, extensions and background
+                features, and with a small persistent profile. Defaults to
+                the ``lean_browser`` setting.
+        """
+        settings = Settings.get()
         super().__init__(driver_path=settings.driver_path, debug=settings.logging, localhost_headless=not settings.driver_visible)
+        self.lean = settings.lean_browser if lean is None else lean
+        self.profile:Optional[ProfileDir] = None
+        self.backend:FetchBackend = None
+        self.set_backend(backend)
+
+
+    def set_backend(self, name:str=None, **options):
+        """Selects the :class:`FetchBackend` sending the read requests of the client.
+
+        Args:
+            name (str, optional): ``FetchBackend.SELENIUM`` or ``FetchBackend.HTTP``.
+                Defaults to ``FetchBackend.SELENIUM``.
+            options: Options of the backend.
+        """
+        if self.backend:
+            self.backend.close()
+        self.backend = FetchBackend.create(name or FetchBackend.SELENIUM, self, **options)
+
+
+    def _request(self, url:str, use_driver:bool=False) -> Optional[dict]:
+        return self.backend.fetch(url, context=use_driver)
+
+
+    def get_hashtag(self, tag:str) -> Optional[Hashtag]:
+        if self.backend.concurrent:
+            # The backend doesn't need the browser, skip the driver check and its pause
+            return InstaClient.get_hashtag.__wrapped__(self, tag)
+        return super().get_hashtag(tag)
+
+
+    def launch(self):
+        """Starts the browser, without loading Instagram."""
+        if self.lean and not self.profile:
+            self.profile = ProfileDir.claim()
+        proxy = f'{self.proxy}:{self.port}' if self.proxy else None
+        options = browser_options(self.localhost_headless, self.profile if self.lean else None, proxy)
+        # Looked up on every load, the stats are reset between the jobs of the daemon
+        self.driver = TimedChromeDriver(lambda seconds: IGClient.browser.record_load(seconds), executable_path=self.driver_path, chrome_options=options, service_log_path=os.devnull)
+        if self.lean:
+            block_resources(self.driver)
+
+
+    def connect(self, login:bool=False, retries:int=0, func:str=None):
+        """Starts the browser and loads Instagram as instaclient does, with
+        the options of the lean mode if it's enabled and timing every page load."""
+        if self.host_type != self.LOCAHOST or self.driver_type != self.CHROMEDRIVER:
+            return super().connect(login, retries, func)
+        try:
+            with Tracer.span('launch browser', lean=self.lean):
+                self.launch()
+        except WebDriverException:
+            if retries < 2:
+                return self.connect(login, retries + 1, func)
+            raise
+        self.driver.get(ClientUrls.HOME_URL)
+        self._dismiss_cookies()
+        if login:
+            self.login(self.username, self.password)
+        return self
+
+
+    def rss(self) -> Optional[int]:
+        """Resident memory in bytes of the chromedriver and of the browser."""
+        return driver_rss(self)
+
+
+    def disconnect(self):
+        self.backend.close()
+        IGClient.browser.record_rss(self.rss())
+        try:
+            return super().disconnect()
+        finally:
+            if self.profile:
+                self.profile.release()
+                self.profile = None
+
 
     def login(self, username: str, password: str) -> bool:
+        store = SessionStore()
+        with Tracer.span('restore session', Tracer.REMOTE):
+            if self.restore_session(store, username, password):
+                return True
+
         while True:
             try:
-                super().login(username, password)
+                start = time.perf_counter()
+                with Tracer.span('instagram login', Tracer.REMOTE):
+                    super().login(username, password)
+                IGClient.stats.record_login()
+                store.save(username, self.session_cookies, time.perf_counter() - start)
                 return True
             except InvalidUserError:
                 username = click.prompt(f"The username {username} is invalid. Please enter it again: ")
@@ -27,4 +136,32 @@ class IGClient(InstaClient):
                 code = click.prompt(f"Instagram detected suspicious activity. You have received a code via {mode}. Please enter it here: ")
             except VerificationCodeNecessary as error:
                 click.echo("Please turn off Instagram two-step-security for the bot to work prperly.")
-                return False
\ No newline at end of file
+                return False
+
+    def restore_session(self, store:SessionStore, username:str, password:str) -> bool:
+        """Logs in with the saved cookies of the account, if they are still valid.
+
+        The session is valid if Instagram doesn't redirect the home page to the
+        login page once the cookies are set. Stale sessions are deleted.
+        """
+        cookies = store.load(username)
+        if not cookies:
+            return False
+        start = time.perf_counter()
+        try:
+            self.set_session_cookies(cookies)
+            self.username = username
+            self.password = password
+            valid = ClientUrls.LOGIN_URL not in self.driver.current_url
+        except Exception:
+            valid = False
+        if not valid:
+            IGClient.stats.record_stale()
+            store.delete(username)
+            self.username = self.password = None
+            if self.driver:
+                self.driver.delete_all_cookies()
+            return False
+        IGClient.stats.record_restore(store.login_time(username) - (time.perf_counter() - start))
+        store.save(username, self.session_cookies)
+        return True
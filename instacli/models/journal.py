@@ -0,0 +1,160 @@
+from typing import List, Optional
+import json, os, threading, time
+from .tracer import Tracer
+
+
+class JobNotFoundError(Exception):
+    def __init__(self, job:str):
+        self.job = job
+        self.message = f'No journal found for the job {job}'
+        super().__init__(self.message)
+
+
+class Journal():
+    def __init__(self, path:str, events:List[dict]=None) -> 'Journal':
+        """Append-only, crash safe log of the progress of a scrape.
+
+        Every event is written as a JSON line and fsync'd before :meth:`record`
+        returns, so an event is either fully on disk or missing. A line torn
+        by a crash is ignored when the journal is loaded again. Events can be
+        recorded from several threads.
+
+        Events of the rows of an :class:`OutputSink` are kept with :meth:`stage`
+        instead, and written together by :meth:`sync` when the sink is flushed,
+        so that there's one disk sync per batch of rows rather than per row.
+
+        Use :meth:`create` to start a new job and :meth:`load` to resume one.
+
+        Args:
+            path (str): Path of the journal file.
+            events (List[dict], optional): Events already in the journal.
+        """
+        self.path = path
+        self.events:List[dict] = events or list()
+        self._staged:List[str] = list()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def path_of(folder:str, job:str) -> str:
+        return os.path.join(folder, f'{job}.journal')
+
+
+    @classmethod
+    def create(cls, folder:str, job:str, **params) -> 'Journal':
+        """Starts the journal of a new job.
+
+        Args:
+            folder (str): Folder of the job's output.
+            job (str): Unique name of the job.
+            **params: Options of the command, checked by :meth:`check` on resume.
+        """
+        journal = cls(cls.path_of(folder, job))
+        journal.record('start', job=job, params=params)
+        return journal
+
+
+    @classmethod
+    def load(cls, folder:str, job:str) -> 'Journal':
+        """Loads the journal of an interrupted job.
+
+        Raises:
+            JobNotFoundError: Raised if the job has no journal in ``folder``.
+        """
+        path = cls.path_of(folder, job)
+        if not os.path.exists(path):
+            raise JobNotFoundError(job)
+
+        events = list()
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # Torn write
+                    continue
+        journal = cls(path, events)
+        if os.path.getsize(path) and not cls._ends_with_newline(path):
+            journal._file.write('\n')
+        journal.record('resume')
+        return journal
+
+
+    @staticmethod
+    def _ends_with_newline(path:str) -> bool:
+        with open(path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b'\n'
+
+
+    @property
+    def params(self) -> dict:
+        start = self.last('start')
+        return start.get('params', dict()) if start else dict()
+
+
+    def check(self, **params) -> bool:
+        """Whether the options of a resumed command match the ones of the job."""
+        return all(self.params.get(key) == value for key, value in params.items())
+
+
+    def record(self, event:str, **data):
+        """Appends an event and syncs it to disk.
+
+        Args:
+            event (str): Name of the event.
+            **data: JSON serializable data of the event.
+        """
+        entry = {'event': event, 'time': time.time(), **data}
+        line = json.dumps(entry) + '\n'
+        with self._lock, Tracer.span('journal record', Tracer.IO, event=event) as span:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            span.bytes = len(line)
+            self.events.append(entry)
+
+
+    def stage(self, event:str, **data):
+        """Adds an event which is written to disk by the next :meth:`sync`,
+        e.g. the event of a row which isn't flushed to the output yet.
+
+        Args:
+            event (str): Name of the event.
+            **data: JSON serializable data of the event.
+        """
+        entry = {'event': event, 'time': time.time(), **data}
+        with self._lock:
+            self._staged.append(json.dumps(entry) + '\n')
+            self.events.append(entry)
+
+
+    def sync(self):
+        """Writes the staged events and syncs them to disk."""
+        with self._lock:
+            if not self._staged:
+                return
+            lines = ''.join(self._staged)
+            self._staged = list()
+            with Tracer.span('journal sync', Tracer.IO, events=lines.count('\n')) as span:
+                self._file.write(lines)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                span.bytes = len(lines)
+
+
+    def all(self, event:str) -> List[dict]:
+        return [entry for entry in self.events if entry.get('event') == event]
+
+
+    def last(self, event:str) -> Optional[dict]:
+        for entry in reversed(self.events):
+            if entry.get('event') == event:
+                return entry
+        return None
+
+
+    def close(self):
+        self.sync()
+        self._file.close()
@@ -0,0 +1,316 @@
+from typing import Iterator, List, Optional
+from urllib.parse import quote
+import json, logging
+from instaclient.errors.common import InvalidInstaRequestError, InvalidUserError
+from instaclient.instagram.post import Post
+from instaclient.instagram.profile import Profile
+from .journal import Journal
+from .ratelimiter import RateLimits
+from .records import ProfileRecord
+
+LOGGER = logging.getLogger(__name__)
+GRAPH_QUERY = 'https://www.instagram.com/graphql/query/?query_hash={}&variables={}'
+
+
+def graph_url(query_hash:str, **variables) -> str:
+    variables = {key: value for key, value in variables.items() if value is not None}
+    return GRAPH_QUERY.format(query_hash, quote(json.dumps(variables, separators=(',', ':'))))
+
+
+def limited(limits:Optional[RateLimits], action:str, func, *args, **kwargs):
+    """Calls ``func`` through the limiter of ``action``, if there are ``limits``."""
+    if limits:
+        return limits.call(action, func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+
+def request_page(client, url:str, limits:RateLimits=None, retries:int=3) -> Optional[dict]:
+    """Requests a GraphQL page. If Instagram rate limits the request, the
+    pagination limiter backs off and the page is requested again, up to
+    ``retries`` times.
+    """
+    for attempt in range(retries + 1):
+        result = limited(limits, RateLimits.PAGINATION, client._request, url, use_driver=True)
+        throttled = result and result.get('status') != 'ok' and result.get('message') == 'rate limited'
+        if not throttled or not limits or attempt == retries:
+            return result
+        limits.get(RateLimits.PAGINATION).failure()
+        LOGGER.info(f'Rate limited, retrying at {limits.get(RateLimits.PAGINATION)}')
+    return result
+
+
+class PostIterator():
+    QUERY_HASH = '003056d32c2554def87228bc3fd9668a'
+    # Most posts a profile can pin at the top of its posts
+    PINNED = 3
+
+    def __init__(self, client, profile:Profile, end_cursor:str=None, start:int=None, end:int=None, minlikes:int=None, page_size:int=50, journal:Journal=None, limits:RateLimits=None) -> 'PostIterator':
+        """Streams a profile's posts, newest first, one GraphQL page at a time.
+
+        Every page is requested once, starting from ``end_cursor``. The date
+        range and ``minlikes`` filters are applied to the thin page data, so
+        only matching posts are loaded with ``client.get_post``, and posts
+        without a timestamp are skipped. Since posts are returned newest first,
+        iteration stops after more consecutive posts older than ``start`` than
+        a profile can pin, as pinned posts are listed first whatever their date.
+
+        Iterating loads the posts one at a time. To load them concurrently
+        while the next pages are requested, pass the shortcodes yielded by
+        :meth:`candidates` to :meth:`load` from other threads.
+
+        If a ``journal`` is given, every page and every loaded post which did
+        not match the filters is recorded, and the iteration picks up from
+        the journal's last page, after the posts of the recorded pages which
+        were neither yielded nor skipped. Yielded posts must be recorded by the caller
+        as ``post`` events with a ``shortcode``.
+
+        Args:
+            client (:class:`IGClient`): Logged in client.
+            profile (:class:`Profile`): Profile to scrape posts from.
+            end_cursor (str, optional): Cursor to resume the pagination from.
+            start (int, optional): Unix timestamp of the oldest post to include.
+            end (int, optional): Unix timestamp of the newest post to include.
+            minlikes (int, optional): Minimum number of likes of a post.
+            page_size (int, optional): Number of posts per page. Defaults to 50.
+            journal (:class:`Journal`, optional): Checkpoint journal of the scrape.
+            limits (:class:`RateLimits`, optional): Paces the page requests and
+                the loaded posts. Defaults to None (no limit).
+        """
+        self.client = client
+        self.profile = profile
+        self.cursor = end_cursor
+        self.start = start
+        self.end = end
+        self.minlikes = minlikes
+        self.page_size = page_size
+        self.seen = set()
+        self.failed:List[str] = list()
+        self.finished = False
+        self.older = 0
+        self.pending:List[dict] = list()
+        self.journal = journal
+        self.limits = limits
+        if journal:
+            self._restore(journal)
+
+
+    def _restore(self, journal:Journal):
+        pages = journal.all('page')
+        if not pages:
+            return
+        self.cursor = pages[-1]['cursor']
+        self.finished = pages[-1]['finished']
+        for entry in journal.all('post') + journal.all('skipped'):
+            self.seen.add(entry['shortcode'])
+        # Pages are recorded as soon as they are received, while the posts of
+        # the previous ones may still be loading, so the posts of every page
+        # which were neither saved nor skipped are loaded again
+        self.pending = [node for page in pages for node in page['nodes'] if node['shortcode'] not in self.seen]
+
+
+    def pages(self) -> Iterator[List[dict]]:
+        """Yields the thin post nodes of every page.
+
+        :attr:`cursor` is advanced once a page has been received, so it
+        always points at the first page not yet yielded.
+
+        Raises:
+            InvalidInstaRequestError: Raised if a page can't be loaded.
+        """
+        while not self.finished:
+            url = graph_url(self.QUERY_HASH, id=self.profile.id, first=self.page_size, after=self.cursor)
+            result = request_page(self.client, url, self.limits)
+            if not result or result.get('status') != 'ok':
+                raise InvalidInstaRequestError(url)
+
+            data = result['data']['user']['edge_owner_to_timeline_media']
+            page_info = data.get('page_info') or dict()
+            if page_info.get('has_next_page') and page_info.get('end_cursor'):
+                self.cursor = page_info['end_cursor']
+            else:
+                self.finished = True
+
+            nodes = [edge['node'] for edge in data['edges']]
+            if self.journal:
+                self.journal.record('page', cursor=self.cursor, finished=self.finished, nodes=[{
+                    'shortcode': node['shortcode'],
+                    'taken_at_timestamp': node.get('taken_at_timestamp'),
+                    'edge_media_preview_like': node.get('edge_media_preview_like')
+                } for node in nodes])
+            yield nodes
+
+
+    def _matches(self, timestamp:Optional[int], likes:Optional[int]) -> bool:
+        if timestamp is None:
+            return False
+        if self.start and timestamp < self.start:
+            return False
+        if self.end and timestamp > self.end:
+            return False
+        if self.minlikes and likes is not None and likes < self.minlikes:
+            return False
+        return True
+
+
+    def _pages(self) -> Iterator[List[dict]]:
+        if self.pending:
+            yield self.pending
+            self.pending = list()
+        yield from self.pages()
+
+
+    def candidates(self) -> Iterator[str]:
+        """Yields the shortcodes of the posts which match the filters on their
+        thin page data, to be loaded with :meth:`load`.
+        """
+        for page in self._pages():
+            for node in page:
+                shortcode = node['shortcode']
+                if shortcode in self.seen:
+                    continue
+                self.seen.add(shortcode)
+
+                timestamp = node.get('taken_at_timestamp')
+                if self.start and timestamp is not None:
+                    # Pinned posts may be older than the next ones, but past
+                    # them every post is older than the previous one
+                    self.older = self.older + 1 if timestamp < self.start else 0
+                    if self.older > self.PINNED:
+                        self.finished = True
+                        return
+                likes = (node.get('edge_media_preview_like') or dict()).get('count')
+                if self._matches(timestamp, likes):
+                    yield shortcode
+
+
+    def load(self, shortcode:str, client=None) -> Optional[Post]:
+        """Loads a post and returns it if it matches the filters. Posts which
+        don't match or can't be loaded are recorded in the journal, and the
+        latter in :attr:`failed`. Can be called from several threads.
+
+        Args:
+            shortcode (str): Shortcode of the post, from :meth:`candidates`.
+            client (:class:`IGClient`, optional): Client to load the post with.
+                Defaults to the client of the iterator.
+        """
+        try:
+            post = limited(self.limits, RateLimits.POST, (client or self.client).get_post, shortcode)
+        except Exception:
+            LOGGER.debug(f'Could not load post {shortcode}', exc_info=True)
+            self.failed.append(shortcode)
+            if self.journal:
+                self.journal.record('skipped', shortcode=shortcode, failed=True)
+            return None
+        if self._matches(post.timestamp, post.likes_count):
+            return post
+        if self.journal:
+            self.journal.record('skipped', shortcode=shortcode)
+        return None
+
+
+    def __iter__(self) -> Iterator[Post]:
+        for shortcode in self.candidates():
+            post = self.load(shortcode)
+            if post:
+                yield post
+
+
+class FollowIterator():
+    FOLLOWERS = 'followers'
+    FOLLOWING = 'following'
+    QUERY_HASHES = {FOLLOWERS: '5aefa9893005572d237da5068082d8d5', FOLLOWING: '3dec7e2c57367ef3da3d987d89f9dbc8'}
+    EDGES = {FOLLOWERS: 'edge_followed_by', FOLLOWING: 'edge_follow'}
+    # Profile attributes set from the pages, known before a deep scrape
+    FIELDS = ('id', 'username', 'name', 'is_private', 'is_verified', 'follows_viewer', 'followed_by_viewer', 'requested_by_viewer', 'profile_pic_url')
+
+    def __init__(self, client, target:str, kind:str, count:int, end_cursor:str=None, page_size:int=50, limits:RateLimits=None) -> 'FollowIterator':
+        """Streams a user's followers or following, one GraphQL page at a time.
+
+        Mirrors ``client.get_followers`` and ``client.get_following``, but yields
+        every page as soon as it is received instead of returning the whole
+        list at the end. Cursors are handled in the same format as instaclient,
+        without the trailing ``==``.
+
+        Args:
+            client (:class:`IGClient`): Logged in client.
+            target (str): Username of the user to scrape.
+            kind (str): Either ``FollowIterator.FOLLOWERS`` or ``FollowIterator.FOLLOWING``.
+            count (int): Maximum number of users to scrape.
+            end_cursor (str, optional): Cursor to resume the pagination from.
+            page_size (int, optional): Number of users per page. Defaults to 50.
+            limits (:class:`RateLimits`, optional): Paces the page requests. Rate
+                limited pages are requested again after backing off. Defaults
+                to None (no limit).
+        """
+        self.client = client
+        self.target = target
+        self.kind = kind
+        self.count = count
+        self.cursor = end_cursor
+        self.page_size = page_size
+        self.scraped = 0
+        self.rate_limited = False
+        self.finished = False
+        self.seen = set()
+        self.limits = limits
+        self.profile:Optional[Profile] = None
+
+
+    def pages(self) -> Iterator[List[ProfileRecord]]:
+        """Yields the thin :class:`ProfileRecord` of every user of every page.
+
+        :attr:`cursor` is advanced once a page has been received, so it
+        always points at the first page not yet yielded. If Instagram rate
+        limits the scrape, the iteration stops and :attr:`rate_limited` is set.
+
+        Raises:
+            InvalidUserError: Raised if the target user does not exist.
+            InvalidInstaRequestError: Raised if a page can't be loaded.
+        """
+        profile = self.profile = limited(self.limits, RateLimits.PROFILE, self.client.get_profile, self.target)
+        if not profile:
+            raise InvalidUserError(self.target)
+
+        while not self.finished and self.scraped < self.count:
+            after = f'{self.cursor}==' if self.cursor else None
+            url = graph_url(self.QUERY_HASHES[self.kind], id=profile.id, include_reel=True, fetch_mutual=False, first=self.page_size, after=after)
+            result = request_page(self.client, url, self.limits)
+            if not result:
+                raise InvalidInstaRequestError(url)
+            if result.get('status') != 'ok':
+                if result.get('message') == 'rate limited':
+                    LOGGER.warning(f'Rate limit reached. Resume with cursor {self.cursor}')
+                    self.rate_limited = True
+                    return
+                raise InvalidInstaRequestError(url)
+
+            data = result['data']['user'][self.EDGES[self.kind]]
+            page_info = data.get('page_info') or dict()
+            if page_info.get('end_cursor'):
+                self.cursor = page_info['end_cursor'].replace('==', '')
+            else:
+                self.cursor = None
+                self.finished = True
+
+            page = list()
+            for edge in data['edges']:
+                user = edge['node']
+                if user['id'] in self.seen:
+                    continue
+                if self.scraped >= self.count:
+                    break
+                self.seen.add(user['id'])
+                self.scraped += 1
+                page.append(ProfileRecord(
+                    id=user['id'],
+                    viewer=self.client.username,
+                    username=user['username'],
+                    name=user['full_name'],
+                    is_private=user['is_private'],
+                    is_verified=user['is_verified'],
+                    follows_viewer=user.get('follows_viewer'),
+                    followed_by_viewer=user.get('followed_by_viewer'),
+                    requested_by_viewer=user.get('requested_by_viewer'),
+                    profile_pic_url=user.get('profile_pic_url')
+                ))
+            yield page
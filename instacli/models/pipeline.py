@@ -0,0 +1,298 @@
+from typing import Callable, List, Optional
+import queue, threading, time
+from .tracer import Tracer
+
+# End of the items of a queue
+DONE = object()
+
+
+class PipelineStopped(Exception):
+    """Raised by :meth:`Pipeline.emit` once the pipeline doesn't take more items."""
+
+
+class StageStats():
+    def __init__(self, name:str, workers:int, capacity:int) -> 'StageStats':
+        """Counters of a pipeline stage and of its input queue.
+
+        ``idle`` is the time the workers waited for items, ``blocked`` the time
+        they waited for room in the next queue, i.e. backpressure from the
+        stages after them.
+        """
+        self.name = name
+        self.workers = workers
+        self.capacity = capacity
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+        self.elapsed = 0.0
+        self.peak = 0
+        self._samples = 0
+        self._occupied = 0
+
+    def sample(self, size:int):
+        self._samples += 1
+        self._occupied += size
+        self.peak = max(self.peak, size)
+
+    @property
+    def occupancy(self) -> float:
+        """Average number of items waiting in the input queue."""
+        return self._occupied / self._samples if self._samples else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Items processed per second while the stage was running."""
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self) -> str:
+        summary = f'{self.name}: {self.done} done'
+        if self.failed:
+            summary += f', {self.failed} failed'
+        if self.skipped:
+            summary += f', {self.skipped} skipped'
+        if not self.capacity:
+            # The source, which has no input queue
+            return summary + f' ({self.throughput:.2f}/s), blocked {self.blocked:.1f}s'
+        summary += f' ({self.throughput:.2f}/s with {self.workers} workers), queue {self.occupancy:.1f} avg / {self.peak} peak of {self.capacity}'
+        return summary + f', idle {self.idle:.1f}s, blocked {self.blocked:.1f}s'
+
+
+class Stage():
+    def __init__(self, name:str, func:Callable, workers:int, capacity:int, errors:Callable=None) -> 'Stage':
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.errors = errors
+        self.input = queue.Queue(capacity)
+        self.output:Optional[queue.Queue] = None
+        self.stats = StageStats(name, workers, capacity)
+        self.discard = False
+        self.running = workers
+        self.lock = threading.Lock()
+
+
+class Pipeline():
+    # Seconds between checks of whether the pipeline was aborted while waiting on a queue
+    POLL = 0.1
+
+    def __init__(self, capacity:int=32) -> 'Pipeline':
+        """Stages connected by bounded queues, each processed by its own threads.
+
+        A source function produces the items with :meth:`emit`, and every
+        stage passes the value returned by its function to the next one, so
+        the stages overlap: e.g. posts are loaded while the next page is
+        requested, and written while the next posts load. When a queue is
+        full the stage before it waits, which slows down the whole pipeline
+        to its slowest stage instead of buffering the items in memory.
+
+        Args:
+            capacity (int, optional): Default size of the stage queues. Defaults to 32.
+        """
+        self.capacity = capacity
+        self.stages:List[Stage] = list()
+        self.source_stats:Optional[StageStats] = None
+        self._produce:Optional[Callable] = None
+        self._error:Optional[BaseException] = None
+        self._aborted = threading.Event()
+        self._finished = threading.Event()
+
+
+    @property
+    def stats(self) -> List[StageStats]:
+        """Counters of the source and of every stage, in order."""
+        return [stats for stats in [self.source_stats] if stats] + [stage.stats for stage in self.stages]
+
+
+    def source(self, name:str, produce:Callable) -> 'Pipeline':
+        """Sets the function which produces the items.
+
+        Args:
+            name (str): Name of the source in the stats.
+            produce (Callable): Function called with :meth:`emit`, which it calls
+                with every item. It runs in its own thread.
+        """
+        self._produce = produce
+        self.source_stats = StageStats(name, 1, 0)
+        return self
+
+
+    def stage(self, name:str, func:Callable, workers:int=1, capacity:int=None, errors:Callable=None) -> 'Pipeline':
+        """Appends a stage.
+
+        Args:
+            name (str): Name of the stage in the stats and in the trace.
+            func (Callable): Function called with every item. Its return value
+                is passed to the next stage, unless it's None.
+            workers (int, optional): Number of threads calling ``func``. Defaults to 1.
+            capacity (int, optional): Size of the input queue. Defaults to the
+                capacity of the pipeline.
+            errors (Callable, optional): Called with the item and the exception
+                if ``func`` raises, after which the item is dropped. If not set,
+                an exception aborts the pipeline and is raised by :meth:`run`.
+        """
+        stage = Stage(name, func, workers, capacity or self.capacity, errors)
+        if self.stages:
+            self.stages[-1].output = stage.input
+        self.stages.append(stage)
+        return self
+
+
+    def _put(self, target:queue.Queue, item) -> float:
+        """Puts an item in a queue, waiting for room. Returns the time waited."""
+        start = time.perf_counter()
+        while True:
+            try:
+                target.put(item, timeout=self.POLL)
+                return time.perf_counter() - start
+            except queue.Full:
+                if self._aborted.is_set():
+                    raise PipelineStopped()
+
+
+    def _get(self, stage:Stage):
+        while True:
+            try:
+                return stage.input.get(timeout=self.POLL)
+            except queue.Empty:
+                if self._aborted.is_set():
+                    raise PipelineStopped()
+
+
+    def emit(self, item):
+        """Passes an item from the source to the first stage, waiting while its queue is full.
+
+        Raises:
+            PipelineStopped: If the pipeline was aborted or :meth:`finish` was called.
+        """
+        if self._finished.is_set() or self._aborted.is_set():
+            raise PipelineStopped()
+        self.source_stats.blocked += self._put(self.stages[0].input, item)
+        self.source_stats.done += 1
+
+
+    def finish(self, stage:str):
+        """Stops the source and drops the items not yet processed by the stages
+        up to ``stage``. The stages after it finish the items they received.
+
+        Call it from a stage once the pipeline has produced enough items.
+        """
+        self._finished.set()
+        for each in self.stages:
+            each.discard = True
+            if each.name == stage:
+                break
+
+
+    def _abort(self, error:BaseException):
+        if not self._aborted.is_set():
+            self._error = error
+            self._aborted.set()
+
+
+    def _run_source(self):
+        start = time.perf_counter()
+        try:
+            with Tracer.span(self.source_stats.name):
+                self._produce(self.emit)
+        except PipelineStopped:
+            pass
+        except BaseException as error:
+            self._abort(error)
+        finally:
+            self.source_stats.elapsed = time.perf_counter() - start
+        try:
+            self._put(self.stages[0].input, DONE)
+        except PipelineStopped:
+            pass
+
+
+    def _run_stage(self, stage:Stage, start:float):
+        stats = stage.stats
+        try:
+            with Tracer.span(stage.name, workers=stage.workers):
+                while True:
+                    waiting = time.perf_counter()
+                    with stage.lock:
+                        stats.sample(stage.input.qsize())
+                    item = self._get(stage)
+                    stats.idle += time.perf_counter() - waiting
+                    if item is DONE:
+                        # Let the other workers of the stage see the end too
+                        stage.input.put(DONE)
+                        break
+                    if stage.discard:
+                        stats.skipped += 1
+                        continue
+
+                    began = time.perf_counter()
+                    try:
+                        result = stage.func(item)
+                    except Exception as error:
+                        if not stage.errors:
+                            raise
+                        with stage.lock:
+                            stats.failed += 1
+                        stage.errors(item, error)
+                        continue
+                    finally:
+                        with stage.lock:
+                            stats.busy += time.perf_counter() - began
+                    with stage.lock:
+                        stats.done += 1
+                    if result is not None and stage.output is not None:
+                        blocked = self._put(stage.output, result)
+                        with stage.lock:
+                            stats.blocked += blocked
+        except PipelineStopped:
+            pass
+        except BaseException as error:
+            self._abort(error)
+        finally:
+            with stage.lock:
+                stage.running -= 1
+                last = stage.running == 0
+            if last:
+                stats.elapsed = time.perf_counter() - start
+                if stage.output is not None:
+                    try:
+                        self._put(stage.output, DONE)
+                    except PipelineStopped:
+                        pass
+
+
+    def run(self):
+        """Runs the source and the stages until every item went through all of
+        them, or one failed.
+
+        Raises:
+            Exception: The first exception raised by the source, by a stage
+                without ``errors`` handler or by an ``errors`` handler.
+        """
+        if not self.stages:
+            raise ValueError('A pipeline needs at least one stage')
+        start = time.perf_counter()
+        threads = list()
+        if self._produce:
+            threads.append(threading.Thread(target=self._run_source, name=self.source_stats.name, daemon=True))
+        else:
+            self.stages[0].input.put(DONE)
+        for stage in self.stages:
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(target=self._run_stage, args=(stage, start), name=f'{stage.name}-{worker+1}', daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(self.POLL)
+        except BaseException as error:
+            # e.g. KeyboardInterrupt: stop the threads before leaving
+            self._abort(error)
+            for thread in threads:
+                thread.join()
+            raise
+        if self._error is not None:
+            raise self._error
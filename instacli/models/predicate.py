@@ -0,0 +1,160 @@
+from typing import Callable, Iterable, Optional
+import ast, operator
+
+# Value of an attribute which isn't known yet, e.g. before a deep scrape
+UNKNOWN = object()
+
+OPERATORS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+    ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.In: lambda value, values: value in values,
+    ast.NotIn: lambda value, values: value not in values,
+}
+
+
+class PredicateError(Exception):
+    def __init__(self, expression:str, reason:str):
+        self.expression = expression
+        self.message = f'Invalid filter "{expression}": {reason}'
+        super().__init__(self.message)
+
+
+class Predicate():
+    def __init__(self, expression:str, fields:Iterable[str]=None) -> 'Predicate':
+        """A filter expression over the attributes of scraped items, e.g.
+        ``not is_private and is_verified and follower_count > 1000``.
+
+        Expressions support ``and``, ``or``, ``not``, parentheses, comparisons
+        (``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in``, ``not in``),
+        numbers, strings, lists, ``True``, ``False`` and ``None``. An attribute
+        on its own is true if it's set and not empty.
+
+        The expression is compiled once into nested functions. Items can be
+        evaluated on part of their attributes, see :meth:`evaluate`.
+
+        Args:
+            expression (str): The filter expression.
+            fields (Iterable[str], optional): Attributes the expression may use.
+                Defaults to any attribute.
+
+        Raises:
+            PredicateError: If the expression isn't valid.
+        """
+        self.expression = expression
+        self.fields = set()
+        self._allowed = set(fields) if fields is not None else None
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as error:
+            raise PredicateError(expression, error.msg)
+        self._evaluate = self._compile(tree.body)
+
+
+    def _compile(self, node:ast.AST) -> Callable:
+        """Compiles a node into a function of the item's attributes and the known
+        attribute names, which returns the node's value or ``UNKNOWN``."""
+        if isinstance(node, ast.BoolOp):
+            operands = [self._compile(value) for value in node.values]
+            decisive = isinstance(node.op, ast.Or)
+
+            def boolean(values, known):
+                # Three-valued: an unknown operand only matters if no other one decides
+                result = not decisive
+                for operand in operands:
+                    value = truth(operand(values, known))
+                    if value is decisive:
+                        return decisive
+                    if value is UNKNOWN:
+                        result = UNKNOWN
+                return result
+            return boolean
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = self._compile(node.operand)
+
+            def negation(values, known):
+                value = truth(operand(values, known))
+                return value if value is UNKNOWN else not value
+            return negation
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+            return self._compile(ast.Constant(-node.operand.value))
+
+        if isinstance(node, ast.Compare):
+            operands = [self._compile(node.left)] + [self._compile(comparator) for comparator in node.comparators]
+            comparisons = [OPERATORS[type(op)] for op in node.ops]
+
+            def compare(values, known):
+                result = True
+                left = operands[0](values, known)
+                for comparison, operand in zip(comparisons, operands[1:]):
+                    right = operand(values, known)
+                    if left is UNKNOWN or right is UNKNOWN:
+                        result = UNKNOWN
+                    else:
+                        try:
+                            if not comparison(left, right):
+                                return False
+                        except TypeError:
+                            # Missing attributes, e.g. None > 1000, don't match
+                            return False
+                    left = right
+                return result
+            return compare
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            if self._allowed is not None and name not in self._allowed:
+                raise PredicateError(self.expression, f"unknown attribute {name}. Use one of {', '.join(sorted(self._allowed))}")
+            self.fields.add(name)
+
+            def attribute(values, known):
+                if known is not None and name not in known:
+                    return UNKNOWN
+                return values.get(name)
+            return attribute
+
+        if isinstance(node, ast.Constant) and (node.value is None or isinstance(node.value, (bool, int, float, str))):
+            constant = node.value
+            return lambda values, known: constant
+
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            elements = [self._compile(element) for element in node.elts]
+
+            def collection(values, known):
+                items = [element(values, known) for element in elements]
+                return UNKNOWN if any(item is UNKNOWN for item in items) else items
+            return collection
+
+        raise PredicateError(self.expression, f"{ast.get_source_segment(self.expression.strip(), node) or type(node).__name__} is not supported")
+
+
+    def evaluate(self, values:dict, known:Iterable[str]=None) -> Optional[bool]:
+        """Whether an item matches, or None if that depends on attributes which
+        aren't known yet.
+
+        Args:
+            values (dict): Attributes of the item, e.g. ``vars(profile)``.
+            known (Iterable[str], optional): Names of the attributes which are
+                known. Defaults to all of them.
+        """
+        result = truth(self._evaluate(values, known))
+        return None if result is UNKNOWN else result
+
+
+    def decidable(self, known:Iterable[str]) -> bool:
+        """Whether every item can be evaluated with only the ``known`` attributes."""
+        return self.fields <= set(known)
+
+
+    def __call__(self, values:dict) -> bool:
+        return self.evaluate(values) is True
+
+
+    def __repr__(self) -> str:
+        return self.expression
+
+
+def truth(value):
+    return value if value is UNKNOWN else bool(value)
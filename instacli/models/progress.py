@@ -1,13 +1,295 @@
+from collections import deque
+from typing import Dict, List, Optional, TextIO
+import json, os, sys, threading, time
+import click
+
+
 class Progress():
-    def __init__(self, bar, progress=None) -> None:
-        self.bar = bar
-        self.progress = progress
-
-    def update_progress(self, new_progress):
-        if not self.progress:
-            self.progress = new_progress
-            difference = new_progress
-        else:
-            difference = new_progress - self.progress
-            self.progress = new_progress
-        self.bar.update(difference)
\ No newline at end of file
+    # Seconds of updates the rate is measured over
+    WINDOW = 10.0
+
+    def __init__(self, telemetry:'Telemetry', command:Optional[str], phase:str, total:int=None, unit:str='items', done:int=0, labels:dict=None) -> 'Progress':
+        """Progress of a phase of a command, published to the reporters of its
+        :class:`Telemetry`. Use :meth:`Telemetry.phase` to start one.
+
+        Updates are cheap: they only change the counters under a lock. The
+        reporters are told at most every :attr:`Telemetry.interval` seconds,
+        and when the phase starts and ends. Thread safe.
+        """
+        self.telemetry = telemetry
+        self.command = command
+        self.phase = phase
+        self.total = total
+        self.unit = unit
+        self.done = done
+        self.labels = labels or dict()
+        self.counters:Dict[str, int] = dict()
+        self.started = time.monotonic()
+        self.ended = None
+        self._next = 0.0
+        self._samples = deque([(self.started, done)])
+        self._lock = threading.Lock()
+
+
+    def advance(self, count:int=1):
+        """Adds ``count`` processed items."""
+        with self._lock:
+            self.done += count
+        self._publish()
+
+
+    def update(self, done:int, total:int=None):
+        """Sets the number of processed items, e.g. the length of a list which
+        grows. A lower number than before starts the rate over, instead of
+        counting backwards."""
+        with self._lock:
+            if done < self.done:
+                self._samples = deque([(time.monotonic(), done)])
+            self.done = done
+            if total is not None:
+                self.total = total
+        self._publish()
+
+
+    def extend(self, count:int):
+        """Adds ``count`` items to the total, for phases whose items arrive while they run."""
+        with self._lock:
+            self.total = (self.total or 0) + count
+        self._publish()
+
+
+    def count(self, counter:str, count:int=1):
+        """Adds to a named counter of the phase, e.g. failed or skipped items."""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + count
+        self._publish()
+
+
+    def _publish(self):
+        now = time.monotonic()
+        if now < self._next:
+            return
+        with self._lock:
+            if now < self._next:
+                return
+            self._next = now + self.telemetry.interval
+            self._samples.append((now, self.done))
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.WINDOW:
+                self._samples.popleft()
+        self.telemetry.publish(self, 'progress')
+
+
+    @property
+    def elapsed(self) -> float:
+        return (self.ended or time.monotonic()) - self.started
+
+
+    @property
+    def rate(self) -> float:
+        """Items per second over the last :attr:`WINDOW` seconds."""
+        if self.ended:
+            start, done = self._samples[0]
+            return (self.done - done) / (self.ended - start) if self.ended > start else 0.0
+        start, done = self._samples[0]
+        now = time.monotonic()
+        return (self.done - done) / (now - start) if now > start else 0.0
+
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left at the current rate, if the total is known."""
+        rate = self.rate
+        if self.total is None or not rate:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+
+    def end(self):
+        """Ends the phase. Ending it again does nothing."""
+        with self._lock:
+            if self.ended:
+                return
+            self.ended = time.monotonic()
+        self.telemetry.publish(self, 'end')
+
+
+    def to_dict(self, event:str) -> dict:
+        with self._lock:
+            data = {
+                'event': event, 'time': time.time(), 'pid': os.getpid(), 'command': self.command, 'phase': self.phase,
+                'done': self.done, 'total': self.total, 'unit': self.unit, 'counters': dict(self.counters),
+            }
+        data.update(elapsed=round(self.elapsed, 3), rate=round(self.rate, 3))
+        eta = self.eta
+        data['eta'] = round(eta, 1) if eta is not None else None
+        data.update(self.labels)
+        return data
+
+
+    def __enter__(self) -> 'Progress':
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        self.end()
+
+
+def duration(seconds:float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02}:{seconds:02}' if hours else f'{minutes}:{seconds:02}'
+
+
+class BarReporter():
+    def __init__(self, stream:TextIO=None) -> 'BarReporter':
+        """Renders the running phases on one terminal line, rewritten in place,
+        and a line with the totals of every phase when it ends."""
+        self.stream = stream or sys.stderr
+        self.phases:List[Progress] = list()
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def line(progress:Progress) -> str:
+        text = f'{progress.phase} {progress.done}'
+        if progress.total:
+            text += f'/{progress.total} {min(progress.done / progress.total, 1.0):4.0%}'
+        text += f' {progress.unit}, {progress.rate:.1f}/s'
+        if progress.ended:
+            text += f' in {duration(progress.elapsed)}'
+        elif progress.eta is not None:
+            text += f', ETA {duration(progress.eta)}'
+        for counter, count in progress.counters.items():
+            text += f', {count} {counter}'
+        return text
+
+
+    def report(self, progress:Progress, event:str):
+        with self._lock:
+            if progress not in self.phases:
+                self.phases.append(progress)
+            if event == 'end':
+                self.phases.remove(progress)
+                self.stream.write('\r\x1b[K' + self.line(progress) + '\n')
+            if self.phases:
+                self.stream.write('\r\x1b[K' + ' | '.join(self.line(phase) for phase in self.phases))
+            self.stream.flush()
+
+
+    def clear(self):
+        with self._lock:
+            if self.phases:
+                self.stream.write('\r\x1b[K')
+                self.stream.flush()
+
+
+    def close(self):
+        with self._lock:
+            if self.phases:
+                self.stream.write('\n')
+                self.stream.flush()
+            self.phases = list()
+
+
+class JsonReporter():
+    def __init__(self, stream:TextIO, owned:bool=False) -> 'JsonReporter':
+        """Writes every event as a line of JSON, for schedulers which track
+        the commands they run.
+
+        Args:
+            stream (TextIO): Stream of the events, e.g. stdout or a file.
+            owned (bool, optional): Whether to close the stream when the
+                reporter is closed. Defaults to False.
+        """
+        self.stream = stream
+        self.owned = owned
+        self._lock = threading.Lock()
+
+
+    def clear(self):
+        pass
+
+
+    def report(self, progress:Progress, event:str):
+        line = json.dumps(progress.to_dict(event)) + '\n'
+        with self._lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+
+    def close(self):
+        if self.owned:
+            self.stream.close()
+
+
+class Telemetry():
+    # Telemetry of the running command, set by --progress
+    active:Optional['Telemetry'] = None
+    # Stream and telemetry used without --progress
+    _default:Optional[tuple] = None
+
+    BAR = 'bar'
+    JSON = 'json'
+    NONE = 'none'
+
+    def __init__(self, reporters:list=None, interval:float=0.5) -> 'Telemetry':
+        """Bus which the commands publish the progress of their phases to, and
+        which forwards it to reporters: a bar on the terminal, or JSON lines.
+
+        Commands start phases with :meth:`phase`. Without an active telemetry,
+        phases are shown with a bar if stderr is a terminal.
+
+        Args:
+            reporters (list, optional): Objects with ``report(progress, event)``,
+                ``clear()`` and ``close()`` methods. Defaults to none.
+            interval (float, optional): Seconds between two reports of a phase.
+                Defaults to 0.5.
+        """
+        self.reporters = reporters or list()
+        self.interval = interval
+
+
+    @classmethod
+    def default(cls) -> 'Telemetry':
+        """Telemetry with a bar on stderr if it's a terminal, shared by the phases
+        which run at the same time."""
+        stream = sys.stderr
+        if not cls._default or cls._default[0] is not stream:
+            cls._default = (stream, cls([BarReporter(stream)] if stream.isatty() else list(), 0.2))
+        return cls._default[1]
+
+
+    @classmethod
+    def phase(cls, name:str, total:int=None, unit:str='items', done:int=0, **labels) -> Progress:
+        """Starts a phase of the running command. End it with :meth:`Progress.end`,
+        or use it as a context manager.
+
+        Args:
+            name (str): Name of the phase, e.g. pagination.
+            total (int, optional): Number of items of the phase, if known.
+            unit (str, optional): What the items are, e.g. users. Defaults to items.
+            done (int, optional): Items already processed, e.g. by an
+                interrupted run. Defaults to 0.
+            **labels: Added to the JSON events, e.g. the target.
+        """
+        telemetry = cls.active or cls.default()
+        context = click.get_current_context(silent=True)
+        progress = Progress(telemetry, context.info_name if context else None, name, total, unit, done, labels)
+        telemetry.publish(progress, 'start')
+        return progress
+
+
+    def publish(self, progress:Progress, event:str):
+        for reporter in self.reporters:
+            reporter.report(progress, event)
+
+
+    def clear(self):
+        """Erases the bar, so that a line can be printed while phases run. It's
+        drawn again on the next report."""
+        for reporter in self.reporters:
+            reporter.clear()
+
+
+    def close(self):
+        for reporter in self.reporters:
+            reporter.close()
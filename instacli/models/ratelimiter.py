@@ -0,0 +1,165 @@
+from typing import Callable, Dict, Tuple
+import threading, time
+
+
+def throttling(error:BaseException) -> bool:
+    """Whether an error means that Instagram throttles the requests or that the
+    connection failed, which the limiters back off from. Errors of a request
+    itself, e.g. a missing or private profile, don't slow the scrape down."""
+    # Imported here, so that the commands which don't scrape don't load them
+    import requests
+    from instaclient.errors.common import InvalidInstaRequestError, LoginFloodException
+    from selenium.common.exceptions import TimeoutException
+    return isinstance(error, (ConnectionError, TimeoutError, requests.RequestException, TimeoutException, InvalidInstaRequestError, LoginFloodException))
+
+
+class RateLimiter():
+    def __init__(self, rate:float, burst:int=1, min_rate:float=None, max_rate:float=None, increase:float=None, decrease:float=0.5, slow:float=None) -> 'RateLimiter':
+        """Thread safe token bucket shared by every worker of a scrape.
+
+        Each call to :meth:`wait` consumes one token. Tokens are refilled
+        at ``rate`` tokens per second, up to ``burst`` tokens.
+
+        The rate adapts to the responses reported with :meth:`success` and
+        :meth:`failure` (AIMD): every healthy response adds ``increase`` to the
+        rate, up to ``max_rate``, while every error or response slower than
+        ``slow`` seconds multiplies it by ``decrease``, down to ``min_rate``.
+        By default ``min_rate`` and ``max_rate`` are ``rate``, so the rate is fixed.
+
+        Args:
+            rate (float): Initial number of requests per second.
+            burst (int, optional): Maximum number of requests that can be
+                made back to back after a pause. Defaults to 1.
+            min_rate (float, optional): Lowest rate after backing off. Defaults to ``rate``.
+            max_rate (float, optional): Highest rate after speeding up. Defaults to ``rate``.
+            increase (float, optional): Rate added after a healthy response.
+                Defaults to a twentieth of ``max_rate``.
+            decrease (float, optional): Factor applied to the rate after an error
+                or a slow response. Defaults to 0.5.
+            slow (float, optional): Seconds after which a response counts as slow.
+                Defaults to None (never slow).
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate or rate, rate)
+        self.max_rate = max(max_rate or rate, rate)
+        self.increase = increase if increase is not None else self.max_rate / 20
+        self.decrease = decrease
+        self.slow = slow
+        self.requests = 0
+        self.throttled = 0
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+
+    def wait(self):
+        """Blocks until a token is available and consumes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.requests += 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+    def success(self, latency:float=None):
+        """Reports a response. Speeds up, unless the response was slow."""
+        if self.slow is not None and latency is not None and latency > self.slow:
+            self.failure()
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+    def failure(self):
+        """Reports an error or a throttled response and backs off."""
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+
+
+    def call(self, func:Callable, *args, **kwargs):
+        """Waits for a token, calls ``func`` and reports how it went.
+
+        Exceptions raised by ``func`` are raised again, and reported as
+        failures if they are :func:`throttling` errors.
+        """
+        self.wait()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            if throttling(error):
+                self.failure()
+            raise
+        self.success(time.perf_counter() - start)
+        return result
+
+
+    def __repr__(self) -> str:
+        summary = f'{self.rate:.2f}/s'
+        if self.throttled:
+            summary += f' ({self.throttled} backoffs)'
+        return summary
+
+
+class RateLimits():
+    PAGINATION = 'pagination'
+    PROFILE = 'profile'
+    POST = 'post'
+    HASHTAG = 'hashtag'
+    MEDIA = 'media'
+    FOLLOW = 'follow'
+
+    # Initial and highest requests per second, and seconds after which a response is slow
+    DEFAULTS:Dict[str, Tuple[float, float, float]] = {
+        PAGINATION: (0.5, 1.0, 10.0),
+        PROFILE: (1.0, 2.0, 10.0),
+        POST: (1.0, 2.0, 10.0),
+        HASHTAG: (1.0, 2.0, 10.0),
+        MEDIA: (8.0, 16.0, 30.0),
+        FOLLOW: (0.1, 0.2, 15.0),
+    }
+    # Lowest rate after backing off, as a fraction of the highest rate
+    MIN_FRACTION = 0.05
+
+    def __init__(self, rates:Dict[str, float]=None) -> 'RateLimits':
+        """Adaptive :class:`RateLimiter` of each type of action of a command.
+
+        Limiters are created on first use and shared by every worker of the
+        command, so the pace of an action reacts to all of its requests.
+
+        Args:
+            rates (Dict[str, float], optional): Highest rate of some actions,
+                overriding :attr:`DEFAULTS`. Limiters start at this rate.
+        """
+        self.rates = rates or dict()
+        self._limiters:Dict[str, RateLimiter] = dict()
+        self._lock = threading.Lock()
+
+
+    def get(self, action:str) -> RateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(action)
+            if not limiter:
+                rate, max_rate, slow = self.DEFAULTS[action]
+                if action in self.rates:
+                    rate = max_rate = self.rates[action]
+                limiter = RateLimiter(rate, min_rate=max_rate * self.MIN_FRACTION, max_rate=max_rate, slow=slow)
+                self._limiters[action] = limiter
+            return limiter
+
+
+    def call(self, action:str, func:Callable, *args, **kwargs):
+        """Calls ``func`` through the limiter of ``action``. See :meth:`RateLimiter.call`."""
+        return self.get(action).call(func, *args, **kwargs)
+
+
+    def __repr__(self) -> str:
+        return ', '.join(f'{action}: {limiter}' for action, limiter in self._limiters.items() if limiter.requests)
@@ -0,0 +1,91 @@
+from typing import Dict, Iterator, Optional, Tuple
+from instaclient.instagram.profile import Profile
+
+
+class ProfileRecord():
+    # Attributes of a Profile, in the order of its to_dict, without the client
+    FIELDS:Tuple[str, ...] = tuple(key for key in vars(Profile(client=None, id=None, viewer=None, username=None)) if key != 'client')
+    # Attributes of the users of a page of followers, kept in slots. The
+    # others are only set by a deep scrape and are kept in a dict.
+    THIN:Tuple[str, ...] = ('id', 'type', 'viewer', 'username', 'name', 'is_private', 'is_verified',
+        'profile_pic_url', 'follows_viewer', 'followed_by_viewer', 'requested_by_viewer')
+    __slots__ = THIN + ('_details',)
+    _NAMES = frozenset(FIELDS)
+    _SLOTS = frozenset(THIN)
+
+    def __init__(self, **fields) -> 'ProfileRecord':
+        """Scraped attributes of a profile, without the client and the
+        attribute dict of a :class:`Profile`.
+
+        getinfo keeps up to ``--count`` users in memory until they are deep
+        scraped, so the users are converted to records as soon as they are
+        received. A thin record takes about 50 MB of memory per 100k users,
+        where a :class:`Profile` takes about 70 MB, most of both being the
+        strings of the users (see ``benchmarks/records.py``).
+
+        Records are read like a dict by :class:`Predicate` and by the output
+        formats, with :meth:`get` and :meth:`to_dict`. Keys which aren't
+        attributes of a profile are ignored.
+        """
+        details:Optional[Dict[str, object]] = None
+        for name in self.FIELDS:
+            value = fields.get(name)
+            if name in self._SLOTS:
+                setattr(self, name, value)
+            elif value is not None:
+                if details is None:
+                    details = dict()
+                details[name] = value
+        self._details = details
+        if self.type is None:
+            self.type = Profile.GRAPH_PROFILE
+
+
+    @classmethod
+    def from_profile(cls, profile:Profile) -> 'ProfileRecord':
+        return cls(**{name: getattr(profile, name, None) for name in cls.FIELDS})
+
+
+    def __getattr__(self, name:str):
+        # Attributes of a deep scrape, None if the record is thin
+        if name in self._NAMES:
+            return self._details.get(name) if self._details else None
+        raise AttributeError(name)
+
+
+    def get(self, key:str, default=None):
+        if key in self._SLOTS:
+            return getattr(self, key)
+        if key not in self._NAMES:
+            return default
+        return self._details.get(key) if self._details else None
+
+
+    def __getitem__(self, key:str):
+        if key not in self._NAMES:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+    def keys(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        details = self._details or dict()
+        return ((name, getattr(self, name) if name in self._SLOTS else details.get(name)) for name in self.FIELDS)
+
+
+    def to_dict(self) -> dict:
+        """The attributes which are set, as :meth:`Profile.to_dict` returns them."""
+        data = dict()
+        details = self._details or dict()
+        for name in self.FIELDS:
+            value = getattr(self, name) if name in self._SLOTS else details.get(name)
+            if value is not None:
+                data[name] = value
+        return data
+
+
+    def __repr__(self) -> str:
+        return f'ProfileRecord<{self.username}>'
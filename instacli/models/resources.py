@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional
+import os
+
+
+def _children() -> Dict[int, List[int]]:
+    """Children of every process, read from /proc."""
+    children:Dict[int, List[int]] = dict()
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as file:
+                # The name of the process, in parentheses, may contain spaces
+                fields = file.read().rpartition(')')[2].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), list()).append(int(entry))
+    return children
+
+
+def _rss(pid:int) -> int:
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, IndexError, ValueError):
+        # The process exited
+        return 0
+
+
+def tree_rss(pid:int, include_root:bool=True) -> Optional[int]:
+    """Resident memory in bytes of a process and of all its descendants, e.g.
+    a chromedriver and the Chrome processes it started.
+
+    Reads /proc on Linux, or uses psutil if it is installed.
+
+    Args:
+        pid (int): Process at the root of the tree.
+        include_root (bool, optional): Whether to count the root process
+            itself. Defaults to True.
+
+    Returns:
+        Optional[int]: The memory, or None if it can't be measured here.
+    """
+    if os.path.isdir('/proc/self'):
+        children = _children()
+        pids = [pid] if include_root else list()
+        pending = list(children.get(pid, list()))
+        while pending:
+            child = pending.pop()
+            pids.append(child)
+            pending.extend(children.get(child, list()))
+        return sum(_rss(each) for each in pids)
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        root = psutil.Process(pid)
+        processes = root.children(recursive=True) + ([root] if include_root else list())
+    except psutil.Error:
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+def driver_rss(client) -> Optional[int]:
+    """Resident memory in bytes of the chromedriver of a client and of its
+    browser, or None if the client has no running driver."""
+    try:
+        pid = client.driver.service.process.pid
+    except AttributeError:
+        return None
+    return tree_rss(pid)
+
+
+def running(pid:int) -> bool:
+    """Whether a process is running. Assumed if it can't be checked here."""
+    if os.path.isdir('/proc/self'):
+        return os.path.exists(f'/proc/{pid}')
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == 'nt':
+        # os.kill would terminate the process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,122 @@
+from typing import List, Optional
+import json, os, re, tempfile, threading, time
+from instacli import data_dir
+
+
+class LoginStats():
+    def __init__(self) -> 'LoginStats':
+        self.logins = 0
+        self.restored = 0
+        self.stale = 0
+        self.saved = 0.0
+        self._lock = threading.Lock()
+
+    def record_login(self):
+        with self._lock:
+            self.logins += 1
+
+    def record_restore(self, saved:float):
+        with self._lock:
+            self.restored += 1
+            self.saved += max(saved, 0.0)
+
+    def record_stale(self):
+        with self._lock:
+            self.stale += 1
+
+    def __repr__(self) -> str:
+        summary = f'{self.logins} full logins, {self.restored} restored sessions'
+        if self.stale:
+            summary += f', {self.stale} stale'
+        if self.restored:
+            summary += f' ({self.saved:.1f}s saved)'
+        return summary
+
+
+class SessionStore():
+    SESSIONS_FOLDER = 'sessions'
+
+    # Seconds after which a saved session is not restored anymore
+    MAX_AGE = 30*24*3600
+    # Assumed duration of a full login, until one is measured
+    LOGIN_TIME = 10.0
+
+    def __init__(self, path:str=None, max_age:float=MAX_AGE) -> 'SessionStore':
+        """On-disk store of the Instagram cookies of each account.
+
+        The cookies of a session are saved after a successful login and
+        restored into the driver of the next client of the same account, so
+        the credential login is only needed once the session is stale. The
+        folder is only accessible by the current user and every session is
+        written to a ``0600`` file through an atomic rename.
+
+        Args:
+            path (str, optional): Folder of the sessions. Defaults to ``sessions``
+                in the data folder of instacli, see :func:`data_dir`.
+            max_age (float, optional): Maximum age in seconds of a restored session.
+                Defaults to 30 days.
+        """
+        self.path = path or os.path.join(data_dir(), self.SESSIONS_FOLDER)
+        self.max_age = max_age
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+        os.chmod(self.path, 0o700)
+
+
+    def path_of(self, username:str) -> str:
+        name = re.sub(r'[^\w.]', '_', username.lower())
+        return os.path.join(self.path, f'{name}.json')
+
+
+    def _read(self, username:str) -> Optional[dict]:
+        try:
+            with open(self.path_of(username), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+
+    def load(self, username:str) -> Optional[List[dict]]:
+        """Returns the saved cookies of an account, unless missing or older than ``max_age``."""
+        data = self._read(username)
+        if not data or time.time() - data.get('saved', 0) > self.max_age:
+            return None
+        return data.get('cookies')
+
+
+    def login_time(self, username:str) -> float:
+        """Duration in seconds of the last full login of an account."""
+        data = self._read(username)
+        return (data or dict()).get('login_time') or self.LOGIN_TIME
+
+
+    def save(self, username:str, cookies:List[dict], login_time:float=None):
+        """Saves the cookies of an account.
+
+        Args:
+            username (str): Username of the account.
+            cookies (List[dict]): Cookies of the driver, as returned by ``session_cookies``.
+            login_time (float, optional): Duration in seconds of the login which
+                created the session. Defaults to the one already saved.
+        """
+        path = self.path_of(username)
+        data = {'username': username, 'saved': time.time(), 'login_time': login_time or self.login_time(username), 'cookies': cookies}
+        # A temporary file of its own, as the workers of a process or of a
+        # sharded run may log into the same account at once. mkstemp creates
+        # it with the 0600 mode.
+        descriptor, temp = tempfile.mkstemp(dir=self.path, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(temp, path)
+        except:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+
+    def delete(self, username:str):
+        try:
+            os.remove(self.path_of(username))
+        except FileNotFoundError:
+            pass
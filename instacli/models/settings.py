@@ -1,6 +1,7 @@
 from functools import wraps
+from typing import Optional
 import json, click
-import os
+import os, tempfile, threading
 from os import mkdir
 from instacli import BASE_DIR
 
@@ -9,18 +10,71 @@ class Settings():
 
     SETTINGS_DIR = f'{BASE_DIR}/instacli.json'
 
+    DEFAULTS = {
+        'driver_path': None,
+        'daemon_socket': None,
+        'driver_visible': False,
+        'lean_browser': False,
+        'logging': False,
+        'output_path': None,
+    }
+    # Environment variables overriding the settings file
+    ENVIRONMENT = {
+        'driver_path': 'INSTACLI_DRIVER_PATH',
+        'daemon_socket': 'INSTACLI_SOCKET',
+        'driver_visible': 'INSTACLI_DRIVER_VISIBLE',
+        'lean_browser': 'INSTACLI_LEAN_BROWSER',
+        'logging': 'INSTACLI_LOGGING',
+        'output_path': 'INSTACLI_OUTPUT_PATH',
+    }
+
+    _instance:Optional['Settings'] = None
+    _lock = threading.Lock()
+
     def __init__(self) -> 'Settings':
         """Class that reppresents an abstraction of the settings
         of the `instacli` package.
 
-        Tries to load settings from a `instacli.json` file. If no such
-        file is present or if the loaded data is none, a new instace of
-        the object will be created and saved in the `instacli.json` file.
+        Settings are layered: the defaults are overridden by the `instacli.json`
+        file, which is overridden by the ``INSTACLI_*`` environment variables.
+        Options given to a command take precedence over all of them. If no
+        settings file is present, one is created with the defaults.
+
+        Use :meth:`get` to share a single instance in the process instead of
+        reading the file again.
 
         Returns:
             :class:`Setting`: Settings object instance.
         """
-        
+        self._file = dict()
+        self._mtime = None
+        self._load()
+
+
+    @classmethod
+    def get(cls) -> 'Settings':
+        """Returns the settings of the process, loaded once and reloaded
+        only when the settings file is modified."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            elif cls._instance._modified():
+                cls._instance._load()
+            return cls._instance
+
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.SETTINGS_DIR).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+
+    def _modified(self) -> bool:
+        return self._stat() != self._mtime
+
+
+    def _read(self) -> Optional[dict]:
         try:
             with open(self.SETTINGS_DIR, 'r') as file:
                 try:
@@ -29,23 +83,51 @@ class Settings():
                     data = None
         except FileNotFoundError:
             data = None
+        return data if isinstance(data, dict) else None
 
+
+    def _load(self):
+        data = self._read()
         if not data:
             # Cretate New Setting:
-            self.driver_path = None
-            self.driver_visible = False
-            self.logging = False
-            self.output_path = None
-            # Save
-            des = self._to_dict()
-            with open(self.SETTINGS_DIR, 'w') as file:
-                json.dump(des, file)
+            self._file = dict(self.DEFAULTS)
+            self._write()
         else:
-            # Load existing Setting
-            self.driver_path = data.get('driver_path')
-            self.driver_visible = data.get('driver_visible')
-            self.logging = data.get('logging')
-            self.output_path = data.get('output_path')
+            self._file = {key: data.get(key, default) for key, default in self.DEFAULTS.items()}
+            self._mtime = self._stat()
+        self._apply()
+
+
+    def _apply(self):
+        for key, value in self._file.items():
+            variable = os.environ.get(self.ENVIRONMENT[key])
+            if variable is not None:
+                value = self._parse(key, variable)
+            setattr(self, key, value)
+
+
+    def _parse(self, key:str, value:str):
+        if isinstance(self.DEFAULTS[key], bool):
+            return value.strip().lower() in ('1', 'true', 'yes', 'on')
+        return value or None
+
+
+    def _write(self):
+        """Writes the settings file through a temporary file and a rename,
+        so that other processes never read a partially written file."""
+        folder = os.path.dirname(self.SETTINGS_DIR)
+        descriptor, temp = tempfile.mkstemp(dir=folder, prefix='.instacli-', suffix='.json')
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(self._to_dict(), file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp, self.SETTINGS_DIR)
+        except:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        self._mtime = self._stat()
 
 
     def _persistence(func):
@@ -54,19 +136,20 @@ class Settings():
         """
         @wraps(func)
         def wrapper(self:'Settings', *args, **kwargs):
-            result = func(self, *args, **kwargs)
-            # Save
-            
-            des = self._to_dict()
-            with open(self.SETTINGS_DIR, 'w') as file:
-                json.dump(des, file)
-
+            with self._lock:
+                # Keep the changes made by other processes since the last load
+                if self._modified():
+                    self._file.update(self._read() or dict())
+                result = func(self, *args, **kwargs)
+                # Save
+                self._write()
+                self._apply()
             return result
         return wrapper
 
 
     def _to_dict(self):
-        return vars(self)
+        return {key: self._file.get(key) for key in self.DEFAULTS}
 
 
     @_persistence
@@ -78,13 +161,13 @@ class Settings():
             path (str): Path of the chromedriver.exe
 
         Returns:
-            bool: True if path is valid. 
-                False if pathis invalid. 
+            bool: True if path is valid.
+                False if pathis invalid.
         """
         path = os.path.abspath(path)
-        self.driver_path = path
+        self._file['driver_path'] = path
+
 
-    
     @_persistence
     def set_output_path(self, path:str) -> bool:
         """Validates the inputted path and sets it as
@@ -94,18 +177,30 @@ class Settings():
             path (str): Path of the output folder
 
         Returns:
-            bool: True if path is valid. 
-                False if pathis invalid. 
+            bool: True if path is valid.
+                False if pathis invalid.
         """
         path = os.path.abspath(path)
-        self.output_path = path
-         
+        self._file['output_path'] = path
+
+
+    @_persistence
+    def set_daemon_socket(self, path:str):
+        """Sets the Unix socket of the ``instacli serve`` daemon, used by the
+        daemon and by the commands submitted to it."""
+        self._file['daemon_socket'] = os.path.abspath(path) if path else None
+
 
     @_persistence
     def set_driver_visible(self, visible:bool):
-        self.driver_visible = visible
+        self._file['driver_visible'] = visible
+
+
+    @_persistence
+    def set_lean_browser(self, lean:bool):
+        self._file['lean_browser'] = lean
 
 
     @_persistence
     def set_logging(self, logging:bool):
-        self.logging = logging
\ No newline at end of file
+        self._file['logging'] = logging
@@ -0,0 +1,194 @@
+from typing import Callable, Dict, Iterator, List, Optional
+import glob, json, multiprocessing, os, queue, threading, time
+from .daemon import SessionPool
+from .resources import tree_rss
+
+
+class Shard():
+    def __init__(self, index:int, command:str, target:str, folder:str, params:dict) -> 'Shard':
+        """A target of a sharded run, scraped by a worker process.
+
+        Args:
+            index (int): Position of the target in the targets file.
+            command (str): Name of the instacli command run for the target.
+            target (str): Username of the target.
+            folder (str): Output folder of the shard, with the log of the command.
+            params (dict): Parameters of the command.
+        """
+        self.index = index
+        self.command = command
+        self.target = target
+        self.folder = folder
+        self.params = params
+        self.status = 'pending'
+        self.code = None
+        self.pid = None
+        self.started = None
+        self.duration = None
+        self.peak = None
+        self.recycled = 0
+
+    @property
+    def name(self) -> str:
+        return f'{self.index}-{self.target}'
+
+    @property
+    def log(self) -> str:
+        return os.path.join(self.folder, f'{self.command}.log')
+
+    def files(self, extension:str) -> List[str]:
+        """Output files of the shard with ``extension``, in its folder and subfolders."""
+        return sorted(glob.glob(os.path.join(glob.escape(self.folder), '**', f'*.{extension}'), recursive=True))
+
+    def records(self) -> Iterator[dict]:
+        """Records of the JSON Lines outputs of the shard."""
+        for path in self.files('jsonl'):
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Empty or torn line
+                        continue
+                    yield record
+
+
+def _work(runner:Callable, max_rss:Optional[int], interval:float, tasks, results):
+    """Runs shards from ``tasks`` until it gets None. The session of the worker
+    is kept logged in between its shards, unless its browser grew past ``max_rss``."""
+    pool = SessionPool.active = SessionPool(1, max_rss=max_rss)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            index, command, params, log = task
+            results.put(('started', index, os.getpid()))
+            peak = None
+            stop = threading.Event()
+
+            def sample():
+                nonlocal peak
+                while True:
+                    # The chromedrivers started by this worker and their browsers
+                    rss = tree_rss(os.getpid(), include_root=False)
+                    if rss is not None:
+                        peak = max(peak or 0, rss)
+                    if stop.wait(interval):
+                        return
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            recycled = pool.recycled
+            start = time.perf_counter()
+            try:
+                code = runner(command, params, log)
+            except Exception:
+                code = 1
+            finally:
+                stop.set()
+                sampler.join()
+            results.put(('finished', index, code, time.perf_counter() - start, peak, pool.recycled - recycled))
+    finally:
+        SessionPool.active = None
+        pool.close()
+
+
+class ShardRunner():
+    # Seconds between checks of the worker processes
+    POLL = 0.5
+
+    def __init__(self, processes:int, runner:Callable, max_rss:int=None, interval:float=1.0) -> 'ShardRunner':
+        """Runs shards over a pool of worker processes, so that a list of
+        targets uses every core instead of one Python process and one browser.
+
+        Every worker logs in with its own client and keeps it between its
+        shards. A client whose browser uses more than ``max_rss`` once its
+        shard is done is disconnected, and the next shard starts a fresh
+        browser. A worker which crashes is replaced, and its shard fails.
+
+        Args:
+            processes (int): Number of worker processes.
+            runner (Callable): Importable function taking the command, the
+                parameters and the log path of a shard and returning its exit
+                code. It runs in the workers.
+            max_rss (int, optional): Highest memory in MB of the browser of a
+                worker. Defaults to None (no limit).
+            interval (float, optional): Seconds between two samples of the
+                memory of the browsers. Defaults to 1.0.
+        """
+        self.processes = processes
+        self.runner = runner
+        self.max_rss = max_rss
+        self.interval = interval
+
+
+    def run(self, shards:List[Shard], callback:Callable=None) -> List[Shard]:
+        """Runs every shard and returns them with their status and timings.
+
+        Args:
+            shards (List[Shard]): Shards to run, in order.
+            callback (Callable, optional): Called with every shard once it
+                succeeds or fails. Defaults to None.
+        """
+        # Spawned, as forking a process with threads and open browsers isn't safe
+        context = multiprocessing.get_context('spawn')
+        tasks, results = context.Queue(), context.Queue()
+        for shard in shards:
+            os.makedirs(shard.folder, exist_ok=True)
+            tasks.put((shard.index, shard.command, shard.params, shard.log))
+        workers = min(self.processes, len(shards))
+        for _ in range(workers):
+            tasks.put(None)
+
+        def spawn():
+            process = context.Process(target=_work, args=(self.runner, self.max_rss, self.interval, tasks, results), daemon=True)
+            process.start()
+            return process
+
+        pending:Dict[int, Shard] = {shard.index: shard for shard in shards}
+        running:Dict[int, Shard] = dict()
+        processes = [spawn() for _ in range(workers)]
+
+        def finish(shard:Shard, code:int):
+            shard.code = code
+            shard.status = 'succeeded' if code == 0 else 'failed'
+            pending.pop(shard.index, None)
+            if callable(callback):
+                callback(shard)
+
+        try:
+            while pending:
+                try:
+                    message = results.get(timeout=self.POLL)
+                except queue.Empty:
+                    for process in [process for process in processes if not process.is_alive()]:
+                        processes.remove(process)
+                        shard = running.pop(process.pid, None)
+                        if shard:
+                            # Crashed, e.g. killed by the system once out of memory
+                            shard.duration = time.perf_counter() - shard.started
+                            finish(shard, process.exitcode or 1)
+                            processes.append(spawn())
+                    if not processes:
+                        # Shards taken by workers which died before starting them
+                        for shard in list(pending.values()):
+                            finish(shard, 1)
+                    continue
+                if message[0] == 'started':
+                    _, index, pid = message
+                    shard = pending[index]
+                    shard.status, shard.pid, shard.started = 'running', pid, time.perf_counter()
+                    running[pid] = shard
+                else:
+                    _, index, code, duration, peak, recycled = message
+                    shard = running.pop(pending[index].pid)
+                    shard.duration, shard.peak, shard.recycled = duration, peak, recycled
+                    finish(shard, code)
+            for process in processes:
+                process.join(timeout=30)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+        return shards
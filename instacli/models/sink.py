@@ -0,0 +1,485 @@
+from importlib import import_module
+from typing import Callable, Dict, Iterator, List, Type
+import csv, gzip, json, os, time, zlib
+from .tracer import Tracer
+
+
+class OutputFormatError(Exception):
+    def __init__(self, name:str, reason:str):
+        self.name = name
+        self.message = f'Output format {name} is not available: {reason}'
+        super().__init__(self.message)
+
+
+class OutputFormat():
+    # Formats by name, filled by OutputFormat.register
+    FORMATS:Dict[str, Type['OutputFormat']] = dict()
+
+    name:str = None
+    extension:str = None
+    # Optional modules the format needs, with the package which installs them
+    requires:Dict[str, str] = dict()
+
+    def __init__(self, path:str, columns:List[str]=None, types:Dict[str, type]=None) -> 'OutputFormat':
+        """Writes the records of an :class:`OutputSink` to a file.
+
+        Args:
+            path (str): Path of the output file.
+            columns (List[str], optional): Columns of tabular formats. Keys of a
+                record which are not in ``columns`` are ignored.
+            types (Dict[str, type], optional): Type of the columns: ``str``, ``int``,
+                ``float`` or ``bool``. Columnar formats store other columns as
+                JSON strings. Defaults to strings.
+        """
+        self.path = path
+        self.columns = columns
+        self.types = types or dict()
+
+
+    @staticmethod
+    def register(format:Type['OutputFormat']) -> Type['OutputFormat']:
+        OutputFormat.FORMATS[format.name] = format
+        return format
+
+
+    @staticmethod
+    def get(name:str) -> Type['OutputFormat']:
+        """Returns the format of a name.
+
+        Raises:
+            OutputFormatError: If the format doesn't exist or its dependencies
+                aren't installed.
+        """
+        if name not in OutputFormat.FORMATS:
+            raise OutputFormatError(name, f"use one of {', '.join(OutputFormat.FORMATS)}")
+        format = OutputFormat.FORMATS[name]
+        for module, package in format.requires.items():
+            try:
+                import_module(module)
+            except ImportError:
+                raise OutputFormatError(name, f'install it with: pip install {package}')
+        return format
+
+
+    @staticmethod
+    def names() -> List[str]:
+        return list(OutputFormat.FORMATS)
+
+
+    def open(self, append:bool):
+        raise NotImplementedError
+
+
+    def write(self, record:dict):
+        raise NotImplementedError
+
+
+    def flush(self):
+        """Makes every written record readable from the file, even if the process is killed."""
+        raise NotImplementedError
+
+
+    def close(self):
+        raise NotImplementedError
+
+
+@OutputFormat.register
+class JsonlFormat(OutputFormat):
+    name = 'jsonl'
+    extension = 'jsonl'
+
+    def open(self, append:bool):
+        append = append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        self._file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+        if append:
+            with open(self.path, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    # Line torn by an interrupted run
+                    self._file.write('\n')
+
+
+    def write(self, record:dict):
+        self._file.write(json.dumps(record) + '\n')
+
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class CompressedJsonlFormat(JsonlFormat):
+    def open(self, append:bool):
+        """Starts a compressed stream. When appending, the records which can be
+        decompressed are first written again to a complete stream, as an
+        interrupted run leaves a stream without its end. That stream replaces
+        the file once it's on disk, so the saved records survive a crash
+        during the rewrite, and the new records follow in a stream of their own."""
+        append = append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if append:
+            with open(self.path, 'rb') as file:
+                data = self._decompress(file.read())
+            # Drop a line torn by the interrupted run
+            kept = data[:data.rfind(b'\n') + 1]
+            temp = f'{self.path}.tmp'
+            with open(temp, 'wb') as raw:
+                with self._compressor(raw) as stream:
+                    stream.write(kept)
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(temp, self.path)
+        self._raw = open(self.path, 'ab' if append else 'wb')
+        self._file = self._compressor(self._raw)
+
+
+    def _compressor(self, raw):
+        raise NotImplementedError
+
+
+    def _decompress(self, data:bytes) -> bytes:
+        """Decompresses as much of ``data`` as possible."""
+        raise NotImplementedError
+
+
+    def write(self, record:dict):
+        self._file.write((json.dumps(record) + '\n').encode('utf-8'))
+
+
+    def _sync(self):
+        raise NotImplementedError
+
+
+    def flush(self):
+        self._sync()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+
+    def close(self):
+        self._file.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+
+
+@OutputFormat.register
+class GzipJsonlFormat(CompressedJsonlFormat):
+    name = 'jsonl.gz'
+    extension = 'jsonl.gz'
+
+    def _compressor(self, raw):
+        return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+
+
+    def _sync(self):
+        self._file.flush(zlib.Z_SYNC_FLUSH)
+
+
+    def _decompress(self, data:bytes) -> bytes:
+        output = list()
+        while data:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                output.append(decompressor.decompress(data))
+            except zlib.error:
+                break
+            if not decompressor.eof:
+                break
+            data = decompressor.unused_data
+        return b''.join(output)
+
+
+@OutputFormat.register
+class ZstdJsonlFormat(CompressedJsonlFormat):
+    name = 'jsonl.zst'
+    extension = 'jsonl.zst'
+    requires = {'zstandard': 'instacli[zstd]'}
+
+    def _compressor(self, raw):
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+
+
+    def _sync(self):
+        import zstandard
+        self._file.flush(zstandard.FLUSH_BLOCK)
+
+
+    def _decompress(self, data:bytes) -> bytes:
+        import zstandard
+        output = list()
+        while data:
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+            try:
+                output.append(decompressor.decompress(data))
+            except zstandard.ZstdError:
+                break
+            if not decompressor.eof:
+                break
+            data = decompressor.unused_data
+        return b''.join(output)
+
+
+@OutputFormat.register
+class CsvFormat(OutputFormat):
+    name = 'csv'
+    extension = 'csv'
+    encoding = 'utf-8'
+    delimiter = ','
+
+    def open(self, append:bool):
+        append = append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        self._file = open(self.path, 'a' if append else 'w', encoding=self.encoding, newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, delimiter=self.delimiter, extrasaction='ignore')
+        if not append:
+            self._writer.writeheader()
+
+
+    def write(self, record:dict):
+        self._writer.writerow(record)
+
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+@OutputFormat.register
+class Utf16CsvFormat(CsvFormat):
+    """Tab separated UTF-16, which Excel opens without an import wizard."""
+    name = 'csv-utf16'
+    encoding = 'utf-16'
+    delimiter = '\t'
+
+
+class ColumnarFormat(OutputFormat):
+    requires = {'pyarrow': 'instacli[parquet]'}
+    # Records converted to a columnar batch at once
+    batch_size = 10000
+
+    def __init__(self, path:str, columns:List[str]=None, types:Dict[str, type]=None) -> 'ColumnarFormat':
+        """Columnar files are only readable once complete, so records are spooled
+        to a JSONL file next to the output, which keeps them safe and lets an
+        interrupted job resume, then converted in batches when the sink is
+        closed. The schema only depends on ``columns`` and ``types``, so every
+        file of a command has the same one."""
+        super().__init__(path, columns, types)
+        self._spool = JsonlFormat(f'{path}.part', columns, types)
+
+
+    def schema(self):
+        import pyarrow
+        types = {bool: pyarrow.bool_(), int: pyarrow.int64(), float: pyarrow.float64()}
+        return pyarrow.schema([(column, types.get(self.types.get(column), pyarrow.string())) for column in self.columns])
+
+
+    def _value(self, value, kind:type):
+        if value is None:
+            return None
+        if kind in (bool, int, float):
+            try:
+                return kind(value)
+            except (TypeError, ValueError):
+                return None
+        return value if isinstance(value, str) else json.dumps(value, default=vars)
+
+
+    def _batches(self) -> Iterator[List[dict]]:
+        batch = list()
+        with open(self._spool.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    # Line torn by an interrupted run
+                    continue
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = list()
+        if batch:
+            yield batch
+
+
+    def _table(self, records:List[dict], schema):
+        """Converts records to a table, a column at a time. Values are only
+        converted one by one in the columns where they don't match the schema."""
+        import pyarrow
+        arrays = list()
+        for field in schema:
+            values = [record.get(field.name) for record in records]
+            try:
+                arrays.append(pyarrow.array(values, field.type))
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+                kind = self.types.get(field.name)
+                arrays.append(pyarrow.array([self._value(value, kind) for value in values], field.type))
+        return pyarrow.Table.from_arrays(arrays, schema=schema)
+
+
+    def open(self, append:bool):
+        if append and not os.path.exists(self._spool.path) and os.path.exists(self.path):
+            # Closed by an interrupted run, spool the records again
+            self._spool.open(False)
+            for record in self._read():
+                self._spool.write(record)
+            self._spool.flush()
+        else:
+            self._spool.open(append)
+
+
+    def write(self, record:dict):
+        self._spool.write(record)
+
+
+    def flush(self):
+        self._spool.flush()
+
+
+    def close(self):
+        self._spool.close()
+        schema = self.schema()
+        temporary = f'{self.path}.tmp'
+        writer = self._writer(temporary, schema)
+        try:
+            for batch in self._batches():
+                writer.write_table(self._table(batch, schema))
+        finally:
+            writer.close()
+        os.replace(temporary, self.path)
+        os.remove(self._spool.path)
+
+
+    def _writer(self, path:str, schema):
+        raise NotImplementedError
+
+
+    def _read(self) -> List[dict]:
+        raise NotImplementedError
+
+
+@OutputFormat.register
+class ParquetFormat(ColumnarFormat):
+    name = 'parquet'
+    extension = 'parquet'
+
+    def _writer(self, path:str, schema):
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(path, schema, compression='zstd')
+
+
+    def _read(self) -> List[dict]:
+        import pyarrow.parquet
+        return pyarrow.parquet.read_table(self.path).to_pylist()
+
+
+@OutputFormat.register
+class ArrowFormat(ColumnarFormat):
+    name = 'arrow'
+    extension = 'arrow'
+
+    def _writer(self, path:str, schema):
+        import pyarrow
+        return pyarrow.ipc.new_file(path, schema)
+
+
+    def _read(self) -> List[dict]:
+        import pyarrow
+        with pyarrow.memory_map(self.path) as source:
+            return pyarrow.ipc.open_file(source).read_all().to_pylist()
+
+
+class OutputSink():
+    JSONL = JsonlFormat.name
+    CSV = CsvFormat.name
+
+    def __init__(self, path:str, format:str=JSONL, columns:List[str]=None, types:Dict[str, type]=None, flush_every:int=100, flush_interval:float=5.0, append:bool=False, on_flush:Callable=None) -> 'OutputSink':
+        """Appends records to a file as soon as they are scraped, in any of the
+        registered :class:`OutputFormat`: JSONL, gzip or zstd compressed JSONL,
+        UTF-8 CSV, UTF-16 CSV, Parquet or Arrow.
+
+        Every record is serialized exactly once, when :meth:`write` is called.
+        The file is flushed to disk every ``flush_every`` records or every
+        ``flush_interval`` seconds, whichever comes first, so an interrupted
+        scrape leaves every flushed row readable. The file is created with
+        the first record, so no file is left behind if nothing is written.
+
+        Args:
+            path (str): Path of the output file.
+            format (str, optional): Name of an :class:`OutputFormat`.
+                Defaults to ``OutputSink.JSONL``.
+            columns (List[str], optional): Columns of CSV, Parquet and Arrow files.
+                Keys of a record which are not in ``columns`` are ignored.
+            types (Dict[str, type], optional): Type of the columns of Parquet
+                and Arrow files. Defaults to strings.
+            flush_every (int, optional): Records written between flushes. Defaults to 100.
+            flush_interval (float, optional): Seconds between flushes. Defaults to 5.
+            append (bool, optional): Append to an existing file, such as the output
+                of a resumed job, instead of overwriting it. Defaults to False.
+            on_flush (Callable, optional): Called after every flush, once the
+                records are on disk, e.g. the :meth:`Journal.sync` of the job.
+
+        Raises:
+            OutputFormatError: If the format doesn't exist or its dependencies
+                aren't installed.
+        """
+        self.path = path
+        self.format = format
+        self.columns = columns
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.append = append
+        self.on_flush = on_flush
+        self.written = 0
+        self._output:OutputFormat = OutputFormat.get(format)(path, columns, types)
+        self._open = False
+        self._pending = 0
+        self._flushed = time.monotonic()
+
+
+    def write(self, record:dict):
+        """Serializes and appends a single record.
+
+        Args:
+            record (dict): JSON serializable record, or an object with a
+                ``to_dict`` method such as a :class:`ProfileRecord`.
+        """
+        if not self._open:
+            self._output.open(self.append)
+            self._open = True
+        if not isinstance(record, dict):
+            record = record.to_dict()
+        self._output.write(record)
+        self.written += 1
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+
+    def flush(self):
+        if self._open:
+            with Tracer.span('output flush', Tracer.IO, records=self._pending):
+                self._output.flush()
+        self._pending = 0
+        self._flushed = time.monotonic()
+        if self.on_flush:
+            self.on_flush()
+
+
+    def close(self):
+        """Flushes and closes the file. The file only holds records: the state
+        of the job, such as the pagination cursor, is kept in its :class:`Journal`."""
+        if self._open:
+            with Tracer.span('output close', Tracer.IO, format=self.format):
+                self._output.close()
+            self._open = False
+        if self.on_flush:
+            self.on_flush()
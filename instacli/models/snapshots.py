@@ -0,0 +1,198 @@
+from typing import Dict, List, Optional, Tuple
+import json, os, re, time
+from instacli import data_dir
+
+
+def difference(left:List[int], right:List[int]) -> List[int]:
+    """Returns the items of the sorted list ``left`` which are not in the sorted
+    list ``right``, merging both in O(n + m)."""
+    result = list()
+    index, size = 0, len(right)
+    for item in left:
+        while index < size and right[index] < item:
+            index += 1
+        if index == size or right[index] != item:
+            result.append(item)
+    return result
+
+
+class Snapshot():
+    def __init__(self, target:str, kind:str, users:List[Tuple[str, str]], taken:float=None, total:int=None, unverified:int=0) -> 'Snapshot':
+        """The followers or following of a user at a point in time.
+
+        Args:
+            target (str): Username of the user.
+            kind (str): Either ``FollowIterator.FOLLOWERS`` or ``FollowIterator.FOLLOWING``.
+            users (List[Tuple[str, str]]): Id and username of every account, in
+                the order Instagram lists them, most recent first.
+            taken (float, optional): Timestamp of the snapshot. Defaults to now.
+            total (int, optional): Number of accounts reported by the profile.
+            unverified (int, optional): Accounts which may have been lost since
+                the previous snapshot, but weren't reached by an incremental scrape.
+        """
+        self.target = target
+        self.kind = kind
+        self.users = users
+        self.taken = taken or time.time()
+        self.total = total
+        self.unverified = unverified
+        self._ids = None
+
+
+    @property
+    def ids(self) -> List[int]:
+        """Sorted ids of the accounts."""
+        if self._ids is None:
+            self._ids = sorted(int(id) for id, _ in self.users)
+        return self._ids
+
+
+    @property
+    def usernames(self) -> Dict[int, str]:
+        return {int(id): username for id, username in self.users}
+
+
+    def diff(self, previous:'Snapshot') -> Tuple[List[int], List[int]]:
+        """Returns the sorted ids of the accounts gained and lost since ``previous``."""
+        return difference(self.ids, previous.ids), difference(previous.ids, self.ids)
+
+
+    def to_dict(self) -> dict:
+        return {'target': self.target, 'kind': self.kind, 'taken': self.taken, 'total': self.total, 'unverified': self.unverified, 'users': self.users}
+
+
+    @classmethod
+    def from_dict(cls, data:dict) -> 'Snapshot':
+        return cls(data['target'], data['kind'], [tuple(user) for user in data['users']], data['taken'], data.get('total'), data.get('unverified', 0))
+
+
+class SnapshotStore():
+    SNAPSHOTS_FOLDER = 'snapshots'
+
+    def __init__(self, path:str=None) -> 'SnapshotStore':
+        """On-disk store of the follower and following snapshots of every user.
+
+        Every snapshot is a JSON file in a folder per user and kind, named
+        after the time it was taken, and written through an atomic rename.
+
+        Args:
+            path (str, optional): Folder of the snapshots. Defaults to
+                ``snapshots`` in the data folder of instacli, see :func:`data_dir`.
+        """
+        self.path = path or os.path.join(data_dir(), self.SNAPSHOTS_FOLDER)
+
+
+    def folder(self, target:str, kind:str) -> str:
+        name = re.sub(r'[^\w.]', '_', target.lower())
+        return os.path.join(self.path, name, kind)
+
+
+    def times(self, target:str, kind:str) -> List[int]:
+        """Times of the snapshots of a user, oldest first."""
+        try:
+            names = os.listdir(self.folder(target, kind))
+        except FileNotFoundError:
+            return list()
+        return sorted(int(name[:-5]) for name in names if name.endswith('.json') and name[:-5].isdigit())
+
+
+    def load(self, target:str, kind:str, taken:int=None) -> Optional[Snapshot]:
+        """Returns the snapshot of a user taken at ``taken``, or the latest one."""
+        times = self.times(target, kind)
+        if taken is None:
+            if not times:
+                return None
+            taken = times[-1]
+        try:
+            with open(os.path.join(self.folder(target, kind), f'{taken}.json'), 'r', encoding='utf-8') as file:
+                return Snapshot.from_dict(json.load(file))
+        except (OSError, ValueError):
+            return None
+
+
+    def save(self, snapshot:Snapshot) -> str:
+        """Saves a snapshot, named after the second it was taken. If another
+        snapshot of the list was saved in the same second, the next free second
+        is used, and set as the :attr:`Snapshot.taken` of ``snapshot``."""
+        folder = self.folder(snapshot.target, snapshot.kind)
+        os.makedirs(folder, exist_ok=True)
+        taken = int(snapshot.taken)
+        while True:
+            path = os.path.join(folder, f'{taken}.json')
+            try:
+                # Claims the name against concurrent scrapes of the same list
+                descriptor = os.open(f'{path}.tmp', os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+            except FileExistsError:
+                taken += 1
+                continue
+            if os.path.exists(path):
+                os.close(descriptor)
+                os.remove(f'{path}.tmp')
+                taken += 1
+                continue
+            break
+        if taken != int(snapshot.taken):
+            snapshot.taken = taken
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            json.dump(snapshot.to_dict(), file)
+        os.replace(f'{path}.tmp', path)
+        return path
+
+
+class IncrementalScan():
+    # Consecutive known accounts after which the rest of the list is assumed unchanged
+    OVERLAP = 50
+
+    def __init__(self, previous:Snapshot, overlap:int=OVERLAP) -> 'IncrementalScan':
+        """Compares the first pages of a list of followers or following with the
+        previous snapshot, to stop the pagination once the rest is known.
+
+        Instagram lists the most recent accounts first, so new accounts are at
+        the top and, once a run of ``overlap`` consecutive accounts of the
+        previous snapshot is reached, the rest of the list is the rest of the
+        previous snapshot. Accounts lost below that point can't be identified,
+        only counted from the total of the profile.
+
+        Args:
+            previous (:class:`Snapshot`): Latest snapshot of the list.
+            overlap (int, optional): Length of the run of known accounts which
+                stops the scan. Defaults to 50.
+        """
+        self.previous = previous
+        self.overlap = overlap
+        self.users:List[Tuple[str, str]] = list()
+        self.run = 0
+        self.stopped = False
+        # Position in the previous snapshot of the account which stopped the scan
+        self._last = None
+        self._positions = {id: index for index, (id, _) in enumerate(previous.users)}
+
+
+    def known(self, id:str) -> bool:
+        return id in self._positions
+
+
+    def add(self, id:str, username:str) -> bool:
+        """Adds the next account of the list. Returns True once the rest of the
+        list is known, and the pagination can stop."""
+        self.users.append((id, username))
+        if self.stopped:
+            return True
+        self.run = self.run + 1 if id in self._positions else 0
+        if self.run >= self.overlap:
+            self.stopped = True
+            self._last = self._positions[id]
+        return self.stopped
+
+
+    def snapshot(self, total:int=None) -> Snapshot:
+        """Returns the new snapshot: the scanned accounts followed by the rest of
+        the previous snapshot, if the scan stopped early."""
+        users = list(self.users)
+        unverified = 0
+        if self.stopped:
+            scanned = set(id for id, _ in users)
+            users.extend(user for user in self.previous.users[self._last + 1:] if user[0] not in scanned)
+            if total is not None:
+                unverified = max(0, len(users) - total)
+        return Snapshot(self.previous.target, self.previous.kind, users, total=total, unverified=unverified)
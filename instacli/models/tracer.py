@@ -0,0 +1,136 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+import json, os, threading, time
+
+
+class Span():
+    def __init__(self, tracer:'Tracer', name:str, category:str, args:dict) -> 'Span':
+        """A timed section of a command, recorded by its :class:`Tracer` on exit.
+
+        Set :attr:`bytes` to the size of the data the section transferred.
+        """
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.bytes = 0
+        self.start = 0.0
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        if kind is not None:
+            self.args['error'] = kind.__name__
+        self.tracer.record(self, self.start, time.perf_counter())
+
+
+class NoSpan():
+    """Span used while no tracer is active, so that traced code costs nothing."""
+    bytes = 0
+
+    def __enter__(self) -> 'NoSpan':
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        pass
+
+
+NO_SPAN = NoSpan()
+
+
+class Tracer():
+    # Tracer of the running command, if any
+    active:Optional['Tracer'] = None
+
+    PHASE = 'phase'
+    REMOTE = 'remote'
+    IO = 'io'
+
+    def __init__(self) -> 'Tracer':
+        """Records the spans of a command: its phases, every remote call and
+        every file write, with their thread, duration and transferred bytes.
+
+        The spans are saved as a Chrome trace, which can be opened in
+        chrome://tracing or https://ui.perfetto.dev, and summarized per name
+        with their count, p50 and p95 latency and bytes.
+        """
+        self.origin = time.perf_counter()
+        self.events:List[dict] = list()
+        self.durations:Dict[str, List[float]] = defaultdict(list)
+        self.bytes:Dict[str, int] = defaultdict(int)
+        self.categories:Dict[str, str] = dict()
+        self.threads:Dict[int, str] = dict()
+        self._lock = threading.Lock()
+
+
+    @classmethod
+    def span(cls, name:str, category:str=PHASE, **args) -> Span:
+        """Returns a context manager timing a section, a no-op unless a tracer is active.
+
+        Args:
+            name (str): Name of the section, aggregated in the summary.
+            category (str, optional): ``Tracer.PHASE``, ``Tracer.REMOTE`` or ``Tracer.IO``.
+            **args: Details shown with the span in the trace viewer.
+        """
+        tracer = cls.active
+        if tracer is None:
+            return NO_SPAN
+        return Span(tracer, name, category, args)
+
+
+    def record(self, span:Span, start:float, end:float):
+        thread = threading.current_thread()
+        event = {
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': (start - self.origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid(),
+            'tid': thread.ident,
+        }
+        if span.bytes:
+            span.args['bytes'] = span.bytes
+        if span.args:
+            event['args'] = span.args
+        with self._lock:
+            self.events.append(event)
+            self.durations[span.name].append(end - start)
+            self.bytes[span.name] += span.bytes
+            self.categories[span.name] = span.category
+            self.threads.setdefault(thread.ident, thread.name)
+
+
+    @staticmethod
+    def _percentile(values:List[float], fraction:float) -> float:
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+    def summary(self) -> List[dict]:
+        """Count, total, p50 and p95 duration in seconds and bytes of every span
+        name, phases first and slowest first."""
+        rows = list()
+        with self._lock:
+            for name, durations in self.durations.items():
+                durations = sorted(durations)
+                rows.append({
+                    'name': name,
+                    'category': self.categories[name],
+                    'count': len(durations),
+                    'total': sum(durations),
+                    'p50': self._percentile(durations, 0.5),
+                    'p95': self._percentile(durations, 0.95),
+                    'bytes': self.bytes[name],
+                })
+        return sorted(rows, key=lambda row: (row['category'] != self.PHASE, -row['total']))
+
+
+    def save(self, path:str):
+        """Writes the spans as a Chrome trace JSON file."""
+        with self._lock:
+            metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': ident, 'args': {'name': name}} for ident, name in self.threads.items()]
+            events = metadata + list(self.events)
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'summary': self.summary()}}, file)
@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+import queue, threading, time
+from .ratelimiter import RateLimiter, throttling
+
+
+class WorkerStats():
+    def __init__(self, worker:int) -> 'WorkerStats':
+        self.worker = worker
+        self.done = 0
+        self.failed = 0
+        self.busy = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Items processed per second of busy time."""
+        if not self.busy:
+            return 0.0
+        return (self.done + self.failed) / self.busy
+
+
+class WorkerPool():
+    def __init__(self, workers:int, factory:Callable=None, clients:list=None, limiter:RateLimiter=None) -> 'WorkerPool':
+        """Bounded pool of threads sharing a set of client sessions.
+
+        Every task checks out an idle session and returns it once done, so a
+        session is never used by two workers at once. When no session is idle
+        and fewer than ``workers`` exist, a new one is created with ``factory``.
+        Sessions created by the pool are disconnected by :meth:`close`.
+
+        Args:
+            workers (int): Number of concurrent workers.
+            factory (Callable, optional): Function with no arguments that returns
+                a new, logged in client. Required if ``workers`` is greater than
+                the number of ``clients``.
+            clients (list, optional): Already connected clients to hand out to
+                the workers before calling ``factory``.
+            limiter (:class:`RateLimiter`, optional): Rate limit shared by all
+                the workers, told about the successful tasks and the
+                :func:`throttling` errors so that it can adapt. Defaults to
+                None (no limit).
+        """
+        self.workers = workers
+        self.factory = factory
+        self.limiter = limiter
+        self.stats:List[WorkerStats] = list()
+        # Stats of the worker thread. Workers may share a client, e.g. with
+        # a concurrent backend, so they can't be told apart by their client.
+        self._local = threading.local()
+        self._created = list()
+        self._clients = queue.Queue()
+        for client in clients or list():
+            self._clients.put(client)
+        self._sessions = self._clients.qsize()
+        self._lock = threading.Lock()
+
+
+    def _checkout(self):
+        try:
+            return self._clients.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._sessions < self.workers
+            if create:
+                self._sessions += 1
+        if not create:
+            return self._clients.get()
+        try:
+            client = self.factory()
+        except:
+            with self._lock:
+                self._sessions -= 1
+            raise
+        with self._lock:
+            self._created.append(client)
+        return client
+
+
+    def _worker_stats(self) -> WorkerStats:
+        stats = getattr(self._local, 'stats', None)
+        if not stats:
+            with self._lock:
+                stats = self._local.stats = WorkerStats(len(self.stats) + 1)
+                self.stats.append(stats)
+        return stats
+
+
+    def call(self, func:Callable, item):
+        """Applies ``func(client, item)`` with an idle session, in the calling thread.
+
+        Raises:
+            Exception: The exception raised by ``func``.
+        """
+        client = self._checkout()
+        stats = self._worker_stats()
+        try:
+            if self.limiter:
+                self.limiter.wait()
+            start = time.perf_counter()
+            try:
+                result = func(client, item)
+                stats.done += 1
+                if self.limiter:
+                    self.limiter.success(time.perf_counter() - start)
+                return result
+            except BaseException as error:
+                stats.failed += 1
+                # Only throttling slows the workers down, not a missing profile
+                if self.limiter and throttling(error):
+                    self.limiter.failure()
+                raise
+            finally:
+                stats.busy += time.perf_counter() - start
+        finally:
+            self._clients.put(client)
+
+
+    def map(self, func:Callable, items:Iterable) -> Iterator[Tuple[object, Optional[object], Optional[Exception]]]:
+        """Applies ``func(client, item)`` to every item concurrently.
+
+        Results are yielded in the same order as ``items``, as soon as
+        they are available. At most ``2 * workers`` items are in flight, so
+        ``items`` can be a lazy iterable.
+
+        Args:
+            func (Callable): Function taking a client and an item.
+            items (Iterable): Items to process.
+
+        Yields:
+            Tuple[object, Optional[object], Optional[Exception]]: The item, the
+                value returned by ``func`` and the exception it raised, if any.
+        """
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for item in items:
+                pending.append((item, executor.submit(self.call, func, item)))
+                if len(pending) >= self.workers * 2:
+                    yield self._result(*pending.popleft())
+            while pending:
+                yield self._result(*pending.popleft())
+
+
+    def _result(self, item, future):
+        try:
+            return item, future.result(), None
+        except Exception as error:
+            return item, None, error
+
+
+    def close(self):
+        """Disconnects the sessions created by the pool."""
+        for client in self._created:
+            try:
+                client.disconnect()
+            except:
+                pass
+        self._created = list()
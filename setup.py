@@ -18,6 +18,10 @@ setup(
         'instaclient',
         'webdrivermanager'
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+        'zstd': ['zstandard'],
+    },
     url = 'https://github.com/davidwickerhf/instacli',   # Provide either the link to your github or to your website
     download_url = 'https://github.com/davidwickerhf/instacli/archive/v0.2.11.tar.gz',
     long_description=README,
@@ -0,0 +1,23 @@
+import os, sys
+import pytest
+
+# instacli of this checkout, and the fakes of Instagram next to the tests
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+
+
+@pytest.fixture
+def synthetic(tmp_path, monkeypatch):
+    """Runs the commands with the :class:`SyntheticClient` of ``fakes.py`` in
+    place of :class:`IGClient`, and keeps the cache and the snapshots in
+    ``tmp_path``. Returns the client class, whose ``size`` is the number of
+    followers and posts of any target."""
+    from fakes import SyntheticClient
+    from instacli.models.settings import Settings
+    import instacli.models.igclient as igclient
+
+    client = type('Client', (SyntheticClient,), {'size': 100})
+    monkeypatch.setenv('INSTACLI_DATA_DIR', str(tmp_path / 'data'))
+    monkeypatch.setattr(Settings.get(), 'driver_path', sys.executable)
+    monkeypatch.setattr(igclient, 'IGClient', client)
+    return client
@@ -0,0 +1,142 @@
+"""Fakes of Instagram shared by the tests and the benchmarks.
+
+:class:`SyntheticClient` replaces :class:`IGClient` with an in-memory client
+which generates N profiles and posts instantly, and :func:`serve` starts a
+local stub of the Instagram endpoints the fetch backends request.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+import json, random, threading, time
+
+
+class SyntheticBackend():
+    def __init__(self, name:str=None):
+        self.concurrent = name == 'http'
+
+    def close(self):
+        pass
+
+
+class SyntheticClient():
+    # Number of users and posts of the synthetic target
+    size = 0
+    # Distinct hashtags in the captions, used with a skewed distribution
+    vocabulary = 2000
+
+    def __init__(self, backend:str=None):
+        from instacli.models.sessions import LoginStats
+        self.username = None
+        self.driver = None
+        self.set_backend(backend)
+        if not hasattr(SyntheticClient, 'stats'):
+            SyntheticClient.stats = LoginStats()
+
+    def set_backend(self, name:str=None, **options):
+        self.backend = SyntheticBackend(name)
+
+    def login(self, username:str, password:str) -> bool:
+        self.username = username
+        SyntheticClient.stats.record_login()
+        return True
+
+    def set_logger_level(self, level):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def _user(self, index:int) -> dict:
+        return {'id': str(index), 'username': f'user{index}', 'full_name': f'User {index}', 'is_private': index % 3 == 0, 'is_verified': index % 11 == 0}
+
+    def _request(self, url:str, use_driver:bool=False) -> dict:
+        variables = json.loads(unquote(url.split('variables=')[1]))
+        first = variables['first']
+        start = int((variables.get('after') or '0').rstrip('=') or 0)
+        end = min(start + first, self.size)
+        page_info = {'has_next_page': end < self.size, 'end_cursor': str(end) if end < self.size else None}
+        if 'include_reel' in variables:
+            edges = [{'node': self._user(index)} for index in range(start, end)]
+            return {'status': 'ok', 'data': {'user': {'edge_followed_by': {'page_info': page_info, 'edges': edges}, 'edge_follow': {'page_info': page_info, 'edges': edges}}}}
+        edges = [{'node': {'shortcode': f'p{index}', 'taken_at_timestamp': 1600000000 - index * 3600, 'edge_media_preview_like': {'count': index % 50}}} for index in range(start, end)]
+        return {'status': 'ok', 'data': {'user': {'edge_owner_to_timeline_media': {'page_info': page_info, 'edges': edges}}}}
+
+    def get_profile(self, username:str, context:bool=False):
+        from instaclient.instagram.profile import Profile
+        index = int(username[4:]) if username.startswith('user') else 0
+        user = self._user(index)
+        return Profile(client=self, id=user['id'], viewer=self.username, username=username, name=user['full_name'],
+            biography=f'Synthetic profile {index}', is_private=user['is_private'], is_verified=user['is_verified'],
+            is_business_account=index % 4 == 0, follower_count=index * 7 % 100000, followed_count=index % 1000, post_count=index % 500)
+
+    def get_post(self, shortcode:str, context:bool=False):
+        from instaclient.instagram.post import Post
+        index = int(shortcode[1:])
+        generator = random.Random(index)
+        tags = {f'tag{int(self.vocabulary * generator.random() ** 3)}' for _ in range(generator.randint(1, 12))}
+        caption = f"Synthetic post {index} " + ' '.join(f'#{tag}' for tag in tags)
+        return Post(client=self, id=str(index), type='GraphImage', viewer=self.username, owner='target', shortcode=shortcode,
+            timestamp=1600000000 - index * 3600, likes_count=index % 50, comments_disabled=False, is_ad=False, media=list(),
+            caption=caption, comments_count=index % 20)
+
+    def get_hashtag(self, tag:str):
+        from instaclient.instagram.hashtag import Hashtag
+        return Hashtag(client=self, id=tag, viewer=self.username, name=tag, posts_count=len(tag) * 1000)
+
+    def get_hashtag_posts(self, tag:str, count:int, callback=None, callback_frequency:int=100, **callback_args):
+        shortcodes = [f'p{index}' for index in range(min(count, self.size))]
+        if callable(callback):
+            callback(scraped=shortcodes, **callback_args)
+        return shortcodes
+
+
+def profile(index:int) -> dict:
+    return {
+        'id': str(index), 'username': f'user{index}', 'full_name': f'User {index}', 'biography': '',
+        'is_private': index % 3 == 0, 'is_verified': index % 7 == 0, 'is_business_account': index % 5 == 0,
+        'is_joined_recently': False, 'edge_followed_by': {'count': index}, 'edge_follow': {'count': index},
+        'edge_owner_to_timeline_media': {'count': index}, 'business_category_name': None,
+        'overall_category_name': None, 'external_url': None, 'blocked_by_viewer': False,
+        'restricted_by_viewer': False, 'has_blocked_viewer': False, 'has_requested_viewer': False,
+        'edge_mutual_followed_by': {'count': 0}, 'requested_by_viewer': False,
+    }
+
+
+class InstagramHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, don't let them wait for an ACK
+    disable_nagle_algorithm = True
+    users = 0
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        if url.path.startswith('/graphql/query/'):
+            variables = json.loads(unquote(parse_qs(url.query)['variables'][0]))
+            start = int((variables.get('after') or '0').rstrip('=') or 0)
+            end = min(start + variables['first'], self.users)
+            edges = [{'node': profile(index)} for index in range(start, end)]
+            page = {'has_next_page': end < self.users, 'end_cursor': str(end) if end < self.users else None}
+            data = {'status': 'ok', 'data': {'user': {'edge_followed_by': {'page_info': page, 'edges': edges}}}}
+        else:
+            username = url.path.strip('/')
+            index = int(username[4:]) if username.startswith('user') else 0
+            data = {'graphql': {'user': profile(index)}}
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(users:int, latency:float) -> ThreadingHTTPServer:
+    InstagramHandler.users = users
+    InstagramHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), InstagramHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,16 @@
+from instacli.models.analytics import HashtagAnalytics
+
+
+def test_hashtags_are_case_insensitive():
+    analytics = HashtagAnalytics()
+    assert analytics.extract('Summer in #Travel #travel #FOOD') == ['travel', 'travel', 'food']
+    analytics.add(analytics.extract('Summer in #Travel #travel #FOOD'), likes=10, comments=2)
+    analytics.add(['Food', 'beach'], likes=20)
+    analytics.set_tag({'name': 'Travel', 'posts_count': 1000})
+
+    assert analytics.most_common() == [('travel', 2), ('food', 2), ('beach', 1)]
+    assert analytics.found_in['travel'] == 1
+    assert analytics.engagement('food') == (15.0, 1.0)
+    assert dict(analytics.related('food')) == {'travel': 1, 'beach': 1}
+    assert sorted(analytics.pairs()) == [('beach', 'food', 1), ('food', 'travel', 1)]
+    assert analytics.tags['travel']['posts_count'] == 1000
@@ -0,0 +1,93 @@
+import pytest
+from fakes import serve
+from instacli.models import FetchBackend, FollowIterator
+from instacli.models.igclient import IGClient
+
+USERS = 120
+
+
+@pytest.fixture(scope='module')
+def origin():
+    """Origin of the stub of Instagram of ``fakes.py``."""
+    server = serve(USERS, 0.0)
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def client(backend:str, origin:str) -> IGClient:
+    client = IGClient(backend)
+    client.set_backend(backend, origin=origin)
+    client.username = 'viewer'
+    return client
+
+
+def followers(client:IGClient) -> list:
+    iterator = FollowIterator(client, 'user0', FollowIterator.FOLLOWERS, USERS)
+    return [user.to_dict() for page in iterator.pages() for user in page]
+
+
+def test_profiles_match(origin):
+    http, selenium = client(FetchBackend.HTTP, origin), client(FetchBackend.SELENIUM, origin)
+    try:
+        for username in ('user0', 'user7', 'user45', 'user119'):
+            expected = selenium.get_profile(username)
+            assert expected.username == username
+            assert http.get_profile(username).to_dict() == expected.to_dict()
+    finally:
+        http.backend.close()
+
+
+def test_followers_match(origin):
+    # The pages of followers are loaded in the browser by the Selenium backend
+    selenium = client(FetchBackend.SELENIUM, origin)
+    try:
+        selenium.connect()
+    except Exception as error:
+        pytest.skip(f"Chrome can't be started: {getattr(error, 'message', None) or error}")
+    http = client(FetchBackend.HTTP, origin)
+    try:
+        expected = followers(selenium)
+        assert len(expected) == USERS
+        assert followers(http) == expected
+    finally:
+        selenium.disconnect()
+        http.backend.close()
+
+
+def test_http_fallbacks_share_the_browser_one_at_a_time(monkeypatch):
+    import threading, time
+    from concurrent.futures import ThreadPoolExecutor
+    from instaclient import InstaClient
+
+    class Page():
+        status_code = 200
+        content = b'<html></html>'
+
+        def json(self):
+            raise ValueError('Not JSON')
+
+    active, highest = 0, 0
+    lock = threading.Lock()
+
+    def browser(client, url, use_driver=False):
+        nonlocal active, highest
+        with lock:
+            active += 1
+            highest = max(highest, active)
+        time.sleep(0.01)
+        with lock:
+            active -= 1
+        return {'url': url}
+
+    monkeypatch.setattr(InstaClient, '_request', browser)
+    shared = type('Client', (), {'driver': object(), 'logged_in': False})()
+    backend = FetchBackend.create(FetchBackend.HTTP, shared)
+    monkeypatch.setattr(backend.session, 'get', lambda url, timeout=None: Page())
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(backend.fetch, [f'https://www.instagram.com/user{index}/' for index in range(32)]))
+    finally:
+        backend.close()
+    assert results[5] == {'url': 'https://www.instagram.com/user5/'}
+    assert backend.fallbacks == 32
+    assert highest == 1
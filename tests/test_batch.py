@@ -0,0 +1,105 @@
+import json, threading
+import pytest
+from instacli.models.batch import Account, BatchJob, BatchRunner, ManifestError, load_manifest
+
+
+def manifest(tmp_path, data:dict) -> str:
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_load_manifest(tmp_path, monkeypatch):
+    monkeypatch.setenv('SECOND_PASSWORD', 'secret')
+    accounts, jobs, settings = load_manifest(manifest(tmp_path, {
+        'accounts': [{'login': 'first', 'password': 'pass', 'quota': 2}, {'login': 'second', 'password_env': 'SECOND_PASSWORD', 'sessions': 2}],
+        'defaults': {'output': '/tmp', 'getinfo': {'followers': True, 'count': 100}},
+        'jobs': [{'command': 'getinfo', 'target': 'a', 'count': 50}, {'command': 'posts', 'target': 'b', 'account': 'second'}],
+        'retries': 2,
+    }))
+    assert [(account.login, account.password, account.quota, account.sessions) for account in accounts] == [('first', 'pass', 2, 1), ('second', 'secret', None, 2)]
+    assert jobs[0].options == {'output': '/tmp', 'followers': True, 'count': 50, 'target': 'a'}
+    assert jobs[1].options == {'output': '/tmp', 'target': 'b'} and jobs[1].account == 'second'
+    assert settings == {'retries': 2}
+    assert jobs[0].args(accounts[0]) == ['getinfo', '--login', 'first', '--password', 'pass', '--output', '/tmp', '--followers', '--count', '50', '--target', 'a']
+
+
+@pytest.mark.parametrize('data, reason', [
+    ({'jobs': [{'command': 'posts'}]}, 'accounts and jobs are required'),
+    ({'accounts': [{'login': 'first'}], 'jobs': [{'command': 'posts'}]}, 'needs a login and a password'),
+    ({'accounts': [{'login': 'first', 'password': 'pass'}], 'jobs': [{'target': 'a'}]}, 'job 0 has no command'),
+    ({'accounts': [{'login': 'first', 'password': 'pass'}], 'jobs': [{'command': 'posts', 'account': 'other'}]}, 'unknown account other'),
+])
+def test_invalid_manifests(tmp_path, data, reason):
+    with pytest.raises(ManifestError) as error:
+        load_manifest(manifest(tmp_path, data))
+    assert reason in error.value.message
+
+
+def jobs(count:int) -> list:
+    return [BatchJob(index, 'posts', {'target': f'user{index}'}) for index in range(count)]
+
+
+def test_jobs_are_spread_over_the_accounts():
+    accounts = [Account('first', 'pass'), Account('second', 'pass')]
+    used = list()
+
+    def runner(args):
+        used.append(args[2])
+        print(f'output of {args[-1]}')
+        return 0
+
+    results = BatchRunner(accounts, runner).run(jobs(4))
+    assert [job.status for job in results] == ['succeeded'] * 4
+    assert sorted(used) == ['first', 'first', 'second', 'second']
+    # The output of every job is captured with its attempt
+    assert [job.attempts[0]['output'] for job in results] == [f'output of user{index}\n' for index in range(4)]
+
+
+def test_quota_skips_the_jobs_left():
+    accounts = [Account('first', 'pass', quota=2)]
+    runner = BatchRunner(accounts, lambda args: 0)
+    results = runner.run(jobs(3))
+    assert [job.status for job in results] == ['succeeded', 'succeeded', 'skipped']
+    report = runner.report(results, 1.0)
+    assert (report['succeeded'], report['skipped'], report['accounts']) == (2, 1, {'first': {'jobs': 2, 'quota': 2}})
+
+
+def test_failed_jobs_are_retried_on_another_account():
+    accounts = [Account('first', 'pass'), Account('second', 'pass')]
+
+    def runner(args):
+        if args[2] == 'first':
+            raise RuntimeError('login failed')
+        return 0
+
+    results = BatchRunner(accounts, runner, retries=1).run(jobs(1))
+    assert results[0].status == 'succeeded'
+    assert [(attempt['account'], attempt['code']) for attempt in results[0].attempts] == [('first', 1), ('second', 0)]
+    assert 'Error: login failed' in results[0].attempts[0]['output']
+
+    results = BatchRunner([Account('first', 'pass')], lambda args: 1, retries=2).run(jobs(1))
+    assert results[0].status == 'failed'
+    assert len(results[0].attempts) == 3
+
+
+def test_sessions_bound_the_concurrent_jobs():
+    accounts = [Account('first', 'pass', sessions=2)]
+    running, highest = 0, 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(2, timeout=5)
+
+    def runner(args):
+        nonlocal running, highest
+        with lock:
+            running += 1
+            highest = max(highest, running)
+        # Two jobs run at once, and never a third one
+        barrier.wait()
+        with lock:
+            running -= 1
+        return 0
+
+    results = BatchRunner(accounts, runner).run(jobs(4))
+    assert [job.status for job in results] == ['succeeded'] * 4
+    assert highest == 2
@@ -0,0 +1,10 @@
+from instacli.models.browser import ProfileDir
+
+
+def test_profiles_are_claimed_in_the_data_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv('INSTACLI_DATA_DIR', str(tmp_path / 'data'))
+    first, second = ProfileDir.claim(), ProfileDir.claim()
+    assert first.path == str(tmp_path / 'data' / 'browser' / 'profile-0')
+    assert second.path == str(tmp_path / 'data' / 'browser' / 'profile-1')
+    first.release()
+    assert ProfileDir.claim().path == first.path
@@ -0,0 +1,42 @@
+from instaclient.instagram.hashtag import Hashtag
+from instaclient.instagram.post import Post
+from instaclient.instagram.profile import Profile
+from instacli.models.cache import CachedClient, EntityCache
+
+
+class Client():
+    username = None
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_profile(self, username, context=False):
+        self.calls += 1
+        return Profile(client=self, id='1', viewer=None, username=username, follower_count=10)
+
+    def get_post(self, shortcode, context=False):
+        self.calls += 1
+        return Post(client=self, id='2', type='GraphImage', viewer=None, owner=None, shortcode=shortcode, timestamp=1600000000,
+            likes_count=3, comments_disabled=False, is_ad=False, media=list(), caption=None)
+
+    def get_hashtag(self, tag):
+        self.calls += 1
+        return Hashtag(client=self, id=tag, viewer=None, name=tag)
+
+
+def cached(tmp_path):
+    client = Client()
+    return client, CachedClient(client, EntityCache(str(tmp_path / 'cache.sqlite')), max_age=3600)
+
+
+def test_round_trip_with_none_fields(tmp_path):
+    client, cache = cached(tmp_path)
+    loaded = [cache.get_profile('user'), cache.get_post('abc'), cache.get_hashtag('tag')]
+    hits = [cache.get_profile('user'), cache.get_post('abc'), cache.get_hashtag('tag')]
+    assert client.calls == 3
+    for entity, hit in zip(loaded, hits):
+        assert type(hit) is type(entity)
+        assert hit.to_dict() == entity.to_dict()
+        assert hit.viewer is None
+    assert hits[1].owner is None
+    cache.cache.close()
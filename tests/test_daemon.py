@@ -0,0 +1,26 @@
+import os, threading, time
+from instacli.models.daemon import Daemon, DaemonClient
+from instacli.models.settings import Settings
+
+
+def test_client_finds_the_daemon_on_the_configured_socket(tmp_path, monkeypatch):
+    path = str(tmp_path / 'custom.sock')
+    monkeypatch.setenv('INSTACLI_SOCKET', path)
+    monkeypatch.setattr(Settings, '_instance', None)
+
+    daemon = Daemon(lambda args, cwd: (0, f'ran {args[0]}\n'))
+    assert daemon.path == path
+    server = threading.Thread(target=daemon.serve, daemon=True)
+    server.start()
+    try:
+        client = DaemonClient()
+        assert client.path == path
+        for _ in range(100):
+            if client.available():
+                break
+            time.sleep(0.02)
+        assert client.submit(['getinfo'])['output'] == 'ran getinfo\n'
+    finally:
+        DaemonClient(path).stop()
+        server.join(5)
+    assert not os.path.exists(path)
@@ -0,0 +1,54 @@
+import glob, json
+from instacli.instacli import invoke_command
+
+UNLIMITED = ['--limit', 'profile=1000', '--limit', 'pagination=1000']
+
+
+def getinfo(output, *args) -> int:
+    return invoke_command(['getinfo', '--login', 'bench', '--password', 'bench', '--followers', '--target', 'bench', '--output', str(output)] + list(args) + UNLIMITED)
+
+
+def records(output) -> list:
+    paths = glob.glob(str(output / '*.jsonl'))
+    assert len(paths) == 1
+    with open(paths[0], 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+def test_thin_scrape(synthetic, tmp_path, capsys):
+    assert getinfo(tmp_path, '--count', '100', '--onlyprivate') == 0
+    users = records(tmp_path)
+    # Every third synthetic user is private
+    assert [user['username'] for user in users] == [f'user{index}' for index in range(0, 100, 3)]
+    assert all(user['is_private'] for user in users)
+    assert '34 scraped users saved' in capsys.readouterr().out
+
+
+def test_deep_scrape_reports_unavailable_users(synthetic, tmp_path, capsys):
+    get_profile = synthetic.get_profile
+    synthetic.get_profile = lambda self, username, context=False: None if username == 'user20' else get_profile(self, username, context)
+
+    assert getinfo(tmp_path, '--count', '60', '--where', 'follower_count > 100', '--workers', '2', '--backend', 'http') == 0
+    users = records(tmp_path)
+    # follower_count is index * 7, and user20 can't be loaded
+    assert sorted(user['username'] for user in users) == sorted(f'user{index}' for index in range(15, 60) if index != 20)
+    assert all(user['biography'] for user in users)
+    assert '1 users could not be loaded and were skipped: user20' in capsys.readouterr().out
+
+
+def test_json_progress_keeps_stdout_for_the_events(synthetic, tmp_path, capsys):
+    assert invoke_command(['--progress', 'json', 'getinfo', '--login', 'bench', '--password', 'bench', '--followers', '--target', 'bench', '--count', '50', '--output', str(tmp_path)] + UNLIMITED) == 0
+    captured = capsys.readouterr()
+    events = [json.loads(line) for line in captured.out.splitlines()]
+    assert events and all('phase' in event for event in events)
+    assert '50 scraped users saved' in captured.err
+
+
+def test_cursor_is_kept_in_the_journal(synthetic, tmp_path, capsys):
+    assert getinfo(tmp_path, '--count', '50') == 0
+    assert all('username' in user for user in records(tmp_path))
+    paths = glob.glob(str(tmp_path / '*.journal'))
+    with open(paths[0], 'r', encoding='utf-8') as file:
+        finished = [event for event in map(json.loads, file) if event['event'] == 'finished']
+    assert finished[0]['cursor'] == '50'
+    assert 'Resume the scrape with --cursor 50' in capsys.readouterr().out
@@ -0,0 +1,34 @@
+import glob
+from instacli.instacli import invoke_command
+
+UNLIMITED = ['--limit', 'post=1000', '--limit', 'pagination=1000']
+
+
+def hashtag(output, *args) -> int:
+    return invoke_command(['hashtag', '--login', 'bench', '--password', 'bench', '--target', 'tag', '--output', str(output), '--format', 'jsonl'] + list(args) + UNLIMITED)
+
+
+def logins(client) -> list:
+    sessions = list()
+    login = client.login
+
+    def counted(self, username, password):
+        sessions.append(self)
+        return login(self, username, password)
+
+    client.login = counted
+    return sessions
+
+
+def test_one_worker_uses_the_scrolling_session(synthetic, tmp_path):
+    sessions = logins(synthetic)
+    assert hashtag(tmp_path, '--count', '40') == 0
+    assert len(sessions) == 1
+    with open(glob.glob(str(tmp_path / '*-posts.jsonl'))[0], 'r', encoding='utf-8') as file:
+        assert sum(1 for line in file if line.strip()) == 40
+
+
+def test_workers_load_posts_in_other_sessions(synthetic, tmp_path):
+    sessions = logins(synthetic)
+    assert hashtag(tmp_path, '--count', '40', '--workers', '2') == 0
+    assert len(sessions) == 3
@@ -0,0 +1,24 @@
+import json
+from instacli.models.journal import Journal
+from instacli.models.sink import OutputSink
+
+
+def events(path) -> list:
+    with open(path, 'r', encoding='utf-8') as file:
+        return [json.loads(line)['event'] for line in file]
+
+
+def test_staged_events_are_synced_with_the_output(tmp_path):
+    journal = Journal.create(str(tmp_path), 'job')
+    sink = OutputSink(str(tmp_path / 'job.jsonl'), flush_every=10, on_flush=journal.sync)
+    for index in range(25):
+        journal.stage('row', id=index)
+        sink.write({'id': index})
+    # Only the events of the flushed rows are on disk
+    assert events(journal.path) == ['start'] + ['row'] * 20
+    assert len(journal.all('row')) == 25
+    sink.close()
+    journal.record('finished')
+    journal.close()
+    assert events(journal.path) == ['start'] + ['row'] * 25 + ['finished']
+    assert len(Journal.load(str(tmp_path), 'job').all('row')) == 25
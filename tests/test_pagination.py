@@ -0,0 +1,57 @@
+from instacli.models.journal import Journal
+from instacli.models.pagination import PostIterator
+
+
+def test_resume_loads_the_posts_of_earlier_pages(synthetic, tmp_path):
+    client = synthetic()
+    profile = client.get_profile('target')
+    journal = Journal.create(str(tmp_path), 'job')
+    iterator = PostIterator(client, profile, page_size=10, journal=journal)
+
+    # Like the pipelined posts command, pages are requested ahead of the posts
+    candidates = iterator.candidates()
+    queued = [next(candidates) for _ in range(25)]
+    saved = queued[:5]
+    for shortcode in saved:
+        journal.stage('post', shortcode=shortcode)
+    journal.sync()
+    # Killed while the other queued posts were loading, and before they were synced
+    journal.stage('post', shortcode=queued[5])
+    journal._file.close()
+    assert journal.last('page')['cursor'] == '30'
+
+    journal = Journal.load(str(tmp_path), 'job')
+    resumed = [post.shortcode for post in PostIterator(client, profile, page_size=10, journal=journal)]
+    journal.close()
+    assert not set(saved) & set(resumed)
+    assert sorted(saved + resumed) == sorted(f'p{index}' for index in range(100))
+
+
+class Pages():
+    """Client returning one page of the given thin post nodes."""
+    def __init__(self, nodes:list):
+        self.nodes = nodes
+
+    def _request(self, url, use_driver=False):
+        edges = [{'node': node} for node in self.nodes]
+        return {'status': 'ok', 'data': {'user': {'edge_owner_to_timeline_media': {'page_info': {'has_next_page': False}, 'edges': edges}}}}
+
+
+def test_date_range_skips_pinned_and_undated_posts(synthetic):
+    profile = synthetic().get_profile('target')
+    nodes = [
+        # Pinned, older than the range
+        {'shortcode': 'pinned1', 'taken_at_timestamp': 100},
+        {'shortcode': 'pinned2', 'taken_at_timestamp': 200},
+        {'shortcode': 'new', 'taken_at_timestamp': 1500},
+        {'shortcode': 'undated'},
+        {'shortcode': 'inside', 'taken_at_timestamp': 1200},
+        {'shortcode': 'old1', 'taken_at_timestamp': 900},
+        {'shortcode': 'old2', 'taken_at_timestamp': 800},
+        {'shortcode': 'old3', 'taken_at_timestamp': 700},
+        {'shortcode': 'old4', 'taken_at_timestamp': 600},
+        {'shortcode': 'after', 'taken_at_timestamp': 1100},
+    ]
+    iterator = PostIterator(Pages(nodes), profile, start=1000, end=2000)
+    assert list(iterator.candidates()) == ['new', 'inside']
+    assert iterator.finished
@@ -0,0 +1,55 @@
+import pytest
+from instacli.models.predicate import Predicate, PredicateError
+
+PROFILE = {'username': 'user', 'is_private': False, 'is_verified': True, 'follower_count': 1500, 'category': 'Travel', 'biography': ''}
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('not is_private and is_verified and follower_count > 1000', True),
+    ('is_private or follower_count >= 2000', False),
+    ('(is_private or is_verified) and not biography', True),
+    ('1000 < follower_count <= 1500', True),
+    ('1000 < follower_count < 1500', False),
+    ("category in ['Travel', 'Food']", True),
+    ("username not in ('user', 'other')", False),
+    ('follower_count != -1', True),
+    ('biography', False),
+    ('missing == None', True),
+    # A missing attribute can't be compared with a number
+    ('missing > 10', False),
+])
+def test_evaluate(expression, expected):
+    predicate = Predicate(expression)
+    assert predicate.evaluate(PROFILE) is expected
+    assert predicate(PROFILE) is expected
+
+
+def test_unknown_attributes_are_three_valued():
+    predicate = Predicate('not is_private and follower_count > 1000')
+    thin = {'is_private': True, 'follower_count': None}
+    known = ['is_private']
+    # Private profiles are rejected before their follower count is known
+    assert predicate.evaluate(thin, known) is False
+    assert predicate.evaluate({'is_private': False}, known) is None
+    assert predicate({'is_private': False, 'follower_count': 5}) is False
+    assert Predicate('is_private or follower_count > 1000').evaluate({'is_private': True}, known) is True
+
+
+def test_decidable():
+    predicate = Predicate('not is_private and follower_count > 1000')
+    assert predicate.fields == {'is_private', 'follower_count'}
+    assert not predicate.decidable(['is_private', 'username'])
+    assert predicate.decidable(['is_private', 'follower_count'])
+
+
+@pytest.mark.parametrize('expression, reason', [
+    ('follower_count >', 'invalid syntax'),
+    ('followers > 10', 'unknown attribute followers'),
+    ('__import__("os")', 'is not supported'),
+    ('follower_count + 1 > 10', 'is not supported'),
+])
+def test_invalid_expressions(expression, reason):
+    with pytest.raises(PredicateError) as error:
+        Predicate(expression, fields=['follower_count', 'is_private'])
+    assert reason in error.value.message
+    assert expression in error.value.message
@@ -0,0 +1,86 @@
+import time
+import pytest
+from instacli.models.ratelimiter import RateLimiter, RateLimits, throttling
+
+
+def test_fixed_rate_by_default():
+    limiter = RateLimiter(2.0)
+    limiter.success()
+    limiter.failure()
+    assert limiter.rate == 2.0
+    assert limiter.throttled == 1
+
+
+def test_additive_increase_multiplicative_decrease():
+    limiter = RateLimiter(1.0, min_rate=0.25, max_rate=2.0, increase=0.5)
+    limiter.success()
+    assert limiter.rate == 1.5
+    limiter.success()
+    limiter.success()
+    # Up to max_rate
+    assert limiter.rate == 2.0
+    limiter.failure()
+    assert limiter.rate == 1.0
+    for _ in range(5):
+        limiter.failure()
+    # Down to min_rate
+    assert limiter.rate == 0.25
+    assert repr(limiter) == '0.25/s (6 backoffs)'
+
+
+def test_slow_responses_back_off():
+    limiter = RateLimiter(1.0, min_rate=0.1, max_rate=2.0, increase=0.5, slow=1.0)
+    limiter.success(0.5)
+    assert limiter.rate == 1.5
+    limiter.success(3.0)
+    assert limiter.rate == 0.75
+
+
+def test_token_bucket_paces_the_calls():
+    limiter = RateLimiter(50.0, burst=2)
+    start = time.perf_counter()
+    for _ in range(7):
+        limiter.wait()
+    elapsed = time.perf_counter() - start
+    # The first two calls use the burst, the next five wait 20ms each
+    assert 0.09 <= elapsed < 0.5
+    assert limiter.requests == 7
+
+
+def test_call_only_backs_off_on_throttling():
+    from instaclient.errors.common import InvalidUserError
+    limiter = RateLimiter(100.0, min_rate=1.0, max_rate=100.0)
+
+    def fail(error):
+        raise error
+
+    for error in (InvalidUserError('user'), ValueError('bug')):
+        with pytest.raises(type(error)):
+            limiter.call(fail, error)
+    assert limiter.rate == 100.0
+    with pytest.raises(ConnectionError):
+        limiter.call(fail, ConnectionError('reset'))
+    assert limiter.rate == 50.0
+    assert limiter.call(lambda value: value * 2, 21) == 42
+
+
+def test_throttling():
+    import requests
+    from instaclient.errors.common import InvalidInstaRequestError, InvalidUserError
+    assert throttling(TimeoutError())
+    assert throttling(requests.ConnectionError())
+    assert throttling(InvalidInstaRequestError('url'))
+    assert not throttling(InvalidUserError('user'))
+    assert not throttling(KeyError('id'))
+
+
+def test_rate_limits_per_action():
+    limits = RateLimits({RateLimits.PROFILE: 4.0})
+    profile, post = limits.get(RateLimits.PROFILE), limits.get(RateLimits.POST)
+    # Limiters are shared by the workers of a command
+    assert limits.get(RateLimits.PROFILE) is profile
+    assert (profile.rate, profile.max_rate, profile.min_rate) == (4.0, 4.0, 4.0 * RateLimits.MIN_FRACTION)
+    assert (post.rate, post.max_rate, post.slow) == RateLimits.DEFAULTS[RateLimits.POST]
+    assert repr(limits) == ''
+    limits.call(RateLimits.PROFILE, lambda: None)
+    assert repr(limits) == 'profile: 4.00/s'
@@ -0,0 +1,36 @@
+import json, os, stat, threading
+from instacli.models.sessions import SessionStore
+
+
+def test_sessions_default_to_the_data_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv('INSTACLI_DATA_DIR', str(tmp_path / 'data'))
+    store = SessionStore()
+    assert store.path == str(tmp_path / 'data' / 'sessions')
+    assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o700
+
+
+def test_threads_saving_the_same_account(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions'))
+    barrier = threading.Barrier(8)
+    errors = list()
+
+    def save(worker):
+        barrier.wait()
+        try:
+            for index in range(50):
+                store.save('account', [{'name': 'sessionid', 'value': f'{worker}-{index}' * 200}], login_time=1.0)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    with open(store.path_of('account'), encoding='utf-8') as file:
+        data = json.load(file)
+    assert data['username'] == 'account'
+    assert stat.S_IMODE(os.stat(store.path_of('account')).st_mode) == 0o600
+    assert os.listdir(store.path) == ['account.json']
@@ -0,0 +1,138 @@
+import csv, gzip, json, os
+import pytest
+from instacli.models.sink import GzipJsonlFormat, OutputFormat, OutputFormatError, OutputSink
+
+COLUMNS = ['username', 'follower_count', 'is_private', 'biography']
+TYPES = {'follower_count': int, 'is_private': bool}
+RECORDS = [{'username': f'user{index}', 'follower_count': index * 10, 'is_private': index % 2 == 0, 'biography': f'Bio é {index}'} for index in range(6)]
+FORMATS = ['jsonl', 'jsonl.gz', 'jsonl.zst', 'csv', 'csv-utf16', 'parquet', 'arrow']
+
+
+def output_format(name:str):
+    try:
+        return OutputFormat.get(name)
+    except OutputFormatError as error:
+        pytest.skip(error.message)
+
+
+def read_compressed(path:str, name:str) -> list:
+    with open(path, 'rb') as file:
+        data = output_format(name)(path)._decompress(file.read())
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def read(path:str, name:str) -> list:
+    """Records of an output file. CSV files keep every value as text."""
+    format = output_format(name)
+    if name == 'jsonl':
+        with open(path, 'r', encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+    if name.startswith('jsonl.'):
+        return read_compressed(path, name)
+    if name.startswith('csv'):
+        with open(path, 'r', encoding=format.encoding, newline='') as file:
+            records = list(csv.DictReader(file, delimiter=format.delimiter))
+        return [{**record, 'follower_count': int(record['follower_count']), 'is_private': record['is_private'] == 'True'} for record in records]
+    return format(path)._read()
+
+
+def kill(sink:OutputSink):
+    """Closes the file of a sink as a killed process would, without ending it."""
+    output = getattr(sink._output, '_spool', sink._output)
+    getattr(output, '_raw', output._file).close()
+
+
+def sink_of(tmp_path, format:str, **options) -> OutputSink:
+    path = str(tmp_path / f'out.{output_format(format).extension}')
+    return OutputSink(path, format, columns=COLUMNS, types=TYPES, **options)
+
+
+@pytest.mark.parametrize('format', FORMATS)
+def test_round_trip(tmp_path, format):
+    sink = sink_of(tmp_path, format)
+    for record in RECORDS:
+        # Tabular formats only keep the columns
+        sink.write(record if format.startswith('jsonl') else {**record, 'ignored': True})
+    sink.close()
+    assert sink.written == len(RECORDS)
+    assert read(sink.path, format) == RECORDS
+
+
+@pytest.mark.parametrize('format', FORMATS)
+def test_append_to_a_finished_output(tmp_path, format):
+    sink = sink_of(tmp_path, format)
+    for record in RECORDS[:3]:
+        sink.write(record)
+    sink.close()
+
+    sink = sink_of(tmp_path, format, append=True)
+    for record in RECORDS[3:]:
+        sink.write(record)
+    sink.close()
+    assert read(sink.path, format) == RECORDS
+
+
+@pytest.mark.parametrize('format', FORMATS)
+def test_append_resumes_an_interrupted_run(tmp_path, format):
+    sink = sink_of(tmp_path, format, flush_every=2)
+    for record in RECORDS[:3]:
+        sink.write(record)
+    sink.flush()
+    kill(sink)
+
+    sink = sink_of(tmp_path, format, append=True)
+    for record in RECORDS[3:]:
+        sink.write(record)
+    sink.close()
+    assert read(sink.path, format) == RECORDS
+
+
+@pytest.mark.parametrize('format', ['jsonl.gz', 'jsonl.zst'])
+def test_compressed_append_drops_the_unflushed_records(tmp_path, format):
+    sink = sink_of(tmp_path, format, flush_every=10)
+    for index in range(25):
+        sink.write({'id': index})
+    # Killed: the stream has no end and the last 5 records were never flushed
+    kill(sink)
+
+    sink = sink_of(tmp_path, format, append=True)
+    sink.write({'id': 'resumed'})
+    sink.close()
+    assert [record['id'] for record in read_compressed(sink.path, format)] == list(range(20)) + ['resumed']
+    assert not os.path.exists(f'{sink.path}.tmp')
+
+
+def test_crash_while_rewriting_keeps_the_saved_records(tmp_path, monkeypatch):
+    sink = sink_of(tmp_path, 'jsonl.gz')
+    for index in range(10):
+        sink.write({'id': index})
+    sink.close()
+
+    def crash(self, raw):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(GzipJsonlFormat, '_compressor', crash)
+    with pytest.raises(KeyboardInterrupt):
+        sink_of(tmp_path, 'jsonl.gz', append=True).write({'id': 10})
+    with gzip.open(sink.path, 'rt') as file:
+        assert [json.loads(line)['id'] for line in file] == list(range(10))
+
+
+def test_flushes_call_on_flush(tmp_path):
+    flushed = list()
+    sink = sink_of(tmp_path, 'jsonl', flush_every=2, on_flush=lambda: flushed.append(sink.written))
+    for record in RECORDS[:5]:
+        sink.write(record)
+    sink.close()
+    assert flushed == [2, 4, 5]
+
+
+def test_no_file_without_records(tmp_path):
+    sink = sink_of(tmp_path, 'jsonl')
+    sink.close()
+    assert not os.path.exists(sink.path)
+
+
+def test_unavailable_format():
+    with pytest.raises(OutputFormatError) as error:
+        OutputSink('out.xml', 'xml')
+    assert 'use one of jsonl' in error.value.message
@@ -0,0 +1,81 @@
+import json
+from instacli.instacli import invoke_command
+from instacli.models.snapshots import IncrementalScan, Snapshot, SnapshotStore, difference
+
+
+def users(*indexes) -> list:
+    return [(str(index), f'user{index}') for index in indexes]
+
+
+def test_difference():
+    assert difference([1, 3, 5, 7], [2, 3, 4, 7, 8]) == [1, 5]
+    assert difference([], [1]) == []
+    assert difference([1, 2], []) == [1, 2]
+
+
+def test_diff_of_two_snapshots():
+    previous = Snapshot('target', 'followers', users(30, 20, 10, 5))
+    latest = Snapshot('target', 'followers', users(40, 30, 10, 5))
+    # Ids are compared as numbers, not in the order of the list
+    assert latest.diff(previous) == ([40], [20])
+    assert Snapshot.from_dict(json.loads(json.dumps(latest.to_dict()))).users == latest.users
+
+
+def test_store_names_the_snapshots_after_their_second(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    first = Snapshot('Target', 'followers', users(1, 2), taken=1000.5)
+    second = Snapshot('Target', 'followers', users(2, 3), taken=1000.9)
+    store.save(first)
+    store.save(second)
+    # Saved in the same second, the second snapshot takes the next one
+    assert second.taken == 1001
+    assert store.times('target', 'followers') == [1000, 1001]
+    assert store.load('target', 'followers').users == users(2, 3)
+    assert store.load('target', 'followers', 1000).users == users(1, 2)
+    assert store.load('target', 'following') is None
+
+
+def test_incremental_scan_stops_on_the_known_accounts():
+    previous = Snapshot('target', 'followers', users(*range(100, 0, -1)))
+    scan = IncrementalScan(previous, overlap=4)
+    # Two new followers, then the previous list without 98
+    for index in [102, 101, 100, 99, 97]:
+        assert not scan.add(str(index), f'user{index}')
+    assert scan.add('96', 'user96')
+    # The profile has 100 followers, so one more was lost below 96
+    snapshot = scan.snapshot(total=100)
+    assert snapshot.users[:6] == users(102, 101, 100, 99, 97, 96)
+    assert snapshot.users[6:] == users(*range(95, 0, -1))
+    assert snapshot.diff(previous) == ([101, 102], [98])
+    assert snapshot.unverified == 1
+
+
+def test_diff_command(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('INSTACLI_DATA_DIR', str(tmp_path / 'data'))
+    store = SnapshotStore()
+    store.save(Snapshot('target', 'followers', users(3, 2, 1), taken=1000))
+    store.save(Snapshot('target', 'followers', users(4, 3, 1), taken=2000, unverified=2))
+
+    assert invoke_command(['diff', '--target', 'target', '--output', str(tmp_path)]) == 0
+    out = capsys.readouterr().out
+    assert 'Gained 1\n  + user4' in out
+    assert 'Lost 1\n  - user2' in out
+    assert '2 more lost' in out
+    with open(tmp_path / '2000-target-followers-diff.json', 'r') as file:
+        saved = json.load(file)
+    assert saved['gained'] == [{'id': '4', 'username': 'user4'}]
+    assert saved['lost'] == [{'id': '2', 'username': 'user2'}]
+
+    assert invoke_command(['diff', '--target', 'target', '--base', '1500']) == 1
+    assert 'Use one of: 1000, 2000' in capsys.readouterr().out
+    assert invoke_command(['diff', '--target', 'other']) == 1
+
+
+def test_getinfo_snapshots_only_whole_lists(synthetic, tmp_path):
+    args = ['getinfo', '--login', 'bench', '--password', 'bench', '--followers', '--target', 'bench', '--count', '100', '--output', str(tmp_path), '--limit', 'profile=1000', '--limit', 'pagination=1000']
+    assert invoke_command(args) == 0
+    store = SnapshotStore()
+    assert len(store.load('bench', 'followers').users) == 100
+    # The tail of the list, from a cursor, isn't a snapshot
+    assert invoke_command(args + ['--cursor', '50']) == 0
+    assert len(store.times('bench', 'followers')) == 1
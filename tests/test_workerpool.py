@@ -0,0 +1,33 @@
+import threading
+from instacli.models.workerpool import WorkerPool
+
+
+def test_stats_per_worker_with_a_shared_client():
+    client = object()
+    pool = WorkerPool(3, clients=[client] * 3)
+    barrier = threading.Barrier(3, timeout=5)
+
+    def task(worker, item):
+        # Every worker takes an item before any of them finishes
+        barrier.wait()
+        return item * 2
+
+    assert [result for _, result, _ in pool.map(task, range(3))] == [0, 2, 4]
+    assert sorted(stats.worker for stats in pool.stats) == [1, 2, 3]
+    assert all(stats.done == 1 for stats in pool.stats)
+
+
+def test_only_throttling_errors_back_off():
+    from instaclient.errors.common import InvalidInstaRequestError, InvalidUserError
+    from instacli.models.ratelimiter import RateLimiter
+    limiter = RateLimiter(1000, min_rate=10, max_rate=1000)
+    pool = WorkerPool(1, clients=[object()], limiter=limiter)
+
+    def task(worker, error):
+        raise error
+
+    errors = [InvalidUserError('user'), TypeError('bug'), InvalidInstaRequestError('url')]
+    results = list(pool.map(task, errors))
+    assert [type(error) for _, _, error in results] == [InvalidUserError, TypeError, InvalidInstaRequestError]
+    assert limiter.throttled == 1
+    assert limiter.rate == 500